@@ -1,18 +1,34 @@
 #!/usr/bin/env python3
 
+# requests, smtplib, tabulate and the other modules only some setups need are imported where they are
+# used, so a unit started by cron at boot reaches its first poll sooner
 import os
-import smtplib
 import json
 import time
-import requests
-import subprocess
+import mmap
+import struct
+import hashlib
+import zlib
+import re
+from bisect import bisect_left, bisect_right
 from math import radians, cos, sin, asin, sqrt, atan2, degrees
 from datetime import datetime, timedelta
-from tabulate import tabulate
-import subprocess
 import sys
+import select
+import socket
+import queue
+import threading
+import functools
+import atexit
+from collections import deque
+from urllib.parse import urlparse
 
-os.environ['TERM'] = 'linux'
+try:
+    import numpy  # Optional, speeds up whole-snapshot calculations
+except ImportError:
+    numpy = None
+
+os.environ.setdefault('TERM', 'linux')  # clear and curses need a terminal type, which cron doesn't set
 
 #############################################################
 
@@ -22,12 +38,50 @@ active_start_minute = 0                          # Minute of the day (local syst
 active_end_hour = 23                             # Hour of the day (local system time) to pause the script (using 24-hour format)
 active_end_minute = 59                           # Minute of the day (local system time) to pause the script
 selected_days = [0, 1, 2, 3, 4, 5, 6]            # Day of the week (local system time) to run the script (0 - Sunday, 1 - Monday, 2 - Tuesday, etc.)
+active_windows = []                              # Several active windows instead of the hours and days above: (days, 'HH:MM' start, 'HH:MM' end), ex. [([1, 2, 3, 4, 5], '06:00', '09:00'), ([5, 6], '22:00', '02:00')]. An end before the start runs overnight
 update_rate = 5                                  # The frequency that this script runs checking for aircraft updates, in seconds
+display_mode = 'auto'                            # 'curses' live table, 'table' (reprinted every update), 'headless' (no output, for cron or systemd); 'auto' uses curses in a terminal and headless otherwise
+display_sort = 'distance'                        # Order of the curses table: 'distance' (closest first) or 'alert_time' (newest alert first); press s to switch
+watch_aircraft_json = True                       # Process aircraft.json as soon as readsb rewrites it (Linux only) instead of waiting for the next update
+json_backend = 'auto'                            # JSON decoder: 'auto' uses orjson or msgspec when installed and falls back to 'json' (the standard library)
+stream_aircraft_json = False                     # Parse aircraft.json incrementally so memory stays flat and rules start before the whole file is read (useful for very large feeds)
+stream_batch_size = 500                          # Number of aircraft evaluated together when stream_aircraft_json is True
+ingest_mode = 'json'                             # 'json' reads aircraft.json every update; 'sbs' (readsb --net-sbs-port) or 'json_stream' (readsb --net-json-port) checks each position the moment readsb receives it
+stream_host = '127.0.0.1'                        # Host running readsb when ingest_mode is 'sbs' or 'json_stream'
+stream_port = 0                                  # Port of the readsb output (0 uses readsb's default: 30003 for 'sbs', 30047 for 'json_stream')
+stream_reconnect_delay = 5                       # Seconds to wait before reconnecting when the connection drops (doubles after each failed attempt, up to 2 minutes)
+stream_aircraft_timeout = 60                     # Seconds without a message before an aircraft is removed (a connection silent this long is reopened)
 aircraft_json_path = "/run/readsb/aircraft.json" # Change this if your aircraft.json is in a different location
+aircraft_sources = [                             # Other receivers or readsb-compatible APIs merged with aircraft_json_path ({lat}, {lon} and {radius_nm} are filled in from your location)
+ #   'http://192.168.1.20/tar1090/data/aircraft.json',               # A second receiver's aircraft.json over HTTP (local paths work too)
+ #   'https://api.airplanes.live/v2/point/{lat}/{lon}/{radius_nm}',  # airplanes.live API
+]
+source_timeout = 2                               # Seconds to wait for each source before the cycle goes ahead without it
+source_max_age = 30                              # Seconds the last good data from a slow or failing source is still used
 aircrafts_json_path = "~/aircrafts.json"         # This is referring to the Mictronics aircraft database. Leave this alone unless you have already downloaded it and would like to store it elsewhere.
+aircrafts_db_url = 'https://raw.githubusercontent.com/Mictronics/readsb/refs/heads/master/webapp/src/db/aircrafts.json'  # Where the Mictronics database is downloaded from
+aircrafts_db_refresh_interval = 86400            # Seconds between checks for a newer Mictronics database (it is only downloaded again if it changed, and in the background)
+types_json_path = "~/types.json"                 # Mictronics aircraft types database (description and ICAO class of each type designator), downloaded with aircrafts.json
+types_db_url = 'https://raw.githubusercontent.com/Mictronics/readsb/refs/heads/master/webapp/src/db/types.json'
+operators_json_path = "~/operators.json"         # Mictronics operators database (name, country and radio callsign of each ICAO operator code), downloaded with aircrafts.json
+operators_db_url = 'https://raw.githubusercontent.com/Mictronics/readsb/refs/heads/master/webapp/src/db/operators.json'
 range_miles = 20                                 # Change this to the radius of the notification zone (in miles)
+arrival_alerts = False                           # Also alert on aircraft predicted to come within range_miles in the next arrival_horizon seconds ("Arriving: in 40s"), from their track and ground speed, so fast aircraft are caught before they cross the zone between updates (not used with alert_zones)
+arrival_horizon = 120                            # How far ahead (in seconds) arrivals are predicted
+departure_alerts = False                         # Also notify when an aircraft that alerted leaves range_miles (or its zones) or drops out of coverage
+track_timeout = 60                               # Seconds readsb can go without hearing an aircraft (its 'seen') before the aircraft counts as out of coverage
 min_alert_period = 600                           # Change this to the number of seconds to wait before alerting again for the same aircraft
+alert_state_path = "~/.birdalert_alerts.json"    # Where recent alert times are saved so a restart doesn't re-alert on aircraft overhead (set to '' to disable)
+alert_state_save_interval = 60                   # How often (in seconds) recent alert times are saved to alert_state_path
+instance_lock_path = "~/.birdalert.lock"         # Lock file that stops a second copy of the script from starting
+history_path = "~/.birdalert_history.db"         # SQLite history of every aircraft that came within range (see python3 BirdAlert.py --help for queries; set to '' to disable)
+history_visit_gap = 900                          # Seconds an aircraft must be out of range before its return counts as a new sighting
+correlate_tisb_tracks = True                     # Follow TIS-B aircraft (hex codes starting with '~') across hex changes so each is alerted once per min_alert_period
+tisb_correlation_radius = 1.0                    # Miles between a new '~' hex and a track's predicted position for them to be treated as the same aircraft
+tisb_correlation_altitude = 500                  # Feet of altitude difference allowed when matching a new '~' hex to a track
+tisb_track_timeout = 60                          # Seconds a TIS-B track is kept without a new position
 include_military_check = True                    # Change to False if you don't want to alert based on the military flag being set or the hex falling within the military range  (True will alert regardless of other settings)
+military_ranges_path = "military_ranges.txt"     # File of hex ranges reserved for military use (relative to this script). The built-in ranges are used if it's missing
 include_emergency_check = True                   # Change to False if you don't want to alert based on the emergency flag being set (True will alert regardless of other settings)
 skip_commercial = True                           # Change to False to include alerts for commerical aircraft (doesn't effect notificaitons for emergency flag being set)
 transponder_types = [                            # Comment in/out rows corresponding to transponder types you want to receive alerts for
@@ -107,9 +161,114 @@ callsign_watch_list = [
     "CAP",                                         # Civil Air Patrol
 ]
 
+# Callsign prefixes of commercial airlines, ignored when skip_commercial is True
+commercial_callsign_prefixes = [
+    'AAL',                                         # American Airlines
+    'AAY',                                         # Allegiant Air
+    'ACA',                                         # Air Canada
+    'AFR',                                         # Air France
+    'AIC',                                         # Air India
+    'AMX',                                         # Aeromexico
+    'ANA',                                         # All Nippon Airways
+    'ASA',                                         # Alaska Airlines
+    'ASH',                                         # Mesa Airlines
+    'ATN',                                         # Air Transport International (Cargo)
+    'AWI',                                         # Air Wisconsin
+    'BAW',                                         # British Airways
+    'BTA',                                         # Envoy Air (formerly American Eagle)
+    'CFG',                                         # Condor
+    'CHQ',                                         # Chautauqua Airlines
+    'CPA',                                         # Cathay Pacific
+    'CRE',                                         # Corporate Air (Cargo)
+    'CXK',                                         # Kalitta Charters (Cargo)
+    'DAL',                                         # Delta Air Lines
+    'DLH',                                         # Lufthansa
+    'EIN',                                         # Aer Lingus
+    'EJA',                                         # NetJets (Charter)
+    'EJM',                                         # Executive Jet Management (Charter)
+    'ENY',                                         # Envoy Air
+    'ETD',                                         # Etihad Airways
+    'EZY',                                         # easyJet
+    'FDX',                                         # FedEx (Cargo)
+    'FDY',                                         # Southern Airways Express
+    'FFT',                                         # Frontier Airlines
+    'GES',                                         # Gestair (Charter)
+    'GJS',                                         # GoJet Airlines
+    'ICE',                                         # Icelandair
+    'JAL',                                         # Japan Airlines
+    'JBU',                                         # JetBlue Airways
+    'JIA',                                         # PSA Airlines
+    'JRE',                                         # flyExclusive (Charter)
+    'JSX',                                         # JetSuiteX (Charter)
+    'JTL',                                         # Jet Linx Aviation (Charter)
+    'JTZ',                                         # Nicholas Air (Charter)
+    'KAL',                                         # Korean Air
+    'KLM',                                         # KLM Royal Dutch Airlines
+    'LOF',                                         # Trans States Airlines
+    'LXJ',                                         # Flexjet (Charter)
+    'LYM',                                         # Key Lime Air (Cargo/Regional)
+    'MVJ',                                         # Marvel Air Services (Charter)
+    'MXY',                                         # Breeze Airways
+    'NKS',                                         # Spirit Airlines
+    'PDT',                                         # Piedmont Airlines
+    'QFA',                                         # Qantas
+    'QXE',                                         # Horizon Air
+    'RPA',                                         # Republic Airways
+    'RYR',                                         # Ryanair
+    'SAS',                                         # Scandinavian Airlines
+    'SCX',                                         # Sun Country Airlines (Charter)
+    'SIA',                                         # Singapore Airlines
+    'SKW',                                         # SkyWest Airlines
+    'SWA',                                         # Southwest Airlines
+    'SWQ',                                         # Swift Air (Charter)
+    'THA',                                         # Thai Airways
+    'TSC',                                         # Air Transat
+    'TWY',                                         # Solairus Aviation (Charter)
+    'UAL',                                         # United Airlines
+    'UAE',                                         # Emirates
+    'UJC',                                         # Ultimate Jetcharters (Charter)
+    'UPS',                                         # United Parcel Service (Cargo)
+    'VIR',                                         # Virgin Atlantic
+    'VJA',                                         # Vista America (Charter)
+    'VOI',                                         # Volaris
+    'VRD',                                         # Virgin America (now merged with Alaska Airlines)
+    'WJA',                                         # WestJet
+    'XSR',                                         # Executive AirShare (Charter)
+]
+
+# Alert rules, checked from top to bottom. The first rule whose conditions all match decides what happens:
+# 'alert' sends a notification and adds the aircraft to the table, 'ignore' stops checking the aircraft.
+# Conditions: 'hex' (collection of hex codes), 'callsign_prefixes', 'emergency' (True if any emergency is
+# declared), 'military' (True if flagged or within the military hex ranges), 'transponder_types',
+# 'max_distance' (miles, for rules that should only fire closer than range_miles), 'schedule' (active windows
+# like active_windows, ex. 'schedule': [([0, 1, 2, 3, 4, 5, 6], '07:00', '21:00')] to only alert in daytime),
+# 'type_codes' (ICAO type designators, ex. ['C130', 'V22']), 'aircraft_classes' (ICAO classes from types.json,
+# '*' and '?' allowed, ex. ['H*'] for helicopters or ['L4T'] for four-engine turboprops) and 'operators'
+# (ICAO operator codes or names from operators.json, ex. ['RCH', 'Civil Air Patrol'], matched against the callsign).
+alert_rules = [
+    {'name': "Hex code in watch list", 'hex': hex_watch_list},
+    {'name': "Callsign in watch list", 'callsign_prefixes': callsign_watch_list},
+    {'name': "Emergency flag set", 'emergency': True, 'enabled': include_emergency_check},
+    {'name': "Commercial airline", 'callsign_prefixes': commercial_callsign_prefixes, 'action': 'ignore', 'enabled': skip_commercial},
+    {'name': "Military aircraft", 'military': True, 'enabled': include_military_check},
+    {'name': "Matches desired transponder type", 'transponder_types': transponder_types},
+]
+
 # Your location
-your_lat = latitude_here  # change this to the latitude of the notification zone (ex. 40.12345)
-your_lon = longitude_here  # change this to the longitude of the notification zone (ex -104.12345)
+your_lat = None  # change this to the latitude of the notification zone (ex. 40.12345)
+your_lon = None  # change this to the longitude of the notification zone (ex -104.12345)
+
+# Alert zones. Leave empty to alert on aircraft within range_miles of your location. Each zone is a circle
+# ('circle': (lat, lon, radius in miles)) or a polygon ('polygon': [(lat, lon), ...]) and may set
+# 'min_altitude'/'max_altitude' (feet), 'rules' (names from alert_rules to use in the zone, all of them by
+# default) and 'notify' (channels for the zone's alerts, ex. ['telegram'], all configured channels by default).
+# The rules a zone uses can't have 'max_distance', which measures from your location; use a smaller zone instead.
+alert_zones = [
+#   {'name': "Home", 'circle': (40.12345, -104.12345, 5)},
+#   {'name': "Stadium TFR", 'circle': (39.7439, -105.0201, 3.45), 'max_altitude': 3000, 'notify': ['pushover']},
+#   {'name': "Airport approach", 'polygon': [(39.95, -104.75), (39.95, -104.60), (39.80, -104.60), (39.80, -104.75)],
+#    'max_altitude': 8000, 'rules': ["Military aircraft", "Emergency flag set"]},
+]
 
 # Choose as many of the following notification methods as you like (it's not necessary to comment them out if you don't use them).
 # The script will try them in order and stop after the first successful notification is sent.
@@ -119,6 +278,7 @@ your_email = ''  # change this to your email
 your_email_app_password = ''  # change this to your email app password
 your_smtp_server = ''  # change this to your email SMTP domain
 your_smtp_port = 587
+your_smtp_starttls = True  # change to False only if your SMTP server doesn't support STARTTLS
 
 # Phone configuration (required for email-to-SMS only)
 phone_number = ""  # Replace with the recipient's phone number (no dashes or spaces)
@@ -145,27 +305,275 @@ twilio_sid = ''
 twilio_auth_token = ''
 twilio_phone_number = ''
 
+# Notification delivery (alerts are queued and sent in the background so a slow channel never stalls tracking)
+notification_workers = 2                         # Number of background threads delivering alerts
+notification_queue_size = 100                    # Maximum number of messages waiting to be delivered
+notification_queue_policy = 'drop_oldest'        # When the queue is full: 'drop_oldest' discards the oldest waiting alert, 'drop_newest' discards the new one
+notification_digest_window = 0                   # Alerts are combined into one digest message per channel: 0 combines each poll cycle's alerts, or set the seconds to keep collecting after the first alert
+notification_digest_max = 20                     # Most aircraft listed in one digest (any more go in the next message)
+notification_rate_limits = {                     # Messages each channel may send: (per minute, burst). Digests wait for the channel to allow another message; emergency alerts are sent at once
+    'telegram': (18, 2),
+    'email_sms': (4, 2),
+    'twilio': (6, 3),
+    'pushover': (20, 5),
+}
+notification_timeouts = {                        # Seconds to wait for each channel before giving up and trying the next one
+    'email': 20,
+    'telegram': 10,
+    'email_sms': 20,
+    'twilio': 15,
+    'ifttt': 10,
+    'signal': 30,
+    'pushover': 10,
+}
+connection_idle_timeout = 240                    # Seconds an idle pooled HTTP/SMTP connection is kept before it is replaced with a fresh one
+
+# Metrics and profiling (for finding slow spots on your receiver)
+metrics_enabled = True                           # Record timing histograms and counters for each stage of the poll loop
+metrics_http_port = 0                            # Serve Prometheus metrics at http://<receiver>:<port>/metrics (0 to disable)
+metrics_textfile_path = ''                       # Write metrics for the node-exporter textfile collector, ex. '/var/lib/node_exporter/textfile_collector/birdalert.prom' ('' to disable)
+profile_signal = 'SIGUSR1'                       # Send this signal (pkill -USR1 -f BirdAlert.py) to start profiling and again to stop and save the profile ('' to disable)
+profile_dump_dir = '~'                           # Folder where profiles are saved as birdalert-<time>.prof (view with python3 -m pstats)
+
+# Recording and replay (re-run the alert rules on recorded traffic with: python3 BirdAlert.py --replay ~/birdalert-recordings)
+record_path = ''                                 # Folder to record every aircraft snapshot into for later replay, ex. '~/birdalert-recordings' ('' to disable)
+record_max_mb = 200                              # Disk space the recordings may use; the oldest recording files are deleted first
+record_file_minutes = 60                         # Minutes of data per recording file
+
 #############################################################
 
-# Detect if 3 or more BirdAlert processes are already running (since cron uses 2)
-def is_script_running():
+# Open lock file held for as long as the script runs
+instance_lock = None
+
+# Function to make sure only one copy runs. The lock belongs to the open file, so the system releases it
+# when the process exits, even if it is killed, and a stale lock file never blocks a restart.
+def acquire_instance_lock():
+    global instance_lock
+    lock_file = open(os.path.expanduser(instance_lock_path), 'a+')
     try:
-        result = subprocess.run(['pgrep', '-f',"BirdAlert.py"], capture_output=True, text=True)
-        pids = result.stdout.strip().split('\n')
-        return len(pids) >= 3
-    except Exception as e:
-        print(f"Error checking script status: {e}")
+        try:
+            import fcntl
+        except ImportError:  # Windows
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
         return False
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(f"{os.getpid()}\n")  # For finding the running copy, ex. kill $(cat ~/.birdalert.lock)
+    lock_file.flush()
+    instance_lock = lock_file
+    return True
+
+# Low-overhead timing histogram with fixed buckets, exported in Prometheus format
+class Histogram:
+    buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)  # The last count is for values above the largest bucket
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, fraction):
+        """Approximate quantile: the upper bound of the bucket holding it."""
+        with self.lock:
+            target = fraction * self.count
+            seen = 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if count and seen >= target:
+                    return bound
+        return float('inf') if self.count else 0.0
+
+# Histograms and counters keyed by (metric name, label string), ex. ('birdalert_stage_seconds', 'stage="display_alerts"')
+metrics_histograms = {}
+metrics_counters = {}
+metrics_counters_lock = threading.Lock()  # Counted from the poll loop and the notification threads
+metrics_gauges = {}
+metrics_help = {
+    'birdalert_stage_seconds': "Time spent in each stage of the poll loop",
+    'birdalert_notification_delivery_seconds': "Time taken to deliver an alert through each channel",
+    'birdalert_aircraft_processed_total': "Aircraft read from aircraft.json",
+    'birdalert_aircraft_evaluated_total': "Aircraft that went through the alert rules",
+    'birdalert_alerts_fired_total': "Alerts sent for delivery",
+    'birdalert_alerts_suppressed_total': "Alerts skipped because the aircraft alerted within min_alert_period",
+    'birdalert_arrivals_predicted_total': "Aircraft outside range_miles predicted to enter it within arrival_horizon",
+    'birdalert_track_events_total': "Aircraft entering the area, updating inside it and leaving it (or dropping out of coverage)",
+    'birdalert_notification_queue_depth': "Alerts waiting for a notification worker",
+    'birdalert_notification_digests_total': "Digest messages combining the alerts of a cycle or notification_digest_window",
+    'birdalert_notification_rate_limited_total': "Messages held back by a channel's rate limit",
+    'birdalert_source_fetch_seconds': "Time taken to read each aircraft source",
+    'birdalert_stream_messages_total': "Messages read from the readsb SBS/JSON stream",
+    'birdalert_stream_connects_total': "Connections opened to the readsb SBS/JSON stream",
+}
+
+def observe_metric(name, value, labels=''):
+    histogram = metrics_histograms.get((name, labels))
+    if histogram is None:
+        histogram = metrics_histograms.setdefault((name, labels), Histogram())
+    histogram.observe(value)
+
+def count_metric(name, amount=1, labels=''):
+    key = (name, labels)
+    with metrics_counters_lock:
+        metrics_counters[key] = metrics_counters.get(key, 0) + amount
+
+# Decorator recording how long each call of a poll loop stage takes
+def timed(stage):
+    labels = f'stage="{stage}"'
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics_enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe_metric('birdalert_stage_seconds', time.perf_counter() - start, labels)
+        return wrapper
+    return decorator
+
+# Function to render every metric in the Prometheus text exposition format
+def render_metrics():
+    if notification_queue is not None:
+        metrics_gauges[('birdalert_notification_queue_depth', '')] = notification_queue.qsize()
+    lines = []
+    described = set()
+
+    def describe(name, kind):
+        if name not in described:
+            described.add(name)
+            lines.append(f"# HELP {name} {metrics_help.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    def series(name, labels, extra=''):
+        joined = ','.join(label for label in (labels, extra) if label)
+        return f"{name}{{{joined}}}" if joined else name
+
+    with metrics_counters_lock:
+        counters = sorted(metrics_counters.items())
+    for (name, labels), value in counters:
+        describe(name, 'counter')
+        lines.append(f"{series(name, labels)} {value}")
+    for (name, labels), value in sorted(metrics_gauges.items()):
+        describe(name, 'gauge')
+        lines.append(f"{series(name, labels)} {value}")
+    for (name, labels), histogram in sorted(metrics_histograms.items()):
+        describe(name, 'histogram')
+        with histogram.lock:
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{series(name + '_bucket', labels, 'le=' + json.dumps(str(bound)))} {cumulative}")
+            lines.append(f"{series(name + '_bucket', labels, 'le=' + json.dumps('+Inf'))} {histogram.count}")
+            lines.append(f"{series(name + '_sum', labels)} {histogram.sum:.6f}")
+            lines.append(f"{series(name + '_count', labels)} {histogram.count}")
+    return "\n".join(lines) + "\n"
 
-if is_script_running():
-    print("Another instance of the script is already running.")
-    sys.exit()
+# Function to summarize the 90th percentile time of each stage for the terminal
+def metrics_summary():
+    parts = []
+    for (name, labels), histogram in sorted(metrics_histograms.items()):
+        if name == 'birdalert_stage_seconds' and histogram.count:
+            stage = labels[len('stage="'):-1]
+            parts.append(f"{stage} <{histogram.quantile(0.9) * 1000:g}ms")
+    return "Stage times (p90): " + ", ".join(parts) if parts else ""
 
-# Variable to load in aircrafts.json data
-aircrafts_data = None
+metrics_textfile_written_at = 0.0
 
-# Tracking last notification times
-last_notified = {}
+# Function to write metrics for the node-exporter textfile collector (atomically, so it never reads half a file)
+def write_metrics_textfile():
+    global metrics_textfile_written_at
+    if not metrics_textfile_path or time.monotonic() - metrics_textfile_written_at < 10:
+        return
+    metrics_textfile_written_at = time.monotonic()
+    path = os.path.expanduser(metrics_textfile_path)
+    try:
+        with open(f"{path}.tmp", 'w') as f:
+            f.write(render_metrics())
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        print(f"Error writing metrics to {path}: {e}")
+
+# Function to serve /metrics for Prometheus from a background thread
+def start_metrics_server():
+    if not metrics_http_port:
+        return None
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = render_metrics().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = http.server.ThreadingHTTPServer(('', metrics_http_port), MetricsHandler)
+    except OSError as e:
+        print(f"Error starting metrics server on port {metrics_http_port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+# cProfile session started and stopped by profile_signal
+active_profile = None
+
+def toggle_profiler(signal_number, frame):
+    global active_profile
+    import cProfile
+    if active_profile is None:
+        active_profile = cProfile.Profile()
+        active_profile.enable()
+        print("Profiling started. Send the signal again to stop and save the profile.")
+        return
+    active_profile.disable()
+    path = os.path.join(os.path.expanduser(profile_dump_dir), f"birdalert-{datetime.now():%Y%m%d-%H%M%S}.prof")
+    try:
+        active_profile.dump_stats(path)
+        print(f"Profile saved to {path}")
+    except OSError as e:
+        print(f"Error saving profile to {path}: {e}")
+    active_profile = None
+
+def install_profiler_signal():
+    if not profile_signal:
+        return
+    import signal
+    signal_number = getattr(signal, profile_signal, None)
+    if signal_number is None:
+        print(f"Signal {profile_signal} isn't available on this system. Profiling disabled.")
+        return
+    signal.signal(signal_number, toggle_profiler)
+
+# Compact memory-mapped index built from the Mictronics aircraft database
+aircrafts_index = None
+
+# Tracking last notification times (an AlertSuppressionStore, created below)
+last_notified = None
 
 # Capture status of aircrafts.json for printing
 aircrafts_status = []
@@ -173,152 +581,791 @@ aircrafts_status = []
 # Handle file path if it uses a tilda
 aircrafts_json_path_expanded = os.path.expanduser(aircrafts_json_path)
 
-# Capture terminal output to be tabulated
-terminal_table = []
+# The binary index lives next to aircrafts.json and is rebuilt whenever the source changes
+aircrafts_index_path = aircrafts_json_path_expanded + ".idx"
 
-# Load the aircrafts JSON file once at the beginning
-try:
-    with open(aircrafts_json_path_expanded, 'r') as f:
-        aircrafts_data = json.load(f)
-except FileNotFoundError:
-    print(f"File not found: {aircrafts_json_path_expanded}")
-except json.JSONDecodeError:
-    print("Error decoding JSON response")
-
-os.system('clear' if os.name != 'nt' else 'cls')
-
-def is_today_selected_day(selected_days):
-    """Check if today is one of the selected days."""
-    today = datetime.now().weekday()  # Monday is 0 and Sunday is 6
-    return today in selected_days
-
-def run_schedule(active_start_time, active_end_time, selected_days):
-    """Check the schedule and wait if outside the permitted time or day."""
-    now = datetime.now()
-
-    # Check if today is one of the selected days
-    if is_today_selected_day(selected_days):
-        # Check if the current time is within the active start and end time
-        if active_start_time <= now.time() <= active_end_time:
-            print("Currently within scheduled hours. Tracking aircraft...")
-            return True
-        else:
-            print("Current time is outside the scheduled hours. Waiting...\n")
-    else:
-        print("Today is not a scheduled day. Waiting...\n")
+# Capture terminal output to be tabulated, keyed by hex so rows of unchanged aircraft carry over between cycles
+terminal_rows = {}
 
-    # If we reach here, we are either outside the time or it's not the selected day
-    time.sleep(5)  # Wait 5 seconds before the next check
-    return False
+# When each aircraft in the table last alerted, for sorting the curses view by alert time
+terminal_alert_times = {}
+
+# Function to pick the JSON decoder, returning (name, loads). loads accepts bytes or str and raises ValueError on bad input.
+def select_json_backend(name):
+    if name in ('auto', 'orjson'):
+        try:
+            import orjson
+            return 'orjson', orjson.loads  # orjson.JSONDecodeError is a ValueError
+        except ImportError:
+            pass
+    if name in ('auto', 'msgspec'):
+        try:
+            import msgspec
+            decode = msgspec.json.Decoder().decode
+
+            def msgspec_loads(data):
+                try:
+                    return decode(data)
+                except msgspec.DecodeError as e:
+                    raise ValueError(str(e)) from e
+            return 'msgspec', msgspec_loads
+        except ImportError:
+            pass
+    if name not in ('auto', 'json', 'orjson', 'msgspec'):
+        print(f"Unknown json_backend '{name}'. Using the standard json module.")
+    return 'json', json.loads
+
+json_backend_name, json_loads = select_json_backend(json_backend)
+
+# Layout of aircrafts.idx:
+#   header | ICAO addresses (sorted uint32) | records | string offsets | string blob | padding to 4 bytes |
+#   type posting offsets (uint32 per string id, plus one) | type postings (uint32 record numbers)
+# Record i holds the ids of the interned type and description strings and the Mictronics flag bits
+# for ICAO address i. String id 0 is always the empty string. The postings are the inverted index
+# from type to aircraft: the record numbers with type string id t are postings[offsets[t]:offsets[t + 1]].
+AIRCRAFTS_INDEX_MAGIC = b'BIRDIDX1'
+AIRCRAFTS_INDEX_VERSION = 2
+AIRCRAFTS_INDEX_HEADER = struct.Struct('<8sIIIIqq20s4x')  # magic, version, records, strings, reserved, source mtime_ns, source size, source sha1
+AIRCRAFTS_INDEX_RECORD = struct.Struct('<III')            # type id, description id, flags
+AIRCRAFTS_INDEX_OFFSET = struct.Struct('<I')
+
+class AircraftsIndex:
+    """Read-only view of aircrafts.idx using binary search over a memory map."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.string_count, _, self.source_mtime_ns, self.source_size, self.source_sha1 = \
+            AIRCRAFTS_INDEX_HEADER.unpack_from(self.buffer, 0)
+        if magic != AIRCRAFTS_INDEX_MAGIC or version != AIRCRAFTS_INDEX_VERSION:
+            self.buffer.close()
+            raise ValueError(f"{path} is not a compatible aircraft index")
+        self.keys_offset = AIRCRAFTS_INDEX_HEADER.size
+        self.records_offset = self.keys_offset + self.count * 4
+        self.keys = memoryview(self.buffer)[self.keys_offset:self.records_offset].cast('I')
+        self.string_offsets_offset = self.records_offset + self.count * AIRCRAFTS_INDEX_RECORD.size
+        self.string_blob_offset = self.string_offsets_offset + (self.string_count + 1) * AIRCRAFTS_INDEX_OFFSET.size
+        blob_size, = AIRCRAFTS_INDEX_OFFSET.unpack_from(self.buffer, self.string_offsets_offset + self.string_count * 4)
+        postings_offset = (self.string_blob_offset + blob_size + 3) & ~3
+        self.posting_offsets = memoryview(self.buffer)[postings_offset:postings_offset + (self.string_count + 1) * 4].cast('I')
+        postings_offset += (self.string_count + 1) * 4
+        self.postings = memoryview(self.buffer)[postings_offset:postings_offset + self.count * 4].cast('I')
+        self.strings = {}  # Decoded strings, filled on first use
+        self.type_string_ids = None  # Type designator -> string id, built on first use
+
+    def __len__(self):
+        return self.count
 
+    def close(self):
+        self.keys.release()
+        self.posting_offsets.release()
+        self.postings.release()
+        self.buffer.close()
 
+    def string(self, string_id):
+        value = self.strings.get(string_id)
+        if value is None:
+            start, = AIRCRAFTS_INDEX_OFFSET.unpack_from(self.buffer, self.string_offsets_offset + string_id * 4)
+            end, = AIRCRAFTS_INDEX_OFFSET.unpack_from(self.buffer, self.string_offsets_offset + string_id * 4 + 4)
+            value = self.buffer[self.string_blob_offset + start:self.string_blob_offset + end].decode('utf-8')
+            self.strings[string_id] = value
+        return value
 
-# Function to support downloading updated Mictronics aircraft database
-def download_file(url, path):
+    def find(self, icao):
+        """Return (type, description, flags) for a 24-bit ICAO address, or None if it is not in the database."""
+        position = bisect_left(self.keys, icao)
+        if position == self.count or self.keys[position] != icao:
+            return None
+        type_id, description_id, flags = AIRCRAFTS_INDEX_RECORD.unpack_from(
+            self.buffer, self.records_offset + position * AIRCRAFTS_INDEX_RECORD.size)
+        return self.string(type_id), self.string(description_id), flags
+
+    def get(self, hex_code):
+        try:
+            icao = int(hex_code.lstrip('~'), 16)
+        except (AttributeError, ValueError):
+            return None
+        return self.find(icao)
+
+    def type_counts(self):
+        """Return {type designator: number of aircraft} for every type in the database."""
+        if self.type_string_ids is None:
+            offsets = self.posting_offsets
+            self.type_string_ids = {self.string(string_id): string_id for string_id in range(1, self.string_count)
+                                    if offsets[string_id + 1] > offsets[string_id]}
+        offsets = self.posting_offsets
+        return {type_code: offsets[string_id + 1] - offsets[string_id] for type_code, string_id in self.type_string_ids.items()}
+
+    def hexes_for_types(self, type_codes):
+        """Return the hex codes (lowercase, as in aircraft.json) of every aircraft of the given types."""
+        if self.type_string_ids is None:
+            self.type_counts()
+        keys, postings, offsets = self.keys, self.postings, self.posting_offsets
+        hexes = set()
+        for type_code in type_codes:
+            string_id = self.type_string_ids.get(type_code)
+            if string_id is not None:
+                hexes.update(f"{keys[position]:06x}" for position in postings[offsets[string_id]:offsets[string_id + 1]])
+        return frozenset(hexes)
+
+# Convert the Mictronics "f" field (ex. "10") into bits: bit 0 military, bit 1 interesting, etc.
+def parse_mictronics_flags(flags):
+    bits = 0
+    for position, char in enumerate(flags or ''):
+        if char == '1':
+            bits |= 1 << position
+    return bits
+
+# Hash the source file so a touched but unchanged aircrafts.json doesn't trigger a rebuild
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+# Function to convert aircrafts.json into the sorted binary index
+def build_aircrafts_index(source_path, index_path, source_sha1=None):
+    with open(source_path, 'rb') as f:
+        data = json_loads(f.read())
+
+    strings = {'': 0}
+    string_list = ['']
+
+    def intern(value):
+        value = value or ''
+        string_id = strings.get(value)
+        if string_id is None:
+            string_id = strings[value] = len(string_list)
+            string_list.append(value)
+        return string_id
+
+    records = []
+    for hex_code, entry in data.items():
+        try:
+            icao = int(hex_code.lstrip('~'), 16)
+        except ValueError:
+            continue
+        if not isinstance(entry, dict) or icao > 0xFFFFFF:
+            continue
+        records.append((icao, intern(entry.get('t')), intern(entry.get('d')), parse_mictronics_flags(entry.get('f'))))
+    del data
+    records.sort()
+
+    source_stat = os.stat(source_path)
+    if source_sha1 is None:
+        source_sha1 = file_sha1(source_path)
+
+    # Record numbers grouped by type; the sort is stable, so each type's records stay in address order
+    by_type = sorted(range(len(records)), key=lambda position: records[position][1])
+    type_counts = [0] * (len(string_list) + 1)
+    for record in records:
+        type_counts[record[1] + 1] += 1
+    for string_id in range(len(string_list)):
+        type_counts[string_id + 1] += type_counts[string_id]
+
+    encoded = [value.encode('utf-8') for value in string_list]
+    temp_path = f"{index_path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        f.write(AIRCRAFTS_INDEX_HEADER.pack(AIRCRAFTS_INDEX_MAGIC, AIRCRAFTS_INDEX_VERSION, len(records), len(encoded), 0,
+                                            source_stat.st_mtime_ns, source_stat.st_size, source_sha1))
+        # The index is a local cache, so addresses use native byte order for zero-copy bisection
+        f.write(struct.pack(f'={len(records)}I', *(record[0] for record in records)))
+        for record in records:
+            f.write(AIRCRAFTS_INDEX_RECORD.pack(*record[1:]))
+        offset = 0
+        for value in encoded:
+            f.write(AIRCRAFTS_INDEX_OFFSET.pack(offset))
+            offset += len(value)
+        f.write(AIRCRAFTS_INDEX_OFFSET.pack(offset))
+        for value in encoded:
+            f.write(value)
+        f.write(b'\0' * (-f.tell() % 4))
+        f.write(struct.pack(f'={len(type_counts)}I', *type_counts))
+        f.write(struct.pack(f'={len(by_type)}I', *by_type))
+    os.replace(temp_path, index_path)  # Readers that still map the old index keep a valid view of it
+
+# Function to build the index in a child process. Parsing and sorting the database hold the GIL for
+# seconds on a Raspberry Pi, which would otherwise stall the poll loop running in the main thread.
+def build_aircrafts_index_in_child(source_path, index_path, source_sha1=None):
+    import multiprocessing
+    builder = multiprocessing.Process(target=build_aircrafts_index, args=(source_path, index_path, source_sha1), daemon=True)
+    builder.start()
+    builder.join()
+    if builder.exitcode != 0:
+        raise ValueError(f"{source_path} couldn't be indexed")
+
+# Function to open aircrafts.idx, rebuilding it only when aircrafts.json has actually changed.
+# Returns the index, or None if there is no database or it couldn't be indexed.
+def open_aircrafts_index(build=build_aircrafts_index):
     try:
-        file_response = requests.get(url)
-        if file_response.status_code == 200:
-            with open(path, 'wb') as f:
-                f.write(file_response.content)
-            print(f"{path} has been downloaded.\n")
-        else:
-            print(f"Failed to download the file. HTTP Status: {file_response.status_code}\n")
-    except Exception as e:
-        print(f"Error downloading file: {e}\n")
+        source_stat = os.stat(aircrafts_json_path_expanded)
+    except FileNotFoundError:
+        source_stat = None
+
+    index = None
+    try:
+        index = AircraftsIndex(aircrafts_index_path)
+    except (FileNotFoundError, ValueError):
+        pass
+
+    if source_stat is None and index is None:
+        print(f"File not found: {aircrafts_json_path_expanded}")
+        return None
+
+    if source_stat is not None and (index is None or (index.source_mtime_ns, index.source_size) != (source_stat.st_mtime_ns, source_stat.st_size)):
+        try:
+            source_sha1 = file_sha1(aircrafts_json_path_expanded)
+            if index is not None and index.source_sha1 == source_sha1:
+                # Same content with a new timestamp, so only the header needs refreshing
+                with open(aircrafts_index_path, 'r+b') as f:
+                    f.seek(struct.calcsize('<8sIIII'))  # Offset of the source mtime_ns and size fields
+                    f.write(struct.pack('<qq', source_stat.st_mtime_ns, source_stat.st_size))
+            else:
+                build(aircrafts_json_path_expanded, aircrafts_index_path, source_sha1)
+                if index is not None:
+                    index.close()
+                index = AircraftsIndex(aircrafts_index_path)
+        except (OSError, ValueError) as e:  # json.JSONDecodeError is a ValueError
+            print(f"Error building aircraft index from {aircrafts_json_path_expanded}: {e}")
+    return index
+
+# Function to load the aircraft index in the calling thread
+def load_aircrafts_index():
+    global aircrafts_index
+    index = open_aircrafts_index()
+    if index is None:
+        return  # Keep whatever index is already loaded
+    old_index = aircrafts_index
+    aircrafts_index = index
+    if old_index is not None:
+        old_index.close()
+    refresh_database_rules()
+
+# Look up the aircraft type description shown in alerts and in the terminal table
+def get_aircraft_type_info(hex_code):
+    if aircrafts_index is None:
+        return 'Pending' if aircrafts_db_updater is not None and aircrafts_db_updater.loading else 'Unknown'
+    aircraft_entry = aircrafts_index.get(hex_code)
+    if aircraft_entry:
+        if not aircraft_entry[1] and mictronics_tables is not None and aircraft_entry[0] in mictronics_tables.types:
+            return mictronics_tables.types[aircraft_entry[0]][0]  # No description of its own, so the type's
+        return aircraft_entry[1] or aircraft_entry[0] or 'Unknown'
+    return 'Unknown'
+
+# An operator in a rule written as an ICAO operator code (three uppercase letters, ex. 'RCH') rather than a name,
+# the same whether or not operators.json has loaded
+def is_icao_operator_code(operator):
+    return len(operator) == 3 and operator.isalpha() and operator.isupper()
+
+# The Mictronics types and operators databases joined into lookup tables, with the inverted indexes
+# the type, class and operator rules need: ICAO class -> type designators, and operator name or radio
+# callsign -> ICAO operator codes (an operator's code is the prefix of its callsigns). Type designator ->
+# aircraft is the postings section of aircrafts.idx.
+class MictronicsTables:
+    def __init__(self, types, operators):
+        # types.json: {"C130": ["LOCKHEED C-130 Hercules", "L4T", "M"]}, operators.json: {"RCH": ["Air Mobility Command", "United States", "REACH"]}
+        self.types = {type_code.upper(): (entry[0] or '', entry[1] or '', entry[2] or '' if len(entry) > 2 else '')
+                      for type_code, entry in types.items() if isinstance(entry, list) and len(entry) >= 2}
+        self.type_codes_by_class = {}
+        for type_code, (_, icao_class, _) in self.types.items():
+            self.type_codes_by_class.setdefault(icao_class.upper(), []).append(type_code)
+        self.operators = {code.upper(): tuple(entry[:3]) for code, entry in operators.items() if isinstance(entry, list) and entry}
+        self.operator_codes_by_name = {}
+        for code, entry in self.operators.items():
+            for name in (entry[0], entry[2] if len(entry) > 2 else None):
+                if name:
+                    self.operator_codes_by_name.setdefault(name.lower(), []).append(code)
+
+    def type_codes_matching(self, classes):
+        """Return the type designators whose ICAO class matches any of the patterns (ex. 'H*', 'L4T')."""
+        import fnmatch  # Only needed for class rules
+        patterns = [pattern.upper() for pattern in classes]
+        return {type_code for icao_class, type_codes in self.type_codes_by_class.items()
+                if any(fnmatch.fnmatchcase(icao_class, pattern) for pattern in patterns) for type_code in type_codes}
+
+    def operator_codes(self, operators):
+        """Return the ICAO codes for operator codes or names. A name that isn't an exact match matches every operator containing it."""
+        codes = set()
+        for operator in operators:
+            if is_icao_operator_code(operator):
+                codes.add(operator)
+            elif operator.lower() in self.operator_codes_by_name:
+                codes.update(self.operator_codes_by_name[operator.lower()])
+            else:
+                codes.update(code for name, name_codes in self.operator_codes_by_name.items() if operator.lower() in name for code in name_codes)
+        return codes
+
+mictronics_tables = None
+
+# Function to read types.json and operators.json into MictronicsTables. Either file may be missing
+# (they are downloaded along with aircrafts.json); None if neither could be read.
+def read_mictronics_tables(types_path, operators_path):
+    loaded = []
+    for path in (types_path, operators_path):
+        try:
+            with open(path, 'rb') as f:
+                data = json_loads(f.read())
+            loaded.append(data if isinstance(data, dict) else {})
+        except FileNotFoundError:
+            loaded.append({})
+        except (OSError, ValueError) as e:
+            print(f"Error reading {path}: {e}")
+            loaded.append({})
+    return MictronicsTables(*loaded) if any(loaded) else None
+
+def load_mictronics_tables():
+    global mictronics_tables
+    mictronics_tables = read_mictronics_tables(os.path.expanduser(types_json_path), os.path.expanduser(operators_json_path))
+    refresh_database_rules()
+
+WEEK_SECONDS = 7 * 86400
+
+# Function to find where a time falls in the week, in seconds since Sunday 00:00 local time
+def week_position(timestamp):
+    local = time.localtime(timestamp)
+    return ((local.tm_wday + 1) % 7) * 86400 + local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec + timestamp % 1
+
+# Function to read an 'HH:MM' time as seconds after midnight
+def parse_clock_time(text):
+    hour, minute = (int(part) for part in text.split(':'))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time of day: {text}")
+    return hour * 3600 + minute * 60
+
+# A weekly set of active windows: (days, 'HH:MM' start, 'HH:MM' end), with days counted from Sunday = 0.
+# The end minute is included, and an end before the start runs past midnight into the next day. The windows
+# are merged into sorted intervals of the week, so finding the state and the next change is one bisect, and
+# active is only worked out again once changes_at has passed rather than for every aircraft.
+class Schedule:
+    def __init__(self, windows):
+        intervals = []
+        for days, start, end in windows:
+            start, end = parse_clock_time(start), parse_clock_time(end) + 60
+            if end <= start:
+                end += 86400  # Overnight
+            for day in days:
+                if not 0 <= day <= 6:
+                    raise ValueError(f"Invalid day {day} in schedule (0 is Sunday, 6 is Saturday)")
+                first, last = day * 86400 + start, day * 86400 + end
+                intervals.append((first, min(last, WEEK_SECONDS)))
+                if last > WEEK_SECONDS:
+                    intervals.append((0, last - WEEK_SECONDS))  # Saturday night into Sunday morning
+        merged = []
+        for first, last in sorted(intervals):
+            if merged and first <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        self.intervals = [tuple(interval) for interval in merged]
+        self.starts = [first for first, _ in self.intervals]
+        self.active = bool(self.intervals)
+        self.checked_at = self.changes_at = None
+
+    def state_at(self, timestamp):
+        """Return (active, seconds until that changes), which is infinite if it never does."""
+        intervals = self.intervals
+        if not intervals:
+            return False, float('inf')
+        if intervals == [(0, WEEK_SECONDS)]:
+            return True, float('inf')
+        position = week_position(timestamp)
+        index = bisect_right(self.starts, position) - 1
+        if index >= 0 and position < intervals[index][1]:
+            end = intervals[index][1]
+            if end == WEEK_SECONDS and intervals[0][0] == 0:
+                end += intervals[0][1]  # Carries on past Saturday midnight
+            return True, end - position
+        if index + 1 < len(intervals):
+            return False, intervals[index + 1][0] - position
+        return False, WEEK_SECONDS - position + intervals[0][0]
+
+    def update(self, timestamp):
+        """Bring active up to date for timestamp. Cheap unless the state has changed since the last call."""
+        if self.changes_at is not None and self.checked_at <= timestamp < self.changes_at:
+            return self.active
+        self.active, wait = self.state_at(timestamp)
+        self.checked_at = timestamp
+        # The wait is in wall clock time, so a change across a daylight saving switch lands on the right local time
+        self.changes_at = (datetime.fromtimestamp(timestamp) + timedelta(seconds=wait)).timestamp() if wait != float('inf') else wait
+        return self.active
+
+# Schedule built from active_windows, or from the active hours and selected_days
+tracking_schedule = None
+
+def build_tracking_schedule():
+    global tracking_schedule
+    tracking_schedule = Schedule(active_windows or [(selected_days, f"{active_start_hour:02d}:{active_start_minute:02d}",
+                                                     f"{active_end_hour:02d}:{active_end_minute:02d}")])
+    return tracking_schedule
+
+# Function to check the schedule, and outside the active windows sleep until the next one starts. The
+# sleep is split into hours at most so a clock change or a suspended system doesn't oversleep by long.
+def run_schedule(schedule):
+    if schedule.update(time.time()):
+        return True
+    if schedule.changes_at == float('inf'):
+        print("The schedule has no active windows. Check active_windows, selected_days and the active hours.\n")
+    else:
+        print(f"Outside the scheduled hours. Sleeping until {datetime.fromtimestamp(schedule.changes_at):%a %H:%M}...\n")
+    while True:
+        remaining = schedule.changes_at - time.time()
+        if remaining <= 0:
+            return False
+        time.sleep(min(remaining, 3600))
+
+# Downloads newer versions of the Mictronics database in a background thread. The download is
+# conditional (ETag/If-Modified-Since), streamed to a temporary file, and only replaces aircrafts.json
+# once the index built from it looks complete. The new index is handed to the poll loop, which swaps
+# it in between cycles, so lookups never see a half-written file or a closed map.
+class AircraftsDatabaseUpdater:
+    chunk_size = 1 << 20
+    retry_delay = 3600  # Seconds before trying again after a failed download
+    min_kept_share = 0.5  # A new database with fewer entries than this share of the current one is rejected
+
+    def __init__(self, url, path, index_path, refresh_interval):
+        self.url = url
+        self.path = path
+        self.index_path = index_path
+        self.meta_path = path + ".meta"
+        self.refresh_interval = refresh_interval
+        self.session = None
+        self.thread = None
+        self.new_index = None
+        self.handover_lock = threading.Lock()  # Guards new_index and new_tables between this thread and the main loop
+        self.loading = False
+        self.status = "Mictronics database not checked yet"
+        self.meta = {}
+        try:
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        # types.json and operators.json, checked and downloaded after aircrafts.json
+        self.companions = [(types_db_url, os.path.expanduser(types_json_path)), (operators_db_url, os.path.expanduser(operators_json_path))]
+        self.new_tables = None
+        # Checked once here rather than with a stat call every cycle
+        have_files = os.path.exists(path) and all(os.path.exists(companion_path) for _, companion_path in self.companions)
+        self.next_check = self.meta.get('checked', 0) + refresh_interval if have_files else 0
+
+    def start_if_due(self, current_time):
+        if current_time < self.next_check or (self.thread is not None and self.thread.is_alive()):
+            return
+        self.next_check = current_time + self.refresh_interval
+        self.thread = threading.Thread(target=self.refresh, name='aircrafts-db-refresh', daemon=True)
+        self.thread.start()
+
+    # Opens the database already on disk (reindexing it if it changed) while the first polls run.
+    # Type info reads 'Pending' until the index has been swapped in.
+    def start_loading(self):
+        self.loading = True
+        self.status = "Loading the Mictronics database..."
+        self.thread = threading.Thread(target=self.load, name='aircrafts-db-load', daemon=True)
+        self.thread.start()
+
+    def load(self):
+        self.offer_tables(read_mictronics_tables(*(companion_path for _, companion_path in self.companions)))
+        index = open_aircrafts_index(build_aircrafts_index_in_child)
+        self.offer_index(index)
+        self.status = f"Mictronics database loaded ({len(index)} aircraft)" if index is not None else "Mictronics database not found"
+
+    # Function to hand a new index to the main loop, closing one it hasn't taken yet
+    def offer_index(self, index):
+        if index is None:
+            return
+        with self.handover_lock:
+            replaced, self.new_index = self.new_index, index
+        if replaced is not None:
+            replaced.close()
+
+    def offer_tables(self, tables):
+        if tables is None:
+            return
+        with self.handover_lock:
+            self.new_tables = tables
+
+    def take_new_index(self):
+        finished = self.thread is None or not self.thread.is_alive()
+        with self.handover_lock:
+            index, self.new_index = self.new_index, None
+        if finished:
+            self.loading = False  # Anything the load produced was taken above
+        return index
+
+    def take_new_tables(self):
+        with self.handover_lock:
+            tables, self.new_tables = self.new_tables, None
+        return tables
+
+    def save_meta(self):
+        temp_path = f"{self.meta_path}.tmp{os.getpid()}"
+        with open(temp_path, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(temp_path, self.meta_path)
+
+    def refresh(self):
+        try:
+            self.download()
+            self.download_companions()
+        except Exception as e:  # requests errors, a full disk, a database that doesn't parse
+            self.next_check = time.time() + self.retry_delay
+            self.status = f"Mictronics database refresh failed: {e}. Retrying in {self.retry_delay // 60} minutes"
+            count_metric('birdalert_aircrafts_db_refresh_failures_total')
+
+    def download(self):
+        have_file = os.path.exists(self.path)
+        headers = {}
+        if have_file and self.meta.get('etag'):
+            headers['If-None-Match'] = self.meta['etag']
+        if have_file and self.meta.get('last_modified'):
+            headers['If-Modified-Since'] = self.meta['last_modified']
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        self.status = "Checking for a newer Mictronics database..."
+        checked = time.time()
+        with self.session.get(self.url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code == 304:
+                self.meta['checked'] = checked
+                self.save_meta()
+                self.status = f"Mictronics database is up to date (checked {datetime.now():%H:%M})"
+                return
+            if response.status_code != 200:
+                raise ValueError(f"HTTP status {response.status_code}")
+            self.status = "Downloading a newer Mictronics database..."
+            temp_path = f"{self.path}.download{os.getpid()}"
+            temp_index_path = f"{self.index_path}.download{os.getpid()}"
+            try:
+                received = 0
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+                        received += len(chunk)
+                expected = response.headers.get('Content-Length')
+                if expected and not response.headers.get('Content-Encoding') and received != int(expected):
+                    raise ValueError(f"download ended after {received} of {expected} bytes")
+
+                build_aircrafts_index_in_child(temp_path, temp_index_path)
+                index = AircraftsIndex(temp_index_path)
+                current = aircrafts_index
+                if len(index) == 0 or (current is not None and len(index) < len(current) * self.min_kept_share):
+                    index.close()
+                    raise ValueError(f"new database has only {len(index)} aircraft")
+                # The index records the size and mtime of the file it was built from, which the rename keeps
+                os.replace(temp_path, self.path)
+                os.replace(temp_index_path, self.index_path)
+                index.path = self.index_path
+            finally:
+                for leftover in (temp_path, temp_index_path):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+            self.meta = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified'), 'checked': checked}
+            self.save_meta()
+        self.offer_index(index)
+        self.status = f"Mictronics database updated to {len(index)} aircraft ({datetime.now():%H:%M})"
+        count_metric('birdalert_aircrafts_db_updates_total')
+
+    # types.json and operators.json are small, so they are fetched whole (still conditionally) and
+    # replace the files only once they parse
+    def download_companions(self):
+        changed = False
+        for url, path in self.companions:
+            meta_path = path + ".meta"
+            meta = {}
+            if os.path.exists(path):
+                try:
+                    with open(meta_path) as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    pass
+            headers = {}
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+            response = self.session.get(url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                continue
+            if response.status_code != 200:
+                raise ValueError(f"HTTP status {response.status_code} for {url}")
+            data = json_loads(response.content)
+            if not isinstance(data, dict) or not data:
+                raise ValueError(f"{url} isn't a Mictronics database")
+            temp_path = f"{path}.download{os.getpid()}"
+            with open(temp_path, 'wb') as f:
+                f.write(response.content)
+            os.replace(temp_path, path)
+            with open(meta_path, 'w') as f:
+                json.dump({'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}, f)
+            changed = True
+        if changed or mictronics_tables is None:
+            self.offer_tables(read_mictronics_tables(*(path for _, path in self.companions)))
+
+aircrafts_db_updater = None
+
+# Function to create the updater for the configured database paths
+def start_aircrafts_db_updater():
+    global aircrafts_db_updater
+    aircrafts_db_updater = AircraftsDatabaseUpdater(aircrafts_db_url, aircrafts_json_path_expanded, aircrafts_index_path,
+                                                    aircrafts_db_refresh_interval)
+    return aircrafts_db_updater
 
 # Function to check if there is a newer version of the Mictronics aircraft database and then download it
+@timed('aircrafts_age_check')
 def aircrafts_age_check():
-    url = 'https://raw.githubusercontent.com/Mictronics/readsb/refs/heads/master/webapp/src/db/aircrafts.json'
-    global aircrafts_json_path_expanded
-    global aircrafts_data
-    time_check_file = '.time_check'
+    global aircrafts_index, aircrafts_status, mictronics_tables
+    if aircrafts_db_updater is None:
+        start_aircrafts_db_updater()
+    aircrafts_db_updater.start_if_due(time.time())
+    index = aircrafts_db_updater.take_new_index()
+    tables = aircrafts_db_updater.take_new_tables()
+    if tables is not None:
+        mictronics_tables = tables
+    if index is not None:
+        old_index = aircrafts_index
+        aircrafts_index = index
+        if old_index is not None:
+            old_index.close()
+    if index is not None or tables is not None:
+        refresh_database_rules()
+    aircrafts_status = aircrafts_db_updater.status
 
-    # Check if .time_check exists
-    is_new_time_check = False
-    if not os.path.exists(time_check_file):
-        is_new_time_check = True
-        open(time_check_file, 'a').close()  # Create the .time_check file
+# Built-in military ranges, used when military_ranges_path can't be read
+default_military_ranges = [
+    ("adf7c8", "afffff"),
+    ("010070", "01008f"),
+    ("0a4000", "0a4fff"),
+    ("33ff00", "33ffff"),
+    ("350000", "37ffff"),
+    ("3aa000", "3affff"),
+    ("3b7000", "3bffff"),
+    ("3ea000", "3ebfff"),
+    ("3f4000", "3fbfff"),
+    ("400000", "40003f"),
+    ("43c000", "43cfff"),
+    ("444000", "446fff"),
+    ("44f000", "44ffff"),
+    ("457000", "457fff"),
+    ("45f400", "45f4ff"),
+    ("468000", "4683ff"),
+    ("473c00", "473c0f"),
+    ("478100", "4781ff"),
+    ("480000", "480fff"),
+    ("48d800", "48d87f"),
+    ("497c00", "497cff"),
+    ("498420", "49842f"),
+    ("4b7000", "4b7fff"),
+    ("4b8200", "4b82ff"),
+    ("70c070", "70c07f"),
+    ("710258", "71028f"),
+    ("710380", "71039f"),
+    ("738a00", "738aff"),
+    ("7cf800", "7cfaff"),
+    ("800200", "8002ff"),
+    ("c20000", "c3ffff"),
+    ("e40000", "e41fff")
+]
 
-    # Check if aircrafts.json exists
-    is_new_aircrafts_json = not os.path.exists(aircrafts_json_path_expanded)
+# Sorted, merged interval table of military ranges: military_starts[i] <= hex <= military_ends[i]
+military_starts = []
+military_ends = []
 
-    # Check the last modified time of the .time_check file
-    last_check_time = os.path.getmtime(time_check_file)
-    current_time = time.time()
+# Military result per hex, kept only for aircraft in the current snapshot
+military_cache = {}
 
-    # If .time_check is new or it's been more than an hour since the last check
-    if is_new_time_check or (current_time - last_check_time) > 86400:
-        global aircrafts_status
-        if is_new_aircrafts_json:
-            aircrafts_status = (f"{aircrafts_json_path_expanded} not found. Downloading for the first time...\n")
-            download_file(url, aircrafts_json_path_expanded) # Download the latest aircrafts.json
+# Function to read "start end" hex pairs from the military ranges data file
+def read_military_ranges(path):
+    ranges = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            start, end = line.replace(',', ' ').split()
+            ranges.append((start, end))
+    return ranges
 
-            # Load the updated aircrafts.json
-            try:
-                with open(aircrafts_json_path_expanded, 'r') as f:
-                    aircrafts_data = json.load(f)
-            except FileNotFoundError:
-                print(f"File not found: {aircrafts_json_path_expanded}")
-            except json.JSONDecodeError:
-                print("Error decoding JSON response")
+# Function to compile hex string ranges into the sorted integer interval table
+def compile_military_ranges(ranges):
+    global military_starts
+    global military_ends
+    intervals = sorted((int(start, 16), int(end, 16)) for start, end in ranges)
+    starts = []
+    ends = []
+    for start, end in intervals:
+        if starts and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)  # Merge overlapping or adjacent ranges
         else:
-            pass
-#            aircrafts_status = ("More than 24 hours since last download of Micronics database. Downloading latest file...\n") # TBD feature to download the new aircrafts.json. There is no need to keep redownloading the same file here.
-        
-        # Update the .time_check file to the current time
-        os.utime(time_check_file, (current_time, current_time))
-    else:
-        aircrafts_status = ("Less than 1 hour since last check for updated Micronics database. Skipping check...")
+            starts.append(start)
+            ends.append(end)
+    military_starts = starts
+    military_ends = ends
+    military_cache.clear()
+
+def load_military_ranges():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.expanduser(military_ranges_path))
+    try:
+        ranges = read_military_ranges(path)
+    except FileNotFoundError:
+        ranges = default_military_ranges
+    except ValueError as e:
+        print(f"Error reading {path}: {e}. Using built-in military ranges.")
+        ranges = default_military_ranges
+    compile_military_ranges(ranges)
+
+compile_military_ranges(default_military_ranges)
+
+def is_military_hex_int(hex_int):
+    i = bisect_right(military_starts, hex_int) - 1
+    return i >= 0 and hex_int <= military_ends[i]
 
 def is_military_aircraft(hex_code):
-    # Remove the '~' character if it exists
-    hex_code = hex_code.lstrip('~')
-    
-    # Convert the hex code to an integer
-    hex_int = int(hex_code, 16)
-
-    military_ranges = [
-        ("adf7c8", "afffff"),
-        ("010070", "01008f"),
-        ("0a4000", "0a4fff"),
-        ("33ff00", "33ffff"),
-        ("350000", "37ffff"),
-        ("3aa000", "3affff"),
-        ("3b7000", "3bffff"),
-        ("3ea000", "3ebfff"),
-        ("3f4000", "3fbfff"),
-        ("400000", "40003f"),
-        ("43c000", "43cfff"),
-        ("444000", "446fff"),
-        ("44f000", "44ffff"),
-        ("457000", "457fff"),
-        ("45f400", "45f4ff"),
-        ("468000", "4683ff"),
-        ("473c00", "473c0f"),
-        ("478100", "4781ff"),
-        ("480000", "480fff"),
-        ("48d800", "48d87f"),
-        ("497c00", "497cff"),
-        ("498420", "49842f"),
-        ("4b7000", "4b7fff"),
-        ("4b8200", "4b82ff"),
-        ("70c070", "70c07f"),
-        ("710258", "71028f"),
-        ("710380", "71039f"),
-        ("738a00", "738aff"),
-        ("7cf800", "7cfaff"),
-        ("800200", "8002ff"),
-        ("c20000", "c3ffff"),
-        ("e40000", "e41fff")
-    ]
-
-    # Check if the hex code is within any of the military ranges
-    for start, end in military_ranges:
-        start_int = int(start, 16)
-        end_int = int(end, 16)
-        if start_int <= hex_int <= end_int:
-            return True
-    return False
+    result = military_cache.get(hex_code)
+    if result is None:
+        try:
+            result = is_military_hex_int(int(hex_code.lstrip('~'), 16))  # Remove the '~' character if it exists
+        except ValueError:
+            result = False
+    return result
+
+# Function to classify every hex in a snapshot in one call and refresh the per-track cache.
+# With prune=False the results are added to the cache instead of replacing it (used for partial snapshots).
+def classify_military(hex_codes, prune=True):
+    global military_cache
+    cache = {} if prune else military_cache
+    unknown = []
+    for hex_code in hex_codes:
+        result = military_cache.get(hex_code)
+        if result is None:
+            unknown.append(hex_code)
+        else:
+            cache[hex_code] = result
+
+    if unknown:
+        hex_ints = []
+        for hex_code in unknown:
+            try:
+                hex_ints.append(int(hex_code.lstrip('~'), 16))
+            except ValueError:
+                hex_ints.append(-1)
+        if numpy is not None and len(hex_ints) >= 64:
+            values = numpy.array(hex_ints, dtype=numpy.int64)
+            positions = numpy.searchsorted(numpy.array(military_starts, dtype=numpy.int64), values, side='right') - 1
+            ends = numpy.array(military_ends, dtype=numpy.int64)
+            results = ((positions >= 0) & (values <= ends[numpy.maximum(positions, 0)])).tolist()
+        else:
+            results = [is_military_hex_int(hex_int) for hex_int in hex_ints]
+        cache.update(zip(unknown, results))
+
+    # Hexes that left the snapshot drop out of the cache
+    military_cache = cache
+    return [cache[hex_code] for hex_code in hex_codes]
+
+# Function to forget military results for aircraft that are no longer being tracked
+def prune_military_cache(active_hexes):
+    global military_cache
+    military_cache = {hex_code: result for hex_code, result in military_cache.items() if hex_code in active_hexes}
 
 # Function to calculate the distance between two lat/lon pairs using the Haversine formula
 def haversine(lat1, lon1, lat2, lon2):
@@ -330,6 +1377,9 @@ def haversine(lat1, lon1, lat2, lon2):
     r = 3956
     return c * r
 
+# Compass point names for 45-degree intervals, starting at North
+directions = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
+
 # Function to calculate the direction from your location to the aircraft
 def calculate_direction(lat1, lon1, lat2, lon2):
     # Convert latitudes and longitudes to radians
@@ -347,19 +1397,444 @@ def calculate_direction(lat1, lon1, lat2, lon2):
     compass_bearing = (initial_bearing + 360) % 360
 
     # Determine the closest direction based on 45-degree intervals
-    directions = ["North", "North-East", "East", "South-East", "South", "South-West", "West", "North-West"]
     idx = round(compass_bearing / 45) % 8
     return directions[idx]
 
+# Function to find the lat/lon box around a point that contains every position within radius_miles
+def bounding_box(lat, lon, radius_miles):
+    dlat = degrees(radius_miles / 3956)
+    edge_lat = min(abs(lat) + dlat, 90)
+    if edge_lat >= 89.9:
+        dlon = 180  # The circle reaches a pole, so every longitude qualifies
+    else:
+        dlon = min(degrees(radius_miles / (3956 * cos(radians(edge_lat)))), 180)
+    # Pad by a small margin so floating point error never culls an aircraft right at the edge
+    return dlat * 1.001 + 1e-6, dlon * 1.001 + 1e-6
+
+# Function to calculate distance and direction for a whole snapshot, returning (aircraft, dist, direction)
+# for every aircraft within range_miles of your location
+def compute_snapshot_geometry(aircraft_list):
+    dlat, dlon = bounding_box(your_lat, your_lon, range_miles)
+
+    # Cheap bounding box cull before any trigonometry
+    candidates = []
+    lats = []
+    lons = []
+    for aircraft in aircraft_list:
+        lat = aircraft.get('lat')
+        lon = aircraft.get('lon')
+        if lat is None or lon is None:
+            continue
+        if abs(lat - your_lat) > dlat or abs((lon - your_lon + 540) % 360 - 180) > dlon:
+            continue
+        candidates.append(aircraft)
+        lats.append(lat)
+        lons.append(lon)
+
+    if not candidates:
+        return []
+
+    if numpy is not None and len(candidates) >= 16:
+        lat1 = radians(your_lat)
+        lon1 = radians(your_lon)
+        lat2 = numpy.radians(numpy.array(lats, dtype=numpy.float64))
+        dlon_rad = numpy.radians(numpy.array(lons, dtype=numpy.float64)) - lon1
+        cos_lat2 = numpy.cos(lat2)
+        a = numpy.sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos_lat2 * numpy.sin(dlon_rad / 2) ** 2
+        dists = 2 * numpy.arcsin(numpy.sqrt(a)) * 3956
+        y = numpy.sin(dlon_rad) * cos_lat2
+        x = cos(lat1) * numpy.sin(lat2) - sin(lat1) * cos_lat2 * numpy.cos(dlon_rad)
+        compass_bearings = (numpy.degrees(numpy.arctan2(y, x)) + 360) % 360
+        direction_indexes = (numpy.round(compass_bearings / 45) % 8).astype(numpy.int64)
+        return [(aircraft, dist, directions[idx])
+                for aircraft, dist, idx in zip(candidates, dists.tolist(), direction_indexes.tolist())
+                if dist <= range_miles]
+
+    results = []
+    for aircraft, lat, lon in zip(candidates, lats, lons):
+        dist = haversine(your_lat, your_lon, lat, lon)
+        if dist <= range_miles:
+            results.append((aircraft, dist, calculate_direction(your_lat, your_lon, lat, lon)))
+    return results
+
+# Fastest ground speed (in knots) the prediction's bounding box allows for, so it never culls an aircraft that could arrive in time
+ARRIVAL_MAX_SPEED = 1000
+
+# Function to predict, for a whole snapshot at once, each aircraft's closest point of approach to your location.
+# Positions are placed on an azimuthal equidistant plane centred on your location (distance and bearing from you,
+# as haversine() and calculate_direction() give them) and flown forward in a straight line from the last position
+# report along the track at the ground speed, so the time of closest approach and the time the aircraft enters
+# range_miles are closed-form. The track is turned by the convergence of the meridians between you and the aircraft,
+# which keeps the predicted distances within a few yards of a great-circle calculation over the distances involved.
+# Returns (aircraft, dist, direction, arrival) for each aircraft outside range_miles predicted to enter it within
+# arrival_horizon, where arrival is (seconds until it enters range, closest distance, seconds until the closest
+# point, which may be past arrival_horizon, and the predicted altitude on arrival from baro_rate). The other aircraft need no rule work.
+@timed('predict_arrivals')
+def predict_arrivals(aircraft_list):
+    horizon = arrival_horizon
+    dlat, dlon = bounding_box(your_lat, your_lon, range_miles + ARRIVAL_MAX_SPEED * 1.15078 * horizon / 3600)
+
+    # Cull by the box any aircraft could reach in time, then by whether it is moving at all
+    candidates = []
+    rows = []
+    for aircraft in aircraft_list:
+        lat = aircraft.get('lat')
+        if lat is None or abs(lat - your_lat) > dlat:
+            continue
+        lon = aircraft.get('lon')
+        if lon is None:
+            continue
+        lon_offset = (lon - your_lon + 540) % 360 - 180
+        if abs(lon_offset) > dlon:
+            continue
+        gs = aircraft.get('gs')
+        track = aircraft.get('track')
+        if not gs or track is None or aircraft.get('alt_baro') == 'ground':
+            continue
+        candidates.append(aircraft)
+        rows.append((lat, lon_offset, gs, track, aircraft.get('seen_pos') or 0.0))
+
+    if not candidates:
+        return []
+
+    lat1 = radians(your_lat)
+    radius_squared = range_miles * range_miles
+    arriving = []
+    if numpy is not None and len(candidates) >= 16:
+        from itertools import chain  # fromiter over the flattened rows is about twice as fast as numpy.array(rows)
+        lat, lon_offset, gs, track, age = numpy.fromiter(chain.from_iterable(rows), numpy.float64, 5 * len(rows)).reshape(-1, 5).T
+        lat2 = numpy.radians(lat)
+        dlon_rad = numpy.radians(lon_offset)
+        cos_lat2 = numpy.cos(lat2)
+        sin_lat2 = numpy.sin(lat2)
+        a = numpy.sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos_lat2 * numpy.sin(dlon_rad / 2) ** 2
+        dists = 2 * numpy.arcsin(numpy.sqrt(a)) * 3956
+        bearings = numpy.arctan2(numpy.sin(dlon_rad) * cos_lat2, cos(lat1) * sin_lat2 - sin(lat1) * cos_lat2 * numpy.cos(dlon_rad))
+        speed = gs * (1.15078 / 3600)  # Miles a second
+        track = numpy.radians(track) - dlon_rad * sin_lat2
+        vx = speed * numpy.sin(track)
+        vy = speed * numpy.cos(track)
+        x = dists * numpy.sin(bearings) + vx * age  # Where the aircraft is now, not where it last reported
+        y = dists * numpy.cos(bearings) + vy * age
+        a = vx * vx + vy * vy
+        b = x * vx + y * vy
+        c = x * x + y * y - radius_squared
+        discriminant = b * b - a * c
+        with numpy.errstate(invalid='ignore'):
+            arrival = (-b - numpy.sqrt(discriminant)) / a
+        indexes = numpy.flatnonzero((c > 0) & (discriminant >= 0) & (b < 0) & (arrival <= horizon))
+        if not len(indexes):
+            return []
+        closest_time = -b[indexes] / a[indexes]
+        closest = numpy.hypot(x[indexes] + vx[indexes] * closest_time, y[indexes] + vy[indexes] * closest_time)
+        direction_indexes = (numpy.round((numpy.degrees(bearings[indexes]) + 360) % 360 / 45) % 8).astype(numpy.int64)
+        arriving = zip(indexes.tolist(), dists[indexes].tolist(), direction_indexes.tolist(), arrival[indexes].tolist(),
+                       closest.tolist(), closest_time.tolist())
+    else:
+        for i, (lat, lon_offset, gs, track, age) in enumerate(rows):
+            lat2 = radians(lat)
+            dlon_rad = radians(lon_offset)
+            cos_lat2 = cos(lat2)
+            sin_lat2 = sin(lat2)
+            dist = 2 * asin(sqrt(sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos_lat2 * sin(dlon_rad / 2) ** 2)) * 3956
+            bearing = atan2(sin(dlon_rad) * cos_lat2, cos(lat1) * sin_lat2 - sin(lat1) * cos_lat2 * cos(dlon_rad))
+            speed = gs * (1.15078 / 3600)
+            track = radians(track) - dlon_rad * sin_lat2
+            vx = speed * sin(track)
+            vy = speed * cos(track)
+            x = dist * sin(bearing) + vx * age
+            y = dist * cos(bearing) + vy * age
+            a = vx * vx + vy * vy
+            b = x * vx + y * vy
+            c = x * x + y * y - radius_squared
+            discriminant = b * b - a * c
+            if c <= 0 or discriminant < 0 or b >= 0:
+                continue  # Already in range, or never comes close enough
+            arrival = (-b - sqrt(discriminant)) / a
+            if arrival > horizon:
+                continue
+            closest_time = -b / a
+            arriving.append((i, dist, round((degrees(bearing) + 360) % 360 / 45) % 8, arrival,
+                             sqrt((x + vx * closest_time) ** 2 + (y + vy * closest_time) ** 2), closest_time))
+
+    results = []
+    for i, dist, direction_index, arrival, closest, closest_time in arriving:
+        aircraft = candidates[i]
+        alt = aircraft.get('alt_baro')
+        if isinstance(alt, (int, float)):
+            alt += (aircraft.get('baro_rate') or 0) * (arrival + rows[i][4]) / 60
+        else:
+            alt = None
+        results.append((aircraft, dist, directions[direction_index], (arrival, closest, closest_time, alt)))
+    return results
+
+# A named area from alert_zones
+class AlertZone:
+    def __init__(self, config):
+        self.name = config.get('name', "Zone")
+        self.min_altitude = config.get('min_altitude')
+        self.max_altitude = config.get('max_altitude')
+        self.channels = frozenset(config['notify']) if config.get('notify') else None
+        if self.channels is not None:
+            unknown = self.channels - {channel for channel, _, _ in notification_channels}
+            if unknown:
+                raise ValueError(f"Unknown notification channel in zone {self.name}: {', '.join(sorted(unknown))}")
+        self.evaluate = None  # Zones without their own 'rules' use the compiled alert_rules
+        rules = alert_rules
+        if 'rules' in config:
+            names = set(config['rules'])
+            unknown = names - {rule.get('name') for rule in alert_rules}
+            if unknown:
+                raise ValueError(f"Unknown alert rule in zone {self.name}: {', '.join(sorted(unknown))}")
+            rules = [rule for rule in alert_rules if rule.get('name') in names]
+        distance_rules = [rule.get('name', 'Alert rule') for rule in rules if 'max_distance' in rule and rule.get('enabled', True)]
+        if distance_rules:
+            raise ValueError(f"Alert rules used in zone {self.name} can't have max_distance, which measures from your location: "
+                             f"{', '.join(distance_rules)}")
+        if 'rules' in config:
+            self.evaluate = compile_rule_plan(rules)
+        if 'circle' in config:
+            self.center_lat, self.center_lon, self.radius = config['circle']
+            self.polygon = None
+            dlat, dlon = bounding_box(self.center_lat, self.center_lon, self.radius)
+            self.bbox = (self.center_lat - dlat, self.center_lat + dlat, self.center_lon - dlon, self.center_lon + dlon)
+        elif 'polygon' in config:
+            self.polygon = [(float(lat), float(lon)) for lat, lon in config['polygon']]
+            if len(self.polygon) < 3:
+                raise ValueError(f"Zone {self.name} needs at least 3 polygon points")
+            self.bbox = (min(lat for lat, _ in self.polygon), max(lat for lat, _ in self.polygon),
+                         min(lon for _, lon in self.polygon), max(lon for _, lon in self.polygon))
+        else:
+            raise ValueError(f"Zone {self.name} needs a 'circle' or a 'polygon'")
+
+    # Aircraft that don't report an altitude are treated as inside the band
+    def in_altitude_band(self, aircraft):
+        alt = aircraft.get('alt_baro')
+        if alt == 'ground':
+            alt = 0
+        if not isinstance(alt, (int, float)):
+            return True
+        return (self.min_altitude is None or alt >= self.min_altitude) and (self.max_altitude is None or alt <= self.max_altitude)
+
+    # Containment test for a batch of points, returning a list of booleans. Polygons use ray casting on
+    # lat/lon, which is accurate for zones up to a few dozen miles across.
+    def contains(self, lats, lons):
+        vectorize = numpy is not None and len(lats) >= 16
+        if self.polygon is None:
+            if vectorize:
+                lat1 = radians(self.center_lat)
+                lat2 = numpy.radians(numpy.array(lats, dtype=numpy.float64))
+                dlon = numpy.radians(numpy.array(lons, dtype=numpy.float64)) - radians(self.center_lon)
+                a = numpy.sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * numpy.cos(lat2) * numpy.sin(dlon / 2) ** 2
+                return (2 * numpy.arcsin(numpy.sqrt(a)) * 3956 <= self.radius).tolist()
+            return [haversine(self.center_lat, self.center_lon, lat, lon) <= self.radius for lat, lon in zip(lats, lons)]
+        edges = list(zip(self.polygon, self.polygon[1:] + self.polygon[:1]))
+        if vectorize:
+            y = numpy.array(lats, dtype=numpy.float64)
+            x = numpy.array(lons, dtype=numpy.float64)
+            inside = numpy.zeros(len(y), dtype=bool)
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                for (y1, x1), (y2, x2) in edges:
+                    if y1 != y2:
+                        inside ^= ((y1 > y) != (y2 > y)) & (x < x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+            return inside.tolist()
+        results = []
+        for y, x in zip(lats, lons):
+            inside = False
+            for (y1, x1), (y2, x2) in edges:
+                if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+            results.append(inside)
+        return results
+
+class ZoneIndex:
+    """Grid of 0.25 degree cells listing the zones whose bounding box overlaps each cell, so an
+    aircraft is only tested against the few zones near it."""
+
+    cell_size = 0.25
+
+    def __init__(self, zones):
+        self.zones = zones
+        self.grid = {}
+        for zone in zones:
+            south, north, west, east = zone.bbox
+            for row in range(int(south // self.cell_size), int(north // self.cell_size) + 1):
+                for column in range(int(west // self.cell_size), int(east // self.cell_size) + 1):
+                    self.grid.setdefault((row, column), []).append(zone)
+
+    def candidates(self, lat, lon):
+        return self.grid.get((int(lat // self.cell_size), int(lon // self.cell_size)), ())
+
+zone_index = None
+
+def load_alert_zones():
+    global zone_index
+    zone_index = ZoneIndex([AlertZone(config) for config in alert_zones])
+    register_rule_plans()
+
+# Function to find the zones each aircraft is in, returning (aircraft, dist, direction, zones) for every
+# aircraft inside at least one zone. Candidate zones come from the grid, then each zone tests all of
+# its candidates in one batch.
+def locate_in_zones(aircraft_list):
+    if zone_index is None:
+        load_alert_zones()
+    points = []
+    zone_candidates = {}
+    for aircraft in aircraft_list:
+        lat = aircraft.get('lat')
+        lon = aircraft.get('lon')
+        if lat is None or lon is None:
+            continue
+        zones = zone_index.candidates(lat, lon)
+        if not zones:
+            continue
+        for zone in zones:
+            south, north, west, east = zone.bbox
+            if south <= lat <= north and west <= lon <= east and zone.in_altitude_band(aircraft):
+                zone_candidates.setdefault(zone, []).append(len(points))
+        points.append((aircraft, lat, lon))
+
+    memberships = {}
+    for zone in zone_index.zones:  # In alert_zones order, so the zones are listed the way they were configured
+        indexes = zone_candidates.get(zone)
+        if not indexes:
+            continue
+        inside = zone.contains([points[i][1] for i in indexes], [points[i][2] for i in indexes])
+        for i, is_inside in zip(indexes, inside):
+            if is_inside:
+                memberships.setdefault(i, []).append(zone)
+
+    results = []
+    for i in sorted(memberships):
+        aircraft, lat, lon = points[i]
+        results.append((aircraft, haversine(your_lat, your_lon, lat, lon), calculate_direction(your_lat, your_lon, lat, lon), memberships[i]))
+    return results
+
+# Long-lived transports shared by the notification channels so each alert skips the TCP/TLS handshake and SMTP login
+class PooledSmtpConnection:
+    """Authenticated SMTP connection that is reused between alerts and reconnected when it goes stale."""
+
+    def __init__(self):
+        self.server = None
+        self.last_used = 0.0
+        self.lock = threading.Lock()
+
+    def connect(self, timeout):
+        import smtplib
+        self.close()
+        server = smtplib.SMTP(your_smtp_server, your_smtp_port, timeout=timeout)
+        if your_smtp_starttls:
+            server.starttls()
+        server.login(your_email, your_email_app_password)
+        self.server = server
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except OSError:  # smtplib.SMTPException is an OSError
+                self.server.close()
+            self.server = None
+
+    def is_alive(self):
+        # Servers drop idle sessions, so an old connection is checked with NOOP before it is reused
+        if self.server is None or time.monotonic() - self.last_used > connection_idle_timeout:
+            return False
+        try:
+            return self.server.noop()[0] == 250
+        except OSError:
+            return False
+
+    # The envelope is sent step by step so a connection that turns out to be stale is retried on a fresh one,
+    # but only until DATA starts: after that the server may have accepted the message, and sending it again
+    # would deliver the alert twice.
+    def sendmail(self, sender, recipient, message, timeout):
+        import smtplib
+        with self.lock:
+            for attempt in range(2):
+                sending = False
+                try:
+                    if self.server is not None and self.server.sock is not None:
+                        self.server.sock.settimeout(timeout)  # Shared by email and email_sms, each with its own timeout
+                    if not self.is_alive():
+                        self.connect(timeout)
+                    self.server.ehlo_or_helo_if_needed()
+                    code, response = self.server.mail(sender)
+                    if code != 250:
+                        raise smtplib.SMTPSenderRefused(code, response, sender)
+                    code, response = self.server.rcpt(recipient)
+                    if code not in (250, 251):
+                        raise smtplib.SMTPRecipientsRefused({recipient: (code, response)})
+                    sending = True
+                    code, response = self.server.data(message)
+                    if code != 250:
+                        raise smtplib.SMTPDataError(code, response)
+                    self.last_used = time.monotonic()
+                    return
+                except OSError as e:  # Includes smtplib.SMTPServerDisconnected
+                    self.close()
+                    if attempt or sending or isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                        raise
+
+smtp_connection = PooledSmtpConnection()
+
+http_session = None
+http_session_last_used = 0.0
+http_session_lock = threading.Lock()
+
+# Function to get the shared requests session, replacing it after it has been idle for too long
+def get_http_session():
+    global http_session
+    global http_session_last_used
+    with http_session_lock:
+        now = time.monotonic()
+        if http_session is not None and now - http_session_last_used > connection_idle_timeout:
+            http_session.close()
+            http_session = None
+        if http_session is None:
+            import requests
+            http_session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(notification_workers, 1))
+            http_session.mount('https://', adapter)
+            http_session.mount('http://', adapter)
+        http_session_last_used = now
+        return http_session
+
+# Function to POST through the pooled session. A dropped connection replaces the session, but the POST is only
+# retried if the connection failed before the request went out: one that drops mid-request may already have
+# been delivered, and sending it again would send the alert twice.
+def http_post(url, timeout, **kwargs):
+    global http_session
+    import requests
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+    try:
+        return get_http_session().post(url, timeout=timeout, **kwargs)
+    except requests.exceptions.ConnectionError as e:
+        with http_session_lock:
+            if http_session is not None:
+                http_session.close()
+                http_session = None
+        reason = getattr(e.args[0], 'reason', None) if e.args else None
+        if not isinstance(e, requests.exceptions.ConnectTimeout) and not isinstance(reason, (ConnectTimeoutError, NewConnectionError)):
+            raise
+        return get_http_session().post(url, timeout=timeout, **kwargs)
+
+twilio_client = None
+
+def get_twilio_client():
+    global twilio_client
+    if twilio_client is None:
+        from twilio.rest import Client
+        from twilio.http.http_client import TwilioHttpClient
+        twilio_client = Client(twilio_sid, twilio_auth_token, http_client=TwilioHttpClient(pool_connections=True, timeout=notification_timeouts['twilio']))
+    return twilio_client
+
 # Function to send an email notification
 def send_email_notification(message_body):
     subject = "Bird Alert!"
 
     try:
-        with smtplib.SMTP(your_smtp_server, your_smtp_port) as server:
-            server.starttls()
-            server.login(your_email, your_email_app_password)
-            server.sendmail(your_email, your_email, message_body)
+        smtp_connection.sendmail(your_email, your_email, message_body, notification_timeouts['email'])
         return True
     except Exception as e:
         print(f"Failed to send email: {e}. Check valid credentials are set.\n")
@@ -372,10 +1847,7 @@ def send_sms_via_email(message_body):
     message = f"Subject: {subject}\n\n{message_body}"
 
     try:
-        with smtplib.SMTP(your_smtp_server, your_smtp_port) as server:
-            server.starttls()
-            server.login(your_email, your_email_app_password)
-            server.sendmail(your_email, recipient, message)
+        smtp_connection.sendmail(your_email, recipient, message, notification_timeouts['email_sms'])
         return True
     except Exception as e:
         print(f"Failed to send email-to-SMS: {e}. Check valid credentials are set.\n")
@@ -383,11 +1855,8 @@ def send_sms_via_email(message_body):
 
 # Function to send a Twilio notification
 def send_twilio_sms_notification(message_body):
-    from twilio.rest import Client
-    client = Client(twilio_sid, twilio_auth_token)
-
     try:
-        message = client.messages.create(
+        message = get_twilio_client().messages.create(
             body=message_body,
             from_=twilio_phone_number,
             to=twilio_phone_number
@@ -409,7 +1878,7 @@ def send_telegram_notification(message_body):
     }
     
     try:
-        response = requests.post(url, json=payload)
+        response = http_post(url, notification_timeouts['telegram'], json=payload)
         response.raise_for_status()
         return True
     except Exception as e:
@@ -429,7 +1898,7 @@ def send_pushover_notification(message_body):
     }
 
     try:
-        response = requests.post(url, data=payload)
+        response = http_post(url, notification_timeouts['pushover'], data=payload)
         response.raise_for_status()
         return True
     except Exception as e:
@@ -445,7 +1914,7 @@ def send_ifttt_notification(message_body):
     payload = {"value1": message_body}
 
     try:
-        response = requests.post(url, json=payload)
+        response = http_post(url, notification_timeouts['ifttt'], json=payload)
         response.raise_for_status()
         return True
     except Exception as e:
@@ -456,6 +1925,7 @@ def send_ifttt_notification(message_body):
 def send_signal_notification(message_body):
     if not signal_phone_number or not signal_recipients:
         return False
+    import subprocess
 
     try:
         for recipient in signal_recipients:
@@ -469,296 +1939,2214 @@ def send_signal_notification(message_body):
             ]
 
             # Run the command and wait for it to complete
-            subprocess.run(command, check=True)
+            subprocess.run(command, check=True, timeout=notification_timeouts['signal'])
 
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
         print(f"Failed to send Signal message: {e}. Check valid credentials are set.\n")
         return False
 
+# Notification channels in the order they are tried: (name, is configured, send function)
+notification_channels = [
+    ('email', lambda: your_email and your_email_app_password and your_smtp_server and your_smtp_port, send_email_notification),
+    ('telegram', lambda: telegram_bot_token and telegram_chat_id, send_telegram_notification),
+    ('email_sms', lambda: your_email and your_email_app_password and your_smtp_server and your_smtp_port and phone_number and carrier_gateway, send_sms_via_email),
+    ('twilio', lambda: twilio_phone_number and twilio_auth_token and twilio_sid, send_twilio_sms_notification),
+    ('ifttt', lambda: ifttt_webhook_event and ifttt_webhook_key, send_ifttt_notification),
+    ('signal', lambda: signal_phone_number and signal_recipients, send_signal_notification),
+    ('pushover', lambda: pushover_user_key and pushover_app_token, send_pushover_notification),
+]
+
+# Token bucket limiting how often a channel sends: holds up to burst tokens, refilled at per_minute / 60 a second
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a message may be sent (0 if one may be sent now)."""
+        self.refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now, force=False):
+        """Use a token if one is available. force always sends, leaving the bucket in debt so later messages wait for it."""
+        self.refill(now)
+        if self.tokens < 1 and not force:
+            return False
+        self.tokens -= 1
+        return True
+
+# Rate limiters by channel name, created on first use from notification_rate_limits
+notification_buckets = {}
+
+def channel_bucket(channel):
+    bucket = notification_buckets.get(channel)
+    if bucket is None and channel in notification_rate_limits:
+        bucket = notification_buckets[channel] = TokenBucket(*notification_rate_limits[channel])
+    return bucket
+
+# Alerts waiting to be combined into digests, by the channel names they go to (None for all channels):
+# lists of (queued time, full message, one-line summary). The dispatcher thread turns them into digests.
+pending_alerts = {}
+pending_alerts_closed = False  # Set at the end of each cycle when notification_digest_window is 0
+notification_condition = threading.Condition()
+
+# Digests waiting for a worker, created on first use so notification_queue_size can be changed before then.
+# Emergency alerts skip the digests and go through their own queue and worker, so they never wait behind them.
+notification_queue = None
+urgent_notification_queue = None
+notification_threads = []
+notification_lock = threading.Lock()
+
+# Delivery instrumentation, shown under the terminal table
+notification_stats = {'queued': 0, 'dropped': 0, 'max_depth': 0, 'failed': 0, 'max_wait': 0.0, 'alerts': 0, 'digests': 0,
+                      'urgent': 0, 'rate_limited': 0, 'channels': {}}
+
+def start_notification_workers():
+    global notification_queue, urgent_notification_queue
+    with notification_lock:
+        if notification_queue is not None:
+            return
+        notification_queue = queue.Queue(maxsize=notification_queue_size)
+        urgent_notification_queue = queue.Queue()
+        workers = [(f"notification-{i}", notification_worker, (notification_queue,)) for i in range(max(notification_workers, 1))]
+        workers += [("notification-urgent", notification_worker, (urgent_notification_queue,)),
+                    ("notification-dispatcher", notification_dispatcher, ())]
+        for name, target, args in workers:
+            thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+            thread.start()
+            notification_threads.append(thread)
+
+# Function to queue a message for background delivery without ever blocking the poll loop.
+# channels limits delivery to those channel names (all configured channels if None).
+def enqueue_notification(message_body, channels=None, urgent=False):
+    if notification_queue is None:
+        start_notification_workers()
+    if urgent:
+        urgent_notification_queue.put_nowait((time.time(), message_body, channels, True))
+        return
+    while True:
+        try:
+            notification_queue.put_nowait((time.time(), message_body, channels, False))
+            break
+        except queue.Full:
+            with notification_lock:
+                notification_stats['dropped'] += 1
+            if notification_queue_policy == 'drop_newest':
+                print("Notification queue is full. Dropping the new alert.")
+                return
+            try:
+                notification_queue.get_nowait()  # drop_oldest: make room for the new alert
+                notification_queue.task_done()
+            except queue.Empty:
+                pass
+    with notification_lock:
+        notification_stats['queued'] += 1
+        notification_stats['max_depth'] = max(notification_stats['max_depth'], notification_queue.qsize())
+
+# Function to hold an alert for the next digest, or send it straight away if it's urgent (an emergency)
+def queue_alert(message_body, summary, channels=None, urgent=False):
+    if notification_queue is None:
+        start_notification_workers()
+    with notification_lock:
+        notification_stats['alerts'] += 1
+        if urgent:
+            notification_stats['urgent'] += 1
+    if urgent:
+        enqueue_notification(message_body, channels, urgent=True)
+        return
+    with notification_condition:
+        pending_alerts.setdefault(channels, []).append((time.time(), message_body, summary))
+        notification_condition.notify_all()
+
+# Function to mark the end of a cycle: with notification_digest_window 0 its alerts are sent as digests now
+def flush_notifications():
+    global pending_alerts_closed
+    if notification_digest_window or not pending_alerts:
+        return
+    with notification_condition:
+        pending_alerts_closed = True
+        notification_condition.notify_all()
+
+# Function to build the message for a group of alerts. A single alert keeps its full message.
+def build_digest(alerts):
+    if len(alerts) == 1:
+        return alerts[0][1]
+    return f"Bird Alert! {len(alerts)} aircraft\n" + "".join(f"{summary}\n" for _, _, summary in alerts)
+
+# Function to find the first configured channel a digest would be sent through
+def first_channel(channels):
+    for channel, is_configured, _ in notification_channels:
+        if (channels is None or channel in channels) and is_configured():
+            return channel
+    return None
+
+# Background thread turning pending alerts into digests. A group is sent once its cycle has ended (or
+# notification_digest_window has passed since its first alert) and its channel's rate limit allows another
+# message; until then new alerts join it, so a burst of alerts costs one message rather than one each.
+def notification_dispatcher():
+    global pending_alerts_closed
+    while True:
+        with notification_condition:
+            while True:
+                now = time.time()
+                ready = []
+                timeout = None
+                for channels, alerts in pending_alerts.items():
+                    wait = alerts[0][0] + notification_digest_window - now if notification_digest_window else (0 if pending_alerts_closed else None)
+                    bucket = channel_bucket(first_channel(channels))
+                    if wait is not None and bucket is not None:
+                        with notification_lock:
+                            wait = max(wait, bucket.wait_time(time.monotonic()))
+                    if wait is not None and wait <= 0:
+                        ready.append(channels)
+                    elif wait is not None:
+                        timeout = wait if timeout is None else min(timeout, wait)
+                if ready:
+                    break
+                notification_condition.wait(timeout)
+            for channels in ready:
+                alerts = pending_alerts.pop(channels)
+                if len(alerts) > notification_digest_max:
+                    pending_alerts[channels] = alerts[notification_digest_max:]  # Sent as soon as the channel allows
+                    alerts = alerts[:notification_digest_max]
+                if len(alerts) > 1:
+                    with notification_lock:
+                        notification_stats['digests'] += 1
+                    count_metric('birdalert_notification_digests_total')
+                enqueue_notification(build_digest(alerts), channels)
+            if not pending_alerts:
+                pending_alerts_closed = False
+            notification_condition.notify_all()  # Wakes wait_for_notifications()
+
+# Function to wait until every alert raised so far has been delivered (or has failed)
+def wait_for_notifications():
+    if notification_queue is None:
+        return
+    flush_notifications()
+    with notification_condition:
+        while pending_alerts:
+            notification_condition.wait()
+    urgent_notification_queue.join()
+    notification_queue.join()
+
+def record_delivery(channel, success, latency):
+    with notification_lock:
+        stats = notification_stats['channels'].setdefault(channel, {'sent': 0, 'failed': 0, 'total_latency': 0.0, 'max_latency': 0.0})
+        stats['sent' if success else 'failed'] += 1
+        stats['total_latency'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+    if metrics_enabled:
+        observe_metric('birdalert_notification_delivery_seconds', latency, f'channel="{channel}",result="{"sent" if success else "failed"}"')
+
+# Function to try each configured channel in order until one of them delivers the alert. A channel
+# that has used up its rate limit is waited for, except by urgent alerts, which are sent at once.
+def deliver_notification(message_body, channels=None, urgent=False):
+    for channel, is_configured, send in notification_channels:
+        if channels is not None and channel not in channels:
+            continue
+        if not is_configured():
+            continue
+        bucket = channel_bucket(channel)
+        if bucket is not None:
+            limited = False
+            while True:
+                with notification_lock:
+                    if bucket.take(time.monotonic(), force=urgent):
+                        break
+                    wait = bucket.wait_time(time.monotonic())
+                limited = True
+                time.sleep(wait)
+            if limited:
+                with notification_lock:
+                    notification_stats['rate_limited'] += 1
+                count_metric('birdalert_notification_rate_limited_total', labels=f'channel="{channel}"')
+        start = time.perf_counter()
+        success = send(message_body)
+        record_delivery(channel, success, time.perf_counter() - start)
+        if success:
+            return True
+    with notification_lock:
+        notification_stats['failed'] += 1
+    print("All notification methods failed")
+    return False
+
+def notification_worker(messages):
+    while True:
+        queued_at, message_body, channels, urgent = messages.get()
+        with notification_lock:
+            notification_stats['max_wait'] = max(notification_stats['max_wait'], time.time() - queued_at)
+        try:
+            deliver_notification(message_body, channels, urgent)
+        except Exception as e:
+            print(f"Error delivering notification: {e}")
+        finally:
+            messages.task_done()
+
+# Function to summarize queue depth and per-channel latency for the terminal
+def notification_status():
+    with notification_lock:
+        depth = notification_queue.qsize() if notification_queue is not None else 0
+        waiting = sum(len(alerts) for alerts in pending_alerts.values())
+        parts = [f"Notifications: {notification_stats['alerts']} alerts in {notification_stats['queued']} messages "
+                 f"({notification_stats['digests']} digests, {notification_stats['urgent']} urgent, {waiting} waiting), "
+                 f"queue {depth}/{notification_queue_size} (max {notification_stats['max_depth']}, "
+                 f"longest wait {notification_stats['max_wait']:.1f}s, dropped {notification_stats['dropped']}, "
+                 f"rate limited {notification_stats['rate_limited']}, failed {notification_stats['failed']})"]
+        for channel, stats in notification_stats['channels'].items():
+            attempts = stats['sent'] + stats['failed']
+            parts.append(f"{channel} {stats['sent']} sent/{stats['failed']} failed, "
+                         f"avg {stats['total_latency'] / attempts:.2f}s, max {stats['max_latency']:.2f}s")
+    return " | ".join(parts)
+
 # Function to send notifications through all available methods
-def send_notification(aircraft, hex_code, distance, direction):
-    global aircrafts_json_path_expanded
-    global terminal_table
-    global aircrafts_data
-    hex_code_upper = hex_code.upper()  # Convert to uppercase to match structure of aircrafts.json
+@timed('send_notification')
+def send_notification(track, zones=None):
+    hex_code_upper = track.hex.upper()  # Convert to uppercase to match structure of aircrafts.json
+    type_info = track.type_description()
     message_body = f"Bird Alert!\n" \
               f"Aircraft hex: {hex_code_upper}\n" \
-              f"Callsign: {aircraft.get('flight', 'N/A')}\n" \
-              
-    try:
-        with open(aircrafts_json_path_expanded, 'r') as f:
-            # Find the entry with the matching hex_code (ICAO24)
-            aircraft_entry = aircrafts_data.get(hex_code_upper)
-            if aircraft_entry:
-                type_info = aircraft_entry.get('d') or aircraft_entry.get('t') or 'Unknown'
-                message_body += f"Type: {type_info}\n"
-            else:
-                message_body += "Type: Unknown\n"  # Handle case where hex is not found
-    except FileNotFoundError:
-        print(f"File not found: {aircrafts_json_path_expanded}")
-        message_body += "Type: Unknown\n"  # Handle file not found
-    except json.JSONDecodeError:
-        print("Error decoding JSON response")
-        message_body += "Type: Unknown\n"  # Handle JSON decode error
+              f"Callsign: {track.flight}\n" \
+              f"Type: {type_info}\n"
 
+    message_body += f"Distance: {track.dist:.2f}mi\n" \
+                    f"Direction: {track.direction}\n" \
+                    f"Ground Speed: {track.gs} knots\n" \
+                    f"Transponder: {track.transponder}\n" \
+                    f"Military: {'Yes' if track.military else 'Unknown'}\n" \
+                    f"Emergency: {track.emergency}\n"
 
-    message_body += f"Distance: {distance:.2f}mi\n" \
-                    f"Direction: {direction}\n" \
-                    f"Ground Speed: {aircraft.get('gs', 'N/A')} knots\n" \
-                    f"Transponder: {aircraft.get('type', 'N/A')}\n" \
-                    f"Military: {'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code_upper) else 'Unknown'}\n" \
-                    f"Emergency: {aircraft.get('emergency', 'none')}\n"
+    # One line per aircraft for digests
+    emergency = track.emergency
+    summary = f"{hex_code_upper} {track.flight.strip()} {type_info}, {track.dist:.1f}mi {track.direction}"
+    if track.military:
+        summary += ", military"
+    if emergency != 'none':
+        summary += f", emergency {emergency}"
+
+    # Aircraft alerted before they reach range_miles
+    if track.arrival is not None:
+        seconds, closest, closest_seconds, altitude = track.arrival
+        message_body += f"Arriving: in {seconds:.0f}s, closest {closest:.2f}mi in {closest_seconds:.0f}s" + \
+                        (f" at {altitude:.0f} ft\n" if altitude is not None else "\n")
+        summary += f", arriving in {seconds:.0f}s"
+
+    # Zones that name their channels only send through those; any zone without 'notify' uses them all
+    channels = None
+    if zones:
+        message_body += f"Zone: {', '.join(zone.name for zone in zones)}\n"
+        summary += f" ({', '.join(zone.name for zone in zones)})"
+        if all(zone.channels for zone in zones):
+            channels = frozenset().union(*(zone.channels for zone in zones))
     
-    if not your_email or not your_email_app_password or not your_smtp_server or not your_smtp_port:
-        pass
-    else:
-        send_email_notification(message_body)
+    if not any(is_configured() for _, is_configured, _ in notification_channels):
+        print("All notification methods failed")
+        exit()
+
+    queue_alert(message_body, summary, channels, urgent=emergency != 'none')
+
+# Function to send a notification when an aircraft that alerted leaves the area ('left') or drops out of coverage ('lost')
+def send_departure_notification(track, reason, current_time):
+    hex_code_upper = track.hex.upper()
+    type_info = track.type_description()
+    minutes = max(0, round((current_time - track.inside_since) / 60))
+    departed = f"{'left the area' if reason == 'left' else 'out of coverage'} after {minutes} min"
+    message_body = f"Bird Alert!\n" \
+                   f"Aircraft hex: {hex_code_upper}\n" \
+                   f"Callsign: {track.flight}\n" \
+                   f"Type: {type_info}\n" \
+                   f"Departed: {departed}\n" \
+                   f"Last Distance: {track.dist:.2f}mi\n" \
+                   f"Direction: {track.direction}\n"
+    summary = f"{hex_code_upper} {track.flight.strip()} {type_info}, {departed}"
+    channels = None
+    if track.zones:
+        message_body += f"Zone: {', '.join(zone.name for zone in track.zones)}\n"
+        if all(zone.channels for zone in track.zones):
+            channels = frozenset().union(*(zone.channels for zone in track.zones))
+    queue_alert(message_body, summary, channels)
+
+# Function to compile callsign prefixes into a flattened prefix trie: one set of prefixes per prefix length,
+# so matching costs one slice and one hash lookup per distinct length instead of a character-by-character walk
+def compile_prefix_trie(prefixes):
+    levels = {}
+    for prefix in prefixes:
+        levels.setdefault(len(prefix), set()).add(prefix)
+    return tuple((length, frozenset(level)) for length, level in sorted(levels.items()))
+
+# Function to find the shortest prefix in the trie that the text starts with
+def match_prefix(trie, text):
+    for length, level in trie:
+        prefix = text[:length]
+        if prefix in level:
+            return prefix
+    return None
+
+class CompiledRule:
+    """An alert rule from alert_rules after compilation; match_alert_rule returns these."""
+
+    def __init__(self, name, action):
+        self.name = name
+        self.action = action
+
+# Values the rule conditions can use, read from the aircraft once at the top of the evaluation plan
+rule_inputs = {
+    'flight': "flight = aircraft.get('flight', 'N/A')",
+    'transponder_type': "transponder_type = aircraft.get('type', 'N/A')",
+    'emergency': "emergency = aircraft.get('emergency', 'none') != 'none'",
+    'military': "military = bool(aircraft.get('military', False) or is_military_aircraft(hex_code))",
+}
+
+# Schedules of every compiled plan (alert_rules and each zone's own rules), brought up to date once per
+# batch by update_rule_schedules(). Rebuilt by register_rule_plans() whenever a plan is compiled.
+rule_schedules = []
+
+# A type, class or operator rule condition resolved against the Mictronics databases into the set each
+# aircraft is checked against with one hash lookup: hex codes for types and classes (through the type
+# postings in aircrafts.idx), ICAO operator codes for operators. Resolved again when a database is swapped in.
+class DatabaseRuleMatcher:
+    def __init__(self, condition, values):
+        self.condition = condition
+        self.values = list(values)
+        self.matches = frozenset()
+        self.refresh()
+
+    def refresh(self):
+        if self.condition == 'operators':
+            if mictronics_tables is not None:
+                self.matches = frozenset(mictronics_tables.operator_codes(self.values))
+            else:
+                self.matches = frozenset(value for value in self.values if is_icao_operator_code(value))
+            return
+        if self.condition == 'type_codes':
+            type_codes = {value.upper() for value in self.values}
+        else:
+            type_codes = mictronics_tables.type_codes_matching(self.values) if mictronics_tables is not None else set()
+        self.matches = aircrafts_index.hexes_for_types(type_codes) if aircrafts_index is not None else frozenset()
+
+# Matchers of every compiled plan, refreshed by refresh_database_rules()
+database_rule_matchers = []
+
+def refresh_database_rules():
+    for matcher in database_rule_matchers:
+        matcher.refresh()
+
+# Cost ranking used to order the conditions inside a rule
+rule_condition_costs = {'schedule': 0, 'hex': 0, 'type_codes': 0, 'aircraft_classes': 0, 'emergency': 0, 'military': 0, 'transponder_types': 0,
+                        'max_distance': 0, 'operators': 1, 'callsign_prefixes': 1}
+
+# Function to turn one rule condition into a Python expression, returning (expression, inputs it needs).
+# constant() binds a value into the plan's namespace and returns the name to use for it.
+def compile_rule_condition(condition, value, constant):
+    if condition == 'hex':
+        return f"hex_code in {constant(frozenset(hex_code.lower() for hex_code in value))}", ()
+    if condition == 'callsign_prefixes':
+        trie = compile_prefix_trie(value)
+        if not trie:
+            return "False", ()
+        return "(" + " or ".join(f"flight[:{length}] in {constant(level)}" for length, level in trie) + ")", ('flight',)
+    if condition == 'emergency':
+        return f"emergency is {bool(value)}", ('emergency',)
+    if condition == 'military':
+        return f"military is {bool(value)}", ('military',)
+    if condition == 'transponder_types':
+        return f"transponder_type in {constant(frozenset(value))}", ('transponder_type',)
+    if condition == 'max_distance':
+        return f"dist <= {constant(float(value))}", ()
+    if condition == 'schedule':
+        schedule = Schedule(value)
+        return f"{constant(schedule)}.active", ()
+    if condition in ('type_codes', 'aircraft_classes', 'operators'):
+        matcher = DatabaseRuleMatcher(condition, value)
+        if condition == 'operators':
+            return f"(flight[:3] in {constant(matcher)}.matches and flight[3:4].isdigit())", ('flight',)
+        return f"hex_code in {constant(matcher)}.matches", ()
+    raise ValueError(f"Unknown alert rule condition: {condition}")
+
+# The evaluation plan built from alert_rules: a generated function returning the first matching CompiledRule
+compiled_alert_rules = None
+
+# Function to compile a list of rules into a single evaluation function. Every condition becomes an inline
+# hash lookup or comparison and the aircraft fields are read only once, in the order the rules need them.
+# The plan keeps its own schedules and matchers; register_rule_plans() collects them from every plan in use.
+def compile_rule_plan(rules):
+    namespace = {'is_military_aircraft': is_military_aircraft}
+
+    def constant(value):
+        name = f"c{len(namespace)}"
+        namespace[name] = value
+        return name
+
+    needed_inputs = []
+    lines = []
+    for rule in rules:
+        if not rule.get('enabled', True):
+            continue
+        action = rule.get('action', 'alert')
+        if action not in ('alert', 'ignore'):
+            raise ValueError(f"Unknown action for alert rule {rule.get('name')}: {action}")
+        conditions = sorted((key for key in rule if key not in ('name', 'action', 'enabled')), key=lambda key: rule_condition_costs.get(key, 99))
+        expressions = []
+        for key in conditions:
+            expression, inputs = compile_rule_condition(key, rule[key], constant)
+            expressions.append(expression)
+            needed_inputs.extend(name for name in inputs if name not in needed_inputs)
+        compiled_rule = CompiledRule(rule.get('name', 'Alert rule'), action)
+        lines.append(f"    if {' and '.join(expressions) or 'True'}:\n        return {constant(compiled_rule)}")
+
+    source = "def evaluate_alert_rules(aircraft, hex_code, dist):\n" + \
+             "".join(f"    {rule_inputs[name]}\n" for name in needed_inputs) + \
+             "\n".join(lines) + "\n    return None\n"
+    exec(compile(source, '<alert_rules>', 'exec'), namespace)
+    evaluate = namespace['evaluate_alert_rules']
+    evaluate.schedules = [value for value in namespace.values() if isinstance(value, Schedule)]
+    evaluate.matchers = [value for value in namespace.values() if isinstance(value, DatabaseRuleMatcher)]
+    return evaluate
+
+# Function to rebuild rule_schedules and database_rule_matchers from the main plan and the zones' own plans,
+# so compiling one plan never drops another's
+def register_rule_plans():
+    plans = [compiled_alert_rules] if compiled_alert_rules is not None else []
+    if zone_index is not None:
+        plans.extend(zone.evaluate for zone in zone_index.zones if zone.evaluate is not None)
+    rule_schedules[:] = [schedule for plan in plans for schedule in plan.schedules]
+    database_rule_matchers[:] = [matcher for plan in plans for matcher in plan.matchers]
+
+def compile_alert_rules(rules=None):
+    global compiled_alert_rules
+    compiled_alert_rules = compile_rule_plan(alert_rules if rules is None else rules)
+    register_rule_plans()
+    return compiled_alert_rules
+
+# Function to bring the rule schedules up to date, so the rules only read each schedule's active flag
+def update_rule_schedules(timestamp):
+    for schedule in rule_schedules:
+        schedule.update(timestamp)
+
+# Function to find the first rule that matches the aircraft
+def match_alert_rule(aircraft, hex_code, dist):
+    if compiled_alert_rules is None:
+        compile_alert_rules()
+    return compiled_alert_rules(aircraft, hex_code, dist)
+
+# Remembers when each aircraft was last alerted so it isn't alerted again within min_alert_period
+class AlertSuppressionStore:
+    """Alert times with TTL eviction.
+
+    Every entry lives for the same min_alert_period, so entries expire in the order they were recorded
+    and a FIFO of (alert time, key) is enough to evict them in amortized O(1). A key that alerts again
+    leaves a stale FIFO entry behind, which is skipped when it reaches the front.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.alert_times = {}
+        self.expiry_queue = deque()
+        self.evictions = 0
+        self.hits = 0    # Alerts suppressed because the aircraft alerted recently
+        self.misses = 0  # Alerts allowed through
+
+    def __len__(self):
+        return len(self.alert_times)
+
+    def __contains__(self, key):
+        return key in self.alert_times
+
+    def expire(self, now):
+        cutoff = now - self.period
+        alert_times = self.alert_times
+        expiry_queue = self.expiry_queue
+        while expiry_queue and expiry_queue[0][0] < cutoff:
+            alert_time, key = expiry_queue.popleft()
+            if alert_times.get(key) == alert_time:
+                del alert_times[key]
+                self.evictions += 1
+
+    def should_alert(self, key, now):
+        """Return True if the aircraft hasn't alerted within the last min_alert_period seconds."""
+        alert_time = self.alert_times.get(key)
+        if alert_time is not None and now - alert_time <= self.period:
+            self.hits += 1
+            return False
+        self.misses += 1
+        return True
+
+    def record(self, key, now):
+        self.alert_times[key] = now
+        self.expiry_queue.append((now, key))
+        self.expire(now)
+
+    def hit_rate(self):
+        checks = self.hits + self.misses
+        return self.hits / checks if checks else 0.0
+
+    def save(self, path):
+        now = time.time()
+        self.expire(now)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'period': self.period, 'alerts': self.alert_times}, f, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        with open(path, 'r') as f:
+            saved = json.load(f)
+        cutoff = time.time() - self.period
+        # Replay in time order so the FIFO stays sorted
+        for key, alert_time in sorted(saved.get('alerts', {}).items(), key=lambda item: item[1]):
+            if alert_time >= cutoff:
+                self.record(key, alert_time)
+
+alert_state_path_expanded = os.path.expanduser(alert_state_path) if alert_state_path else ''
+alert_state_saved_at = 0.0
+
+# Function to restore recent alert times from the last run
+def load_alert_state():
+    global last_notified
+    last_notified = AlertSuppressionStore(min_alert_period)
+    if not alert_state_path_expanded:
         return
-    
-    if not telegram_bot_token or not telegram_chat_id:
+    try:
+        last_notified.load(alert_state_path_expanded)
+    except FileNotFoundError:
         pass
-    else:
-        send_telegram_notification(message_body)
-        return
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Error reading {alert_state_path_expanded}: {e}")
 
-    if not your_email or not your_email_app_password or not your_smtp_server or not your_smtp_port or not phone_number or not carrier_gateway:
-        pass
-    else:
-        send_sms_via_email(message_body)
+# Function to save recent alert times, at most once per alert_state_save_interval unless forced
+def save_alert_state(force=False):
+    global alert_state_saved_at
+    if not alert_state_path_expanded or last_notified is None:
         return
-
-    if not twilio_phone_number or not twilio_auth_token or not twilio_sid:
-        pass
-    else:
-        send_twilio_sms_notification(message_body)
+    now = time.monotonic()
+    if not force and now - alert_state_saved_at < alert_state_save_interval:
         return
+    alert_state_saved_at = now
+    try:
+        last_notified.save(alert_state_path_expanded)
+    except OSError as e:
+        print(f"Error saving {alert_state_path_expanded}: {e}")
 
-    if not ifttt_webhook_event or not ifttt_webhook_key:
-        pass
-    else:
-        send_ifttt_notification(message_body)
-        return
+# History of every aircraft that came within range, one row per visit, kept in SQLite. Visits are
+# updated in memory as positions arrive and written once per cycle in a single transaction, and the
+# database runs in WAL mode with synchronous=NORMAL, so an SD card sees one small append per cycle.
+class Sighting:
+    __slots__ = ('row_id', 'hex', 'callsign', 'type_code', 'description', 'military', 'closest', 'first_seen', 'last_seen', 'alerted', 'rule')
 
-    if not signal_phone_number or not signal_recipients:
-        pass
-    else:
-        send_signal_notification(message_body)
+    def __init__(self, hex_code, seen):
+        self.row_id = None
+        self.hex = hex_code
+        self.callsign = None
+        self.type_code = None
+        self.description = None
+        self.military = False
+        self.closest = float('inf')
+        self.first_seen = seen
+        self.last_seen = seen
+        self.alerted = False
+        self.rule = None
+
+class SightingsHistory:
+    schema = (
+        """CREATE TABLE IF NOT EXISTS sightings (
+            id INTEGER PRIMARY KEY,
+            hex TEXT NOT NULL,
+            callsign TEXT,
+            type_code TEXT,
+            description TEXT,
+            military INTEGER NOT NULL DEFAULT 0,
+            closest_miles REAL,
+            first_seen REAL NOT NULL,
+            last_seen REAL NOT NULL,
+            alerted INTEGER NOT NULL DEFAULT 0,
+            rule TEXT)""",
+        "CREATE INDEX IF NOT EXISTS sightings_hex ON sightings (hex, first_seen)",
+        # Covers the --top and --recent queries over a period without reading the table itself
+        "CREATE INDEX IF NOT EXISTS sightings_time ON sightings (first_seen, military, alerted, type_code, description, callsign, hex)",
+        "CREATE INDEX IF NOT EXISTS sightings_callsign ON sightings (callsign, first_seen)",
+    )
+
+    def __init__(self, path, visit_gap):
+        import sqlite3
+        self.db = sqlite3.connect(path, isolation_level=None)  # Transactions are opened explicitly in flush()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.schema:
+            self.db.execute(statement)
+        self.visit_gap = visit_gap
+        self.visits = {}  # Current visit of each aircraft, keyed by hex
+        self.dirty = {}  # Visits changed since the last flush, keyed by hex
+
+    def observe(self, aircraft, hex_code, dist, seen):
+        visit = self.visits.get(hex_code)
+        if visit is None or seen - visit.last_seen > self.visit_gap:
+            visit = self.visits[hex_code] = Sighting(hex_code, seen)
+        visit.last_seen = seen
+        visit.closest = min(visit.closest, dist)
+        callsign = aircraft.get('flight', '').strip()
+        if callsign:
+            visit.callsign = callsign
+        if visit.type_code is None and aircrafts_index is not None:
+            entry = aircrafts_index.get(hex_code)  # Looked up once per visit, after the index has loaded
+            visit.type_code, visit.description = (entry[0] or '', entry[1] or '') if entry else ('', '')  # '' once looked up, written as NULL
+        visit.military = visit.military or bool(aircraft.get('military', False) or is_military_aircraft(hex_code))
+        self.dirty[hex_code] = visit
+
+    def mark_alerted(self, hex_code, rule_name):
+        visit = self.visits.get(hex_code)
+        if visit is not None and not visit.alerted:
+            visit.alerted = True
+            visit.rule = rule_name
+            self.dirty[hex_code] = visit
+
+    def flush(self, current_time):
+        if self.dirty:
+            cursor = self.db.cursor()
+            cursor.execute("BEGIN")
+            for visit in self.dirty.values():
+                values = (visit.callsign, visit.type_code or None, visit.description or None, int(visit.military), round(visit.closest, 2),
+                          visit.last_seen, int(visit.alerted), visit.rule)
+                if visit.row_id is None:
+                    cursor.execute("INSERT INTO sightings (callsign, type_code, description, military, closest_miles, last_seen, alerted, rule, "
+                                   "hex, first_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values + (visit.hex, visit.first_seen))
+                    visit.row_id = cursor.lastrowid
+                else:
+                    cursor.execute("UPDATE sightings SET callsign = ?, type_code = ?, description = ?, military = ?, closest_miles = ?, "
+                                   "last_seen = ?, alerted = ?, rule = ? WHERE id = ?", values + (visit.row_id,))
+            cursor.execute("COMMIT")
+            self.dirty = {}
+        cutoff = current_time - self.visit_gap
+        for hex_code in [hex_code for hex_code, visit in self.visits.items() if visit.last_seen < cutoff]:
+            del self.visits[hex_code]
+
+    def close(self):
+        self.flush(time.time())
+        self.db.close()
+
+sightings_history = None
+
+# Function to open the history database in history_path
+def open_sightings_history():
+    global sightings_history
+    if not history_path:
         return
+    try:
+        sightings_history = SightingsHistory(os.path.expanduser(history_path), history_visit_gap)
+        atexit.register(sightings_history.close)
+    except Exception as e:  # sqlite3.Error, or Python built without sqlite3
+        print(f"Error opening {history_path}: {e}. Sightings won't be recorded.")
 
-    if not pushover_user_key or not pushover_app_token:
-        pass
-    else:
-        send_pushover_notification(message_body)
+# Function to write this cycle's sightings to the history database
+@timed('save_sightings')
+def save_sightings():
+    if sightings_history is None:
         return
-    print("All notification methods failed")
-    exit()
+    try:
+        sightings_history.flush(time.time())
+    except Exception as e:  # sqlite3.Error, ex. the disk is full or another program holds a lock
+        print(f"Error saving sightings to {history_path}: {e}")
 
-# Function to check if aircraft is within the defined range and/or flagged for special attention
-def check_aircraft(aircraft):
-    hex_code = aircraft.get('hex')
-    lat = aircraft.get('lat')
-    lon = aircraft.get('lon')
-    transponder_type = aircraft.get('type', 'N/A')
-    military_flag = "Yes" if aircraft.get('military', False) or is_military_aircraft(hex_code) else "Unknown"
-    emergency_flag = aircraft.get('emergency', 'none')
-    flight = aircraft.get('flight', 'N/A')
-    global skip_commercial
-    global transponder_types
-    global min_alert_period
-    global hex_watch_list
-    global aircrafts_data
-    hex_code_upper = hex_code.upper()  # Convert to uppercase to match structure of aircrafts.json
-
-    # Calculate distance and direction only if lat and lon are available
-    if lat is not None and lon is not None:
-        dist = haversine(your_lat, your_lon, lat, lon)
-        direction = calculate_direction(your_lat, your_lon, lat, lon)
-        current_time = time.time()
+# Function to turn a --since value into a timestamp: a duration back from now (ex. 90m, 12h, 7d, 2w),
+# today, week (since Monday), month, year, or a date such as 2024-05-01
+def parse_since(text):
+    start_of_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    periods = {
+        'today': start_of_day,
+        'week': start_of_day - timedelta(days=start_of_day.weekday()),
+        'month': start_of_day.replace(day=1),
+        'year': start_of_day.replace(month=1, day=1),
+    }
+    if text in periods:
+        return periods[text].timestamp()
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([mhdw])', text)
+    if match:
+        return time.time() - float(match.group(1)) * {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}[match.group(2)]
+    return datetime.fromisoformat(text).timestamp()
+
+# Function to answer the --history, --top and --recent questions from the history database
+def query_sightings(db, since, aircraft=None, top=None, recent=False, military=False, alerted=False, limit=20):
+    conditions = ["first_seen >= ?"]
+    parameters = [since]
+    if military:
+        conditions.append("military = 1")
+    if alerted:
+        conditions.append("alerted = 1")
 
-        # Capture aircraft type data
-        aircraft_entry = aircrafts_data.get(hex_code_upper)
-        if aircraft_entry:
-            type_info = aircraft_entry.get('d') or aircraft_entry.get('t') or 'Unknown'
+    def when(timestamp):
+        return f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M}"
+
+    if aircraft is not None:
+        # Six hex digits (or a TIS-B "~" address) is a hex code, anything else a callsign
+        column = 'hex' if re.fullmatch(r'~?[0-9a-fA-F]{6}', aircraft) else 'callsign'
+        value = aircraft.lower() if column == 'hex' else aircraft.upper()
+        where = f"{column} = ? AND " + " AND ".join(conditions)
+        count, alerts, closest, first, last = db.execute(
+            f"SELECT COUNT(*), SUM(alerted), MIN(closest_miles), MIN(first_seen), MAX(last_seen) FROM sightings WHERE {where}",
+            [value] + parameters).fetchone()
+        summary = f"{aircraft}: {count} sightings"
+        if count:
+            summary += f" ({alerts} alerted), closest {closest:.2f} mi, first {when(first)}, last {when(last)}"
+        rows = [(when(first_seen), f"{(last_seen - first_seen) / 60:.0f} min", hex_code, callsign, description or type_code,
+                 closest_miles, 'Yes' if was_alerted else '', rule or '')
+                for first_seen, last_seen, hex_code, callsign, type_code, description, closest_miles, was_alerted, rule in db.execute(
+                    f"SELECT first_seen, last_seen, hex, callsign, type_code, description, closest_miles, alerted, rule FROM sightings "
+                    f"WHERE {where} ORDER BY first_seen DESC LIMIT ?", [value] + parameters + [limit])]
+        return summary, ["Seen", "For", "Hex Code", "Callsign", "Aircraft Type", "Closest (mi)", "Alerted", "Rule"], rows
+
+    where = " AND ".join(conditions)
+    if top is not None:
+        group = {'type': "type_code, description", 'callsign': "callsign", 'hex': "hex"}[top]
+        rows = db.execute(f"SELECT {group}, COUNT(*), COUNT(DISTINCT hex), SUM(alerted) FROM sightings WHERE {where} "
+                          f"GROUP BY {group} ORDER BY COUNT(*) DESC LIMIT ?", parameters + [limit]).fetchall()
+        if top == 'type':
+            rows = [(description or type_code or 'Unknown', type_code or '', *counts) for type_code, description, *counts in rows]
+            headers = ["Aircraft Type", "Type Code"]
         else:
-            type_info = 'Unknown'
-            pass  # Handle case where hex is not found
+            headers = ["Callsign" if top == 'callsign' else "Hex Code"]
+        return f"Top {top}s since {when(since)}", headers + ["Sightings", "Aircraft", "Alerted"], rows
 
-        # 1. Check if aircraft is within the defined range
-        if dist > range_miles:
-            return
+    rows = [(when(first_seen), hex_code, callsign, description or type_code, closest_miles, 'Yes' if was_alerted else '', rule or '')
+            for first_seen, hex_code, callsign, type_code, description, closest_miles, was_alerted, rule in db.execute(
+                f"SELECT first_seen, hex, callsign, type_code, description, closest_miles, alerted, rule FROM sightings "
+                f"WHERE {where} ORDER BY first_seen DESC LIMIT ?", parameters + [limit])]
+    return f"Latest sightings since {when(since)}", ["Seen", "Hex Code", "Callsign", "Aircraft Type", "Closest (mi)", "Alerted", "Rule"], rows
+
+# Function to build the terminal table row for an alerting aircraft
+def build_terminal_row(track, comment, zones=None):
+    row = (track.hex, track.flight, track.type_description(), f"{track.dist:.2f}", track.direction, track.gs,
+           track.transponder, 'Yes' if track.military else 'Unknown', track.emergency, "Yes", comment)
+    if alert_zones:
+        row += (", ".join(zone.name for zone in zones or ()),)
+    return row
 
-        # 2. Check if the hex code matches the watch list
-        if hex_code in hex_watch_list:
-            if hex_code not in last_notified or (current_time - last_notified[hex_code]) > min_alert_period:
-                send_notification(aircraft, hex_code, dist, direction)
-                last_notified[hex_code] = current_time
-                terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Hex code in watch list"))
+# A TIS-B aircraft followed across its "~" hex changes. The ID is the first hex the aircraft used.
+class TisbTrack:
+    __slots__ = ('track_id', 'hex', 'lat', 'lon', 'alt', 'baro_rate', 'gs', 'heading', 'time')
+
+    def __init__(self, track_id):
+        self.track_id = track_id
+
+    def update(self, aircraft, lat, lon, position_time):
+        self.hex = aircraft['hex']
+        self.lat = lat
+        self.lon = lon
+        alt = aircraft.get('alt_baro')
+        self.alt = alt if isinstance(alt, (int, float)) else None  # readsb reports 'ground' for aircraft on the ground
+        self.baro_rate = aircraft.get('baro_rate') or 0
+        self.gs = aircraft.get('gs')
+        self.heading = aircraft.get('track')
+        self.time = position_time
+
+    # Dead-reckon the position and altitude at time t from the last ground speed, track and climb rate
+    def predict(self, t):
+        elapsed = t - self.time
+        alt = self.alt + self.baro_rate * elapsed / 60 if self.alt is not None else None
+        if not self.gs or self.heading is None or not elapsed:
+            return self.lat, self.lon, alt, 0.0
+        miles = self.gs * 1.15078 * elapsed / 3600
+        heading = radians(self.heading)
+        lat = self.lat + miles * cos(heading) / 69.0
+        lon = self.lon + miles * sin(heading) / (69.0 * max(cos(radians(lat)), 0.01))
+        return lat, lon, alt, abs(miles)
+
+class TisbTrackCorrelator:
+    """Matches TIS-B hex codes to tracks.
+
+    Tracks are kept in a grid of cells twice the correlation radius wide, indexed by where each
+    track is predicted to be at grid_time, so a new hex is compared only with the tracks in the 3x3
+    cells around it. The grid is rebuilt once grid_time is more than a second old, which makes
+    correlation O(n) per snapshot. A track moves cell when it gets a new position.
+    """
+
+    max_speed_difference = 50     # Knots
+    max_heading_difference = 45   # Degrees
+
+    def __init__(self, radius_miles, max_altitude_difference, timeout):
+        self.radius = radius_miles
+        self.max_altitude_difference = max_altitude_difference
+        self.timeout = timeout
+        self.lat_cell = 2 * radius_miles / 69.0
+        self.lon_cell = self.lat_cell / max(cos(radians(your_lat or 0)), 0.01)
+        self.tracks = {}      # Track ID -> TisbTrack
+        self.hex_tracks = {}  # Hex -> track ID
+        self.grid = {}        # Cell -> set of track IDs
+        self.track_cells = {}
+        self.grid_time = None
+        self.correlated = 0   # Hex changes matched to an existing track
+
+    def cell(self, lat, lon):
+        return (int(lat // self.lat_cell), int(lon // self.lon_cell))
+
+    def place(self, track):
+        lat, lon, _, _ = track.predict(self.grid_time)
+        cell = self.cell(lat, lon)
+        old_cell = self.track_cells.get(track.track_id)
+        if old_cell != cell:
+            if old_cell is not None:
+                self.grid[old_cell].discard(track.track_id)
+            self.grid.setdefault(cell, set()).add(track.track_id)
+            self.track_cells[track.track_id] = cell
+
+    def rebuild_grid(self, t):
+        self.grid_time = t
+        self.grid = {}
+        self.track_cells = {}
+        for track in self.tracks.values():
+            self.place(track)
+
+    # Tracks predicted to be in the 3x3 cells around (lat, lon)
+    def nearby_tracks(self, lat, lon, position_time):
+        if self.grid_time is None or abs(position_time - self.grid_time) > 1.0:
+            self.rebuild_grid(position_time)
+        row, column = self.cell(lat, lon)
+        for i in (-1, 0, 1):
+            for j in (-1, 0, 1):
+                for track_id in self.grid.get((row + i, column + j), ()):
+                    yield self.tracks[track_id]
+
+    # Find the closest track that could have flown to (lat, lon) by position_time
+    def match(self, aircraft, lat, lon, alt, position_time):
+        gs = aircraft.get('gs')
+        heading = aircraft.get('track')
+        best = None
+        best_distance = None
+        for track in self.nearby_tracks(lat, lon, position_time):
+            if track.time > position_time:
+                continue  # Reported more recently under its own hex, so it's a different aircraft
+            if gs is not None and track.gs is not None and abs(gs - track.gs) > self.max_speed_difference:
+                continue
+            if heading is not None and track.heading is not None and abs((heading - track.heading + 180) % 360 - 180) > self.max_heading_difference:
+                continue
+            predicted_lat, predicted_lon, predicted_alt, travelled = track.predict(position_time)
+            if alt is not None and predicted_alt is not None and abs(alt - predicted_alt) > self.max_altitude_difference:
+                continue
+            distance = haversine(lat, lon, predicted_lat, predicted_lon)
+            if distance <= min(self.radius + 0.1 * travelled, 2 * self.radius) and (best is None or distance < best_distance):
+                best = track
+                best_distance = distance
+        return best
+
+    def observe(self, aircraft, lat, lon, position_time):
+        """Record a TIS-B position and return the aircraft's track ID."""
+        hex_code = aircraft['hex']
+        track = self.tracks.get(self.hex_tracks.get(hex_code))
+        if track is None:
+            alt = aircraft.get('alt_baro')
+            track = self.match(aircraft, lat, lon, alt if isinstance(alt, (int, float)) else None, position_time)
+            if track is None:
+                track = self.tracks[hex_code] = TisbTrack(hex_code)
             else:
-                terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Hex code in watch list"))
+                self.correlated += 1
+                self.hex_tracks.pop(track.hex, None)
+                terminal_rows.pop(track.hex, None)  # The table shows the aircraft under its new hex
+            self.hex_tracks[hex_code] = track.track_id
+        track.update(aircraft, lat, lon, position_time)
+        if self.grid_time is not None:
+            self.place(track)
+        return track.track_id
+
+    def expire(self, now):
+        cutoff = now - self.timeout
+        for track_id in [track_id for track_id, track in self.tracks.items() if track.time < cutoff]:
+            track = self.tracks.pop(track_id)
+            if self.hex_tracks.get(track.hex) == track_id:
+                del self.hex_tracks[track.hex]
+            cell = self.track_cells.pop(track_id, None)
+            if cell is not None:
+                self.grid[cell].discard(track_id)
+
+    def track_id(self, hex_code):
+        return self.hex_tracks.get(hex_code, hex_code)
+
+tisb_correlator = None
+
+# Function to pass new TIS-B positions to the correlator, oldest first, so an old hex that is still
+# listed with its last position is known before the hex that replaced it
+def correlate_tisb(aircraft_list, now):
+    global tisb_correlator
+    if tisb_correlator is None:
+        tisb_correlator = TisbTrackCorrelator(tisb_correlation_radius, tisb_correlation_altitude, tisb_track_timeout)
+    current_time = time.time()
+    positions = []
+    for aircraft in aircraft_list:
+        if aircraft['hex'][0] != '~':
+            continue
+        lat = aircraft.get('lat')
+        lon = aircraft.get('lon')
+        if lat is None or lon is None:
+            continue
+        seen_pos = aircraft.get('seen_pos')
+        position_time = now - seen_pos if now is not None and seen_pos is not None else (now or current_time)
+        positions.append((position_time, lat, lon, aircraft))
+    positions.sort(key=lambda position: position[0])
+    for position_time, lat, lon, aircraft in positions:
+        tisb_correlator.observe(aircraft, lat, lon, position_time)
+
+# Function to check if aircraft is within the defined range and/or flagged for special attention
+@timed('check_aircraft')
+def check_aircraft(aircraft, track):
+    hex_code = track.hex
+    dist = track.dist
+    zones = track.zones
+    arrival = track.arrival
+
+    # Only aircraft inside the defined range (or inside a zone) get here, and those predicted to arrive,
+    # which are matched on their closest approach
+    if zones is None:
+        rule = match_alert_rule(aircraft, hex_code, arrival[1] if arrival is not None else dist)
+        if rule is None or rule.action == 'ignore':
+            terminal_rows.pop(hex_code, None)
             return
-        
-        # 3. Check if the callsign matches the watch list
-        for callsign in callsign_watch_list:
-            if flight.startswith(callsign):
-                if hex_code not in last_notified or (current_time - last_notified[hex_code]) > min_alert_period:
-                    send_notification(aircraft, hex_code, dist, direction)
-                    last_notified[hex_code] = current_time
-                    terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Callsign in watch list"))
-                else:
-                    terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Callsign in watch list"))
+    else:
+        # The aircraft alerts for each zone whose own rules match it; the first matching rule names the alert
+        rule = None
+        alerting_zones = []
+        for zone in zones:
+            zone_rule = zone.evaluate(aircraft, hex_code, dist) if zone.evaluate is not None else match_alert_rule(aircraft, hex_code, dist)
+            if zone_rule is not None and zone_rule.action == 'alert':
+                rule = rule or zone_rule
+                alerting_zones.append(zone)
+        if rule is None:
+            terminal_rows.pop(hex_code, None)
+            return
+        zones = alerting_zones
+
+    if last_notified is None:
+        load_alert_state()
+    # TIS-B aircraft are suppressed by track so a hex change doesn't alert again
+    alert_key = tisb_correlator.track_id(hex_code) if tisb_correlator is not None else hex_code
+    current_time = replay_clock if replay_clock is not None else time.time()
+    if last_notified.should_alert(alert_key, current_time):
+        send_notification(track, zones)
+        last_notified.record(alert_key, current_time)
+        track.notified = True
+        if arrival is not None:
+            track.alert_rule = rule.name  # The history only has a visit once the aircraft is within range
+        elif sightings_history is not None:
+            sightings_history.mark_alerted(hex_code, rule.name)
+        count_metric('birdalert_alerts_fired_total')
+    else:
+        if alert_key != hex_code:
+            track.notified = True  # Alerted under an earlier TIS-B hex, whose departure is left to this one
+        count_metric('birdalert_alerts_suppressed_total')
+    comment = rule.name if alert_key == hex_code else f"{rule.name} (TIS-B track {alert_key})"
+    if arrival is not None:
+        comment += f" (arriving in {arrival[0]:.0f}s)"
+    terminal_alert_times[hex_code] = last_notified.alert_times.get(alert_key, current_time)
+    terminal_rows[hex_code] = build_terminal_row(track, comment, zones)
+
+# Function to pass a track event to what consumes it: 'enter' and 'update' go through the alert rules, which
+# notify and fill the terminal table; 'exit' clears the aircraft's row and, with departure_alerts, notifies that
+# an aircraft that alerted has left the area (reason 'left') or dropped out of coverage ('lost')
+def handle_track_event(event, track, aircraft=None, reason=None):
+    if event is None:
+        return
+    count_metric('birdalert_track_events_total', labels=f'event="{event}"')
+    if event != 'exit':
+        check_aircraft(aircraft, track)
+        return
+    terminal_rows.pop(track.hex, None)
+    if departure_alerts and track.notified and track.inside_since is not None:
+        # A TIS-B hex that was replaced by a new one hasn't left: the aircraft carries on under the new hex
+        replaced = track.hex[0] == '~' and tisb_correlator is not None and track.hex not in tisb_correlator.hex_tracks
+        if not replaced:
+            send_departure_notification(track, reason, replay_clock if replay_clock is not None else time.time())
+    track.end_visit()
+
+# Reads the "aircraft" array of a readsb aircraft.json one object at a time
+class AircraftJsonStream:
+    """Incremental aircraft.json parser. The header (and its "now" timestamp) is read on open,
+    then iterating yields each aircraft as soon as its object has been read from disk."""
+
+    now_pattern = re.compile(r'"now"\s*:\s*(-?[0-9.eE+]+)')
+
+    def __init__(self, path, chunk_size=65536):
+        self.file = open(path, 'r')
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.now = None
+        while True:
+            start = self.buffer.find('"aircraft"')
+            if start >= 0:
+                array_start = self.buffer.find('[', start)
+                if array_start >= 0:
+                    break
+            if not self.read_chunk():
+                self.close()
+                raise ValueError("No aircraft array found")
+        match = self.now_pattern.search(self.buffer, 0, start)
+        if match:
+            self.now = float(match.group(1))
+        self.position = array_start + 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def read_chunk(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+        # Drop what has already been parsed so the buffer never holds more than a chunk or two
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def __iter__(self):
+        whitespace = ' \t\r\n,'
+        while True:
+            buffer = self.buffer
+            position = self.position
+            length = len(buffer)
+            while position < length and buffer[position] in whitespace:
+                position += 1
+            self.position = position
+            if position == length:
+                if not self.read_chunk():
+                    raise ValueError("Unexpected end of aircraft array")
+                continue
+            if buffer[position] == ']':
                 return
+            try:
+                aircraft, self.position = self.decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not self.read_chunk():  # The object is cut off at the end of the buffer
+                    raise
+                continue
+            yield aircraft
 
-        # 4. Check if the emergency flag is set
-        if (include_emergency_check and emergency_flag != 'none'):
-            if hex_code not in last_notified or (current_time - last_notified[hex_code]) > min_alert_period:
-                send_notification(aircraft, hex_code, dist, direction)
-                last_notified[hex_code] = current_time
-                terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist=:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Emergency flag set"))
-            else:
-                terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist=:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Emergency flag set"))
+# Waits for readsb to rewrite aircraft.json, using inotify on Linux and a plain sleep elsewhere
+class AircraftJsonWatcher:
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+    def __init__(self, path):
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.name = os.fsencode(os.path.basename(path))
+        self.fd = None
+        if not sys.platform.startswith('linux'):
             return
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return
+            # readsb writes a temporary file and renames it over aircraft.json, so watch the directory
+            if libc.inotify_add_watch(fd, os.fsencode(self.directory), self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE) < 0:
+                os.close(fd)
+                return
+            self.fd = fd
+        except (OSError, AttributeError):
+            self.fd = None
 
-        # 5. Check if the callsign belongs to a commercial airline
-        if skip_commercial == False:
-            pass
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def wait(self, timeout):
+        """Return True as soon as aircraft.json changes, or False once timeout seconds have passed."""
+        if self.fd is None:
+            time.sleep(timeout)
+            return False
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if readable and self.read_events():
+                return True
+
+    def read_events(self):
+        changed = False
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            _, _, _, name_length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            if data[offset:offset + name_length].rstrip(b'\0') == self.name:
+                changed = True
+            offset += name_length
+        return changed
+
+# Identity of the last aircraft.json that was parsed, and the readsb "now" timestamp inside it
+aircraft_json_signature = None
+aircraft_json_now = None
+
+# Flag added to the 24-bit address of a non-ICAO hex ('~' in readsb, ex. TIS-B) so every aircraft has one integer key
+NON_ICAO_FLAG = 1 << 24
+
+# Function to turn a readsb hex into the integer key of its track
+def icao_key(hex_code):
+    try:
+        return int(hex_code[1:], 16) | NON_ICAO_FLAG if hex_code[0] == '~' else int(hex_code, 16)
+    except ValueError:
+        return hex_code  # Not a hex address; tracked under the text instead
+
+# An aircraft the receiver is hearing, updated in place from each snapshot. The fields the terminal table and the
+# notifications show are read from the aircraft once per change, and the type description once per track.
+# state is None outside the area, 'arriving' while predicted to enter it and 'inside' within range_miles (or a zone).
+class AircraftTrack:
+    __slots__ = ('hex', 'change_key', 'cycle', 'last_seen', 'flight', 'transponder', 'emergency', 'military', 'gs',
+                 'type_info', 'type_source', 'state', 'dist', 'direction', 'zones', 'arrival', 'inside_since', 'notified', 'alert_rule')
+
+    def __init__(self, hex_code):
+        self.hex = hex_code
+        self.change_key = None
+        self.cycle = 0
+        self.last_seen = 0.0
+        self.type_info = None
+        self.type_source = None
+        self.state = None
+        self.dist = None
+        self.direction = None
+        self.zones = None
+        self.arrival = None
+        self.inside_since = None  # When the aircraft came inside, for departure notifications
+        self.notified = False     # Whether it alerted during this visit
+        self.alert_rule = None    # Rule it alerted on while arriving, marked in the history once it is within range
+
+    def update(self, aircraft):
+        self.flight = aircraft.get('flight', 'N/A')
+        self.transponder = aircraft.get('type', 'N/A')
+        self.emergency = aircraft.get('emergency', 'none')
+        self.military = bool(aircraft.get('military', False)) or is_military_aircraft(self.hex)
+        self.gs = aircraft.get('gs', 'N/A')
+
+    # The type description, looked up again only once a different aircraft index has been swapped in
+    def type_description(self):
+        if self.type_info is None or self.type_source is not aircrafts_index:
+            self.type_info = get_aircraft_type_info(self.hex)
+            self.type_source = aircrafts_index
+        return self.type_info
+
+    def end_visit(self):
+        self.state = None
+        self.zones = None
+        self.arrival = None
+        self.inside_since = None
+        self.notified = False
+        self.alert_rule = None
+
+class TrackTable:
+    """Tracks of the aircraft in the latest snapshot, keyed by icao_key().
+
+    observe() finds or creates the track of each aircraft as it is read and tells whether it changed. After the
+    geometry stage, move() places a changed track inside the area, arriving or outside it and returns the event
+    that makes: 'enter', 'update' or 'exit' (None for an aircraft that stays outside). end_cycle() removes the
+    tracks of aircraft missing from the snapshot and returns those that were in the area, along with the tracks
+    readsb hasn't heard for track_timeout, as the ones that dropped out of coverage.
+    """
+
+    def __init__(self):
+        self.tracks = {}
+        self.cycle = 0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __contains__(self, hex_code):
+        return icao_key(hex_code) in self.tracks
+
+    def get(self, hex_code):
+        return self.tracks.get(icao_key(hex_code))
+
+    def observe(self, aircraft, now, current_time):
+        """Return the aircraft's track and 'new', 'updated' or 'unchanged'."""
+        key = icao_key(aircraft['hex'])
+        track = self.tracks.get(key)
+        if track is None:
+            track = self.tracks[key] = AircraftTrack(aircraft['hex'])
+        track.cycle = self.cycle
+        track.last_seen = current_time - (aircraft.get('seen') or 0)
+        change_key = aircraft_change_key(aircraft, now)
+        if change_key == track.change_key:
+            return track, 'unchanged'
+        status = 'new' if track.change_key is None else 'updated'
+        track.change_key = change_key
+        track.update(aircraft)
+        return track, status
+
+    def move(self, track, state, current_time, dist=None, direction=None, zones=None, arrival=None):
+        previous = track.state
+        if state is None:
+            return 'exit' if previous is not None else None  # The last position in the area is kept for the exit
+        track.state = state
+        track.dist = dist
+        track.direction = direction
+        track.zones = zones
+        track.arrival = arrival
+        if state == 'inside' and track.inside_since is None:
+            track.inside_since = current_time
+        return 'enter' if previous is None else 'update'
+
+    def remove(self, hex_code):
+        return self.tracks.pop(icao_key(hex_code), None)
+
+    def end_cycle(self, current_time):
+        """Return the number of tracks removed and the tracks that left the area by dropping out of coverage."""
+        cutoff = current_time - track_timeout
+        removed = []
+        lost = []
+        for key, track in self.tracks.items():
+            if track.cycle != self.cycle:
+                removed.append(key)
+                if track.state is not None:
+                    lost.append(track)
+            elif track.state is not None and track.last_seen < cutoff:
+                lost.append(track)
+        for key in removed:
+            del self.tracks[key]
+        self.cycle += 1
+        return len(removed), lost
+
+# Track of every aircraft in the latest snapshot
+aircraft_tracks = TrackTable()
+
+# Counts from the most recent snapshot, shown under the terminal table
+ingest_stats = {'new': 0, 'updated': 0, 'unchanged': 0, 'gone': 0, 'skipped': 0}
+
+# Time of the snapshot being replayed by replay_recording(), used in place of the clock for alert suppression
+replay_clock = None
+
+# Values that can change the outcome of the alert rules. seen_pos is relative to "now", so
+# now - seen_pos is the time of the last position and only changes when a new position arrives.
+def aircraft_change_key(aircraft, now):
+    seen_pos = aircraft.get('seen_pos')
+    position_time = round(now - seen_pos, 1) if seen_pos is not None and now is not None else (aircraft.get('lat'), aircraft.get('lon'))
+    return (position_time, aircraft.get('flight'), aircraft.get('emergency'), aircraft.get('type'), aircraft.get('military'))
+
+# Function to evaluate a snapshot batch by batch. Each aircraft is compared with the previous snapshot and
+# only new or updated aircraft go through the geometry stage and the alert rules.
+def process_snapshot(aircraft_iter, now, batch_size=None):
+    counts = {'new': 0, 'updated': 0, 'unchanged': 0}
+    batch = []
+    recorded = [] if record_path else None
+    for aircraft in aircraft_iter:
+        if aircraft.get('hex'):
+            batch.append(aircraft)
+            if recorded is not None:
+                recorded.append(aircraft)
+            if batch_size and len(batch) >= batch_size:
+                process_batch(batch, now, counts)
+                batch = []
+    process_batch(batch, now, counts)
+    if recorded is not None:
+        record_snapshot(now, recorded)
+
+    gone, lost = aircraft_tracks.end_cycle(now if now is not None else time.time())
+    for track in lost:
+        handle_track_event('exit', track, reason='lost')
+    prune_military_cache(aircraft_tracks)
+    ingest_stats.update(counts, gone=gone)
+    if tisb_correlator is not None:
+        tisb_correlator.expire(now if now is not None else time.time())
+    flush_notifications()
+
+# Each changed aircraft's track is placed inside the area, arriving or outside it, and the events that makes
+# go to handle_track_event()
+def process_batch(batch, now, counts):
+    if not batch:
+        return
+    classify_military([aircraft['hex'] for aircraft in batch], prune=False)
+    seen = time.time()
+    current_time = replay_clock if replay_clock is not None else seen
+    stale = (now if now is not None else seen) - track_timeout
+    changed = []
+    changed_tracks = {}  # id(aircraft) -> track
+    for aircraft in batch:
+        track, status = aircraft_tracks.observe(aircraft, now, now if now is not None else seen)
+        counts[status] += 1
+        if status != 'unchanged':
+            changed_tracks[id(aircraft)] = track
+            if track.last_seen >= stale:  # An aircraft readsb has stopped hearing is out of coverage, wherever it was last
+                changed.append(aircraft)
+    count_metric('birdalert_aircraft_processed_total', len(batch))
+    count_metric('birdalert_aircraft_evaluated_total', len(changed))
+    if correlate_tisb_tracks:
+        correlate_tisb(changed, now)
+    if rule_schedules:
+        update_rule_schedules(current_time)
+    if alert_zones:
+        located = locate_in_zones(changed)
+    else:
+        located = [(aircraft, dist, direction, None) for aircraft, dist, direction in compute_snapshot_geometry(changed)]
+    placed = set()
+    for aircraft, dist, direction, zones in located:
+        track = changed_tracks[id(aircraft)]
+        placed.add(id(aircraft))
+        if sightings_history is not None:
+            sightings_history.observe(aircraft, aircraft['hex'], dist, seen)
+            if track.alert_rule is not None:
+                sightings_history.mark_alerted(aircraft['hex'], track.alert_rule)
+                track.alert_rule = None
+        handle_track_event(aircraft_tracks.move(track, 'inside', current_time, dist, direction, zones), track, aircraft)
+    if arrival_alerts and not alert_zones:
+        arrivals = predict_arrivals(changed)
+        count_metric('birdalert_arrivals_predicted_total', len(arrivals))
+        for aircraft, dist, direction, arrival in arrivals:
+            if id(aircraft) not in placed:
+                track = changed_tracks[id(aircraft)]
+                placed.add(id(aircraft))
+                handle_track_event(aircraft_tracks.move(track, 'arriving', current_time, dist, direction, arrival=arrival), track, aircraft)
+    for key, track in changed_tracks.items():
+        if track.state is not None and key not in placed:
+            handle_track_event(aircraft_tracks.move(track, None, current_time), track, reason='lost' if track.last_seen < stale else 'left')
+
+# Layout of a recording file: a series of chunks, each a header followed by zlib-compressed JSON lines.
+# The first line of a chunk is a full snapshot ({"now", "aircraft"}) and each following line holds only
+# what changed since the snapshot before it ({"now", "set": {hex: changed fields, null if removed}, "gone"}),
+# so every chunk can be decoded on its own and a crash or a deleted file only loses whole chunks.
+RECORDING_MAGIC = b'BRC1'
+RECORDING_CHUNK_HEADER = struct.Struct('<4sII')  # magic, compressed length, crc32 of the compressed bytes
+
+class SnapshotRecorder:
+    """Appends aircraft snapshots to recording files in a folder, keeping the folder under max_bytes."""
+    snapshots_per_chunk = 60  # About 5 minutes at the default update_rate; also the most a crash can lose
+
+    def __init__(self, directory, max_bytes, file_seconds):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.file_seconds = file_seconds
+        self.file = None
+        self.path = None
+        self.opened_at = 0.0
+        self.previous = {}  # Aircraft as last recorded, keyed by hex
+        self.lines = []  # Encoded snapshots of the chunk being built
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, now, aircraft_list):
+        if self.file is None or now - self.opened_at >= self.file_seconds or self.file.tell() >= self.max_bytes // 10:
+            self.start_file(now)
+        current = {aircraft['hex']: aircraft for aircraft in aircraft_list}
+        if not self.lines:
+            entry = {'now': now, 'aircraft': aircraft_list}
         else:
-            if flight.startswith((
-                'AAL',  # American Airlines
-                'AAY',  # Allegiant Air
-                'ACA',  # Air Canada
-                'AFR',  # Air France
-                'AIC',  # Air India
-                'AMX',  # Aeromexico
-                'ANA',  # All Nippon Airways
-                'ASA',  # Alaska Airlines
-                'ASH',  # Mesa Airlines
-                'ATN',  # Air Transport International (Cargo)
-                'AWI',  # Air Wisconsin
-                'BAW',  # British Airways
-                'BTA',  # Envoy Air (formerly American Eagle)
-                'CFG',  # Condor
-                'CHQ',  # Chautauqua Airlines
-                'CPA',  # Cathay Pacific
-                'CRE',  # Corporate Air (Cargo)
-                'CXK',  # Kalitta Charters (Cargo)
-                'DAL',  # Delta Air Lines
-                'DLH',  # Lufthansa
-                'EIN',  # Aer Lingus
-                'EJA',  # NetJets (Charter)
-                'EJM',  # Executive Jet Management (Charter)
-                'ENY',  # Envoy Air
-                'ETD',  # Etihad Airways
-                'EZY',  # easyJet
-                'FDX',  # FedEx (Cargo)
-                'FDY',  # Southern Airways Express
-                'FFT',  # Frontier Airlines
-                'GES',  # Gestair (Charter)
-                'GJS',  # GoJet Airlines
-                'ICE',  # Icelandair
-                'JAL',  # Japan Airlines
-                'JBU',  # JetBlue Airways
-                'JIA',  # PSA Airlines
-                'JRE',  # flyExclusive (Charter)
-                'JSX',  # JetSuiteX (Charter)
-                'JTL',  # Jet Linx Aviation (Charter)
-                'JTZ',  # Nicholas Air (Charter)
-                'KAL',  # Korean Air
-                'KLM',  # KLM Royal Dutch Airlines
-                'LOF',  # Trans States Airlines
-                'LXJ',  # Flexjet (Charter)
-                'LYM',  # Key Lime Air (Cargo/Regional)
-                'MVJ',  # Marvel Air Services (Charter)
-                'MXY',  # Breeze Airways
-                'NKS',  # Spirit Airlines
-                'PDT',  # Piedmont Airlines
-                'QFA',  # Qantas
-                'QXE',  # Horizon Air
-                'RPA',  # Republic Airways
-                'RYR',  # Ryanair
-                'SAS',  # Scandinavian Airlines
-                'SCX',  # Sun Country Airlines (Charter)
-                'SIA',  # Singapore Airlines
-                'SKW',  # SkyWest Airlines
-                'SWA',  # Southwest Airlines
-                'SWQ',  # Swift Air (Charter)
-                'THA',  # Thai Airways
-                'TSC',  # Air Transat
-                'TWY',  # Solairus Aviation (Charter)
-                'UAL',  # United Airlines
-                'UAE',  # Emirates
-                'UJC',  # Ultimate Jetcharters (Charter)
-                'UPS',  # United Parcel Service (Cargo)
-                'VIR',  # Virgin Atlantic
-                'VJA',  # Vista America (Charter)
-                'VOI',  # Volaris
-                'VRD',  # Virgin America (now merged with Alaska Airlines)
-                'WJA',  # WestJet
-                'XSR'   # Executive AirShare (Charter)
-            )):
+            changes = {}
+            previous = self.previous
+            for hex_code, aircraft in current.items():
+                old = previous.get(hex_code)
+                if old is None:
+                    changes[hex_code] = aircraft
+                elif old != aircraft:
+                    fields = {key: value for key, value in aircraft.items() if old.get(key) != value}
+                    for key in old.keys() - aircraft.keys():
+                        fields[key] = None
+                    changes[hex_code] = fields
+            entry = {'now': now, 'set': changes, 'gone': [hex_code for hex_code in previous if hex_code not in current]}
+        self.lines.append(json.dumps(entry, separators=(',', ':')))
+        self.previous = current
+        if len(self.lines) >= self.snapshots_per_chunk:
+            self.flush()
+
+    def flush(self):
+        if not self.lines or self.file is None:
+            return
+        data = zlib.compress('\n'.join(self.lines).encode('utf-8'), 6)
+        self.file.write(RECORDING_CHUNK_HEADER.pack(RECORDING_MAGIC, len(data), zlib.crc32(data)) + data)
+        self.file.flush()
+        self.lines = []
+
+    def start_file(self, now):
+        self.close()
+        self.path = os.path.join(self.directory, f"birdalert-{datetime.fromtimestamp(now):%Y%m%d-%H%M%S}.rec")
+        self.file = open(self.path, 'ab')
+        self.opened_at = now
+        self.remove_old_files()
+
+    def remove_old_files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.rec') and path != self.path:
+                files.append((os.path.getmtime(path), os.path.getsize(path), path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total + self.max_bytes // 10 <= self.max_bytes:  # Leave room for the file being written
+                break
+            os.remove(path)
+            total -= size
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+# Snapshots waiting to be encoded and written by the recorder thread, which does its work while the
+# poll loop waits for the next update rather than in the middle of a cycle
+recording_queue = None
+recording_thread = None
+
+# Function to hand a snapshot to the recorder thread for record_path
+@timed('record_snapshot')
+def record_snapshot(now, aircraft_list):
+    global recording_queue, recording_thread
+    if recording_thread is None:
+        recorder = SnapshotRecorder(os.path.expanduser(record_path), int(record_max_mb * 1024 * 1024), record_file_minutes * 60)
+        recording_queue = queue.Queue(maxsize=20)
+        recording_thread = threading.Thread(target=run_recorder, args=(recorder,), name='recorder', daemon=True)
+        recording_thread.start()
+        atexit.register(stop_recording)
+    try:
+        recording_queue.put_nowait((now if now is not None else time.time(), aircraft_list))
+    except queue.Full:
+        count_metric('birdalert_snapshots_not_recorded_total')  # The disk can't keep up; skip rather than stall alerts
+
+def run_recorder(recorder):
+    while True:
+        item = recording_queue.get()
+        try:
+            if item is None:
+                recorder.close()
                 return
+            recorder.record(*item)
+        except OSError as e:
+            print(f"Error recording to {record_path}: {e}")
+        finally:
+            recording_queue.task_done()
+
+# Function to write out the chunk being built when the script exits
+def stop_recording():
+    recording_queue.put(None)
+    recording_thread.join(timeout=10)
+
+# Function to read snapshots back from recording files, oldest first. Yields (now, aircraft list).
+def read_recording(paths):
+    for path in paths:
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(RECORDING_CHUNK_HEADER.size)
+                if len(header) < RECORDING_CHUNK_HEADER.size:
+                    break
+                magic, length, crc = RECORDING_CHUNK_HEADER.unpack(header)
+                data = f.read(length)
+                if magic != RECORDING_MAGIC or len(data) < length or zlib.crc32(data) != crc:
+                    print(f"{path} is damaged after {f.tell() - len(data) - len(header)} bytes. Skipping the rest of it.")
+                    break
+                aircraft = {}
+                for line in zlib.decompress(data).split(b'\n'):
+                    entry = json_loads(line)
+                    if 'aircraft' in entry:
+                        aircraft = {item['hex']: item for item in entry['aircraft']}
+                    else:
+                        for hex_code in entry['gone']:
+                            del aircraft[hex_code]
+                        for hex_code, fields in entry['set'].items():
+                            old = aircraft.get(hex_code)
+                            if old is None:
+                                aircraft[hex_code] = fields
+                                continue
+                            updated = dict(old)  # Earlier snapshots may still be referenced
+                            for key, value in fields.items():
+                                if value is None:
+                                    updated.pop(key, None)
+                                else:
+                                    updated[key] = value
+                            aircraft[hex_code] = updated
+                    yield entry['now'], list(aircraft.values())
+
+# One place aircraft are read from: a local aircraft.json or a readsb-compatible URL
+class AircraftSource:
+    def __init__(self, location):
+        self.location = location
+        self.is_url = location.startswith(('http://', 'https://'))
+        self.name = urlparse(location).netloc if self.is_url else location
+        self.session = None  # Each source keeps its own keep-alive connection
+        self.signature = None
+        self.now = None
+        self.aircraft = []
+        self.updated_at = 0.0
+        self.latency = None
+        self.status = "waiting"
+        self.pending = None  # A fetch still running from an earlier cycle
 
-        # 6. Check if the hex code or flag indicates military
-        if (include_military_check and (aircraft.get('military', False) or is_military_aircraft(hex_code))):
-            if hex_code not in last_notified or (current_time - last_notified[hex_code]) > min_alert_period:
-                send_notification(aircraft, hex_code, dist, direction)
-                last_notified[hex_code] = current_time
-                terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Military aircraft"))
+    # Runs in a fetch thread. Returns (signature, now, aircraft), or None if the file hasn't changed.
+    def fetch(self):
+        start = time.perf_counter()
+        try:
+            if self.is_url:
+                if self.session is None:
+                    import requests
+                    self.session = requests.Session()
+                url = self.location.format(lat=your_lat, lon=your_lon, radius_nm=round(range_miles * 0.868976, 1))
+                response = self.session.get(url, timeout=source_timeout)
+                response.raise_for_status()
+                signature = None
+                data = json_loads(response.content)
             else:
-                terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Military aircraft"))
-            return
-        
-        # 7. Check the transponder type
-        if transponder_type in transponder_types:
-            if hex_code not in last_notified or (current_time - last_notified[hex_code]) > min_alert_period:
-                send_notification(aircraft, hex_code, dist, direction)
-                last_notified[hex_code] = current_time
-                terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Matches desired transponder type"))
+                stat = os.stat(self.location)
+                signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                if signature == self.signature:
+                    return None
+                with open(self.location, 'rb') as f:
+                    data = json_loads(f.read())
+        finally:
+            self.latency = time.perf_counter() - start
+            observe_metric('birdalert_source_fetch_seconds', self.latency, f'source="{self.name}"')
+        if not isinstance(data, dict):
+            raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+        now = data.get('now')
+        if now is not None and now > 1e11:
+            now /= 1000  # Tracker APIs such as airplanes.live report milliseconds
+        return signature, now, data.get('aircraft', data.get('ac')) or []
+
+# Sources built from aircraft_json_path and aircraft_sources, and the threads fetching them
+aircraft_source_list = None
+aircraft_source_executor = None
+
+# Function to merge snapshots from several sources, keeping the freshest position of each aircraft.
+# seen_pos is rewritten relative to the newest snapshot's "now" so positions from every source compare.
+def merge_aircraft_snapshots(snapshots):
+    nows = [now for now, _ in snapshots if now is not None]
+    merged_now = max(nows) if nows else None
+    best = {}
+    for now, aircraft_list in snapshots:
+        offset = merged_now - now if merged_now is not None and now is not None else 0.0
+        for aircraft in aircraft_list:
+            hex_code = aircraft.get('hex')
+            if not hex_code:
+                continue
+            seen_pos = aircraft.get('seen_pos')
+            age = seen_pos + offset if seen_pos is not None else float('inf')
+            current = best.get(hex_code)
+            if current is None or age < current[0]:
+                best[hex_code] = (age, offset, aircraft)
+    merged = []
+    for age, offset, aircraft in best.values():
+        if offset and age != float('inf'):
+            aircraft = dict(aircraft, seen_pos=round(age, 1))
+        merged.append(aircraft)
+    return merged_now, merged
+
+# Function to read every source at once and feed the merged aircraft through the rules. Each source
+# gets source_timeout seconds; a source still running after that is collected on a later cycle. A source
+# whose last fetch failed or timed out isn't waited for until it answers again, so it can't hold up every cycle.
+def fetch_aircraft_sources():
+    from concurrent import futures
+    global aircraft_source_list
+    global aircraft_source_executor
+    global aircraft_json_now
+    if aircraft_source_list is None:
+        locations = ([aircraft_json_path] if aircraft_json_path else []) + list(aircraft_sources)
+        aircraft_source_list = [AircraftSource(location) for location in locations]
+        aircraft_source_executor = futures.ThreadPoolExecutor(max_workers=len(aircraft_source_list), thread_name_prefix='source')
+
+    for source in aircraft_source_list:
+        if source.pending is None:
+            source.pending = aircraft_source_executor.submit(source.fetch)
+    futures.wait([source.pending for source in aircraft_source_list if source.status in ("ok", "waiting")], timeout=source_timeout)
+
+    changed = False
+    current_time = time.time()
+    snapshots = []
+    for source in aircraft_source_list:
+        if source.pending.done():
+            future = source.pending
+            source.pending = None
+            try:
+                result = future.result()
+            except (OSError, ValueError) as e:  # requests.exceptions.RequestException is an OSError
+                source.status = f"failed ({type(e).__name__})"
             else:
-                terminal_table.append((hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'), aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or is_military_aircraft(hex_code) else 'Unknown', aircraft.get('emergency', 'none'), "Yes", "Matches desired transponder type"))
+                source.status = "ok"
+                source.updated_at = current_time
+                if result is not None:
+                    signature, now, aircraft = result
+                    changed = changed or now is None or now != source.now
+                    source.signature, source.now, source.aircraft = signature, now, aircraft
         else:
-            pass
-    else:
-        pass
+            source.status = "timed out"
+        if current_time - source.updated_at <= source_max_age:
+            snapshots.append((source.now, source.aircraft))
+        elif source.aircraft:
+            source.aircraft = []  # Too old to trust; the aircraft will be reported gone
+            changed = True
+
+    if not changed:
+        ingest_stats['skipped'] += 1
+        return
+    now, merged = merge_aircraft_snapshots(snapshots)
+    aircraft_json_now = now
+    process_snapshot(merged, now)
+
+# Function to summarize each source's latest fetch for the terminal
+def source_status():
+    if not aircraft_source_list or len(aircraft_source_list) < 2:
+        return ""
+    return "Sources: " + ", ".join(
+        f"{source.name} {source.status}" + (f" {source.latency * 1000:.0f}ms" if source.latency is not None else "") +
+        f" ({len(source.aircraft)} aircraft)" for source in aircraft_source_list)
 
-# Fetch data from your local feeder server aircraft.json 
+# Fetch data from your local feeder server aircraft.json, skipping the work if readsb hasn't rewritten it
+@timed('fetch_aircraft_data')
 def fetch_aircraft_data():
     global aircraft_json_path
     global aircrafts_json_path_expanded
+    global aircraft_json_signature
+    global aircraft_json_now
+    if aircraft_sources:
+        fetch_aircraft_sources()
+        return
     try:
         file_path = aircraft_json_path
-        with open(file_path, 'r') as f:
-            aircraft_data = json.load(f)
-            for aircraft in aircraft_data.get('aircraft', []):
-                check_aircraft(aircraft)
+        stat = os.stat(file_path)
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == aircraft_json_signature:
+            ingest_stats['skipped'] += 1
+            return
+        if stream_aircraft_json:
+            with AircraftJsonStream(file_path) as stream:
+                aircraft_json_signature = signature
+                if stream.now is not None and stream.now == aircraft_json_now:
+                    ingest_stats['skipped'] += 1
+                    return
+                aircraft_json_now = stream.now
+                process_snapshot(stream, stream.now, stream_batch_size)
+            return
+
+        with open(file_path, 'rb') as f:
+            aircraft_data = json_loads(f.read())
+        aircraft_json_signature = signature
+        now = aircraft_data.get('now')
+        if now is not None and now == aircraft_json_now:
+            ingest_stats['skipped'] += 1
+            return
+        aircraft_json_now = now
+        process_snapshot(aircraft_data.get('aircraft', []), now)
     except FileNotFoundError:
         print(f"File not found: {aircraft_json_path} or {aircrafts_json_path_expanded}")
-    except json.JSONDecodeError:
+    except ValueError:  # json.JSONDecodeError and the other backends' decode errors
         print("Error decoding JSON response")
 
+# Emergency names readsb uses in aircraft.json for the emergency squawk codes
+sbs_emergency_squawks = {'7500': 'unlawful', '7600': 'nordo', '7700': 'general'}
+
+# Reads aircraft updates from readsb's SBS (BaseStation) or JSON position output and checks each
+# aircraft the moment a new position arrives, instead of waiting for the next aircraft.json.
+class AircraftStreamReader:
+    default_ports = {'sbs': 30003, 'json_stream': 30047}
+
+    def __init__(self, host, port, protocol):
+        if protocol not in self.default_ports:
+            raise ValueError(f"Unknown ingest_mode: {protocol}")
+        self.host = host
+        self.port = port or self.default_ports[protocol]
+        self.protocol = protocol
+        self.sock = None
+        self.buffer = b''
+        self.aircraft = {}  # Fields gathered from SBS messages for each aircraft, keyed by hex, in aircraft.json form
+        self.last_heard = {}
+        self.last_data = 0.0
+        self.retry_delay = stream_reconnect_delay
+        self.next_attempt = 0.0
+        self.messages = 0
+        self.status = "Not connected"
+
+    def connect(self):
+        try:
+            self.sock = socket.create_connection((self.host, self.port), timeout=10)
+        except OSError as e:
+            self.status = f"Couldn't connect to {self.host}:{self.port} ({e}), retrying in {self.retry_delay}s"
+            self.next_attempt = time.time() + self.retry_delay
+            self.retry_delay = min(self.retry_delay * 2, 120)
+            return False
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.buffer = b''
+        self.last_data = time.time()
+        self.retry_delay = stream_reconnect_delay
+        self.status = f"Connected to {self.host}:{self.port} ({self.protocol})"
+        count_metric('birdalert_stream_connects_total')
+        return True
+
+    def disconnect(self, reason):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.status = f"{reason}, reconnecting in {self.retry_delay}s"
+        self.next_attempt = time.time() + self.retry_delay
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    # Read and process messages until the deadline, reconnecting whenever the connection is lost
+    def run_until(self, deadline):
+        while True:
+            now = time.time()
+            if now >= deadline:
+                return
+            if self.sock is None:
+                if now < self.next_attempt:
+                    time.sleep(min(self.next_attempt, deadline) - now)
+                    continue
+                if not self.connect():
+                    continue
+            if now - self.last_data > stream_aircraft_timeout:
+                self.disconnect(f"No data from {self.host}:{self.port} for {stream_aircraft_timeout}s")
+                continue
+            try:
+                readable, _, _ = select.select([self.sock], [], [], deadline - now)
+                if not readable:
+                    continue
+                data = self.sock.recv(65536)
+            except OSError as e:
+                self.disconnect(f"Connection to {self.host}:{self.port} failed ({e})")
+                continue
+            if not data:
+                self.disconnect(f"{self.host}:{self.port} closed the connection")
+                continue
+            self.last_data = time.time()
+            self.feed(data)
+
+    # Split the received bytes into lines, keeping a partial last line for the next read
+    def feed(self, data):
+        lines = (self.buffer + data).split(b'\n')
+        self.buffer = lines.pop()
+        if len(self.buffer) > 1 << 20:
+            self.buffer = b''  # Not a line-based stream; don't let the buffer grow forever
+        for line in lines:
+            if line.strip():
+                self.handle_line(line)
+        flush_notifications()  # Alerts from the messages of one read share a digest
+
+    def handle_line(self, line):
+        if self.protocol == 'sbs':
+            aircraft = self.parse_sbs(line)
+            now = None
+        else:
+            try:
+                aircraft = json_loads(line)
+            except ValueError:
+                return
+            if not isinstance(aircraft, dict) or not aircraft.get('hex'):
+                return
+            now = aircraft.get('now')
+            self.aircraft[aircraft['hex']] = aircraft  # Latest message per aircraft, for record_path
+        if aircraft is None:
+            return
+        self.messages += 1
+        count_metric('birdalert_stream_messages_total')
+        self.last_heard[aircraft['hex']] = time.time()
+        process_batch([aircraft], now, ingest_stats)
+
+    # Merge one BaseStation message into the aircraft's state. Fields: MSG,type,session,aircraft,hex,flight,
+    # date,time,date,time,callsign,altitude,speed,track,lat,lon,vertical rate,squawk,alert,emergency,spi,ground
+    def parse_sbs(self, line):
+        fields = line.decode('ascii', 'replace').rstrip('\r').split(',')
+        if len(fields) < 22 or fields[0] not in ('MSG', 'MLAT'):
+            return None
+        hex_code = fields[4].strip().lower()
+        if not hex_code:
+            return None
+        aircraft = self.aircraft.get(hex_code)
+        if aircraft is None:
+            # SBS doesn't carry the transponder type, so it is inferred from the message source and address
+            aircraft = self.aircraft[hex_code] = {'hex': hex_code, 'type': 'tisb_other' if hex_code.startswith('~') else 'adsb_icao'}
+        try:
+            if fields[10].strip():
+                aircraft['flight'] = fields[10].strip()
+            if fields[11]:
+                aircraft['alt_baro'] = int(float(fields[11]))
+            if fields[12]:
+                aircraft['gs'] = float(fields[12])
+            if fields[13]:
+                aircraft['track'] = float(fields[13])
+            if fields[14] and fields[15]:
+                aircraft['lat'] = float(fields[14])
+                aircraft['lon'] = float(fields[15])
+                if fields[0] == 'MLAT':
+                    aircraft['type'] = 'mlat'
+            if fields[17]:
+                aircraft['squawk'] = fields[17]
+                aircraft['emergency'] = sbs_emergency_squawks.get(fields[17], 'none')
+            if fields[19] in ('-1', '1') and aircraft.get('emergency', 'none') == 'none':
+                aircraft['emergency'] = 'general'
+        except ValueError:
+            return None
+        return aircraft
+
+    # Drop aircraft that haven't been heard from for stream_aircraft_timeout seconds
+    def expire(self):
+        cutoff = time.time() - stream_aircraft_timeout
+        gone = [hex_code for hex_code, heard in self.last_heard.items() if heard < cutoff]
+        for hex_code in gone:
+            del self.last_heard[hex_code]
+            self.aircraft.pop(hex_code, None)
+            track = aircraft_tracks.remove(hex_code)
+            if track is not None and track.state is not None:
+                handle_track_event('exit', track, reason='lost')
+        prune_military_cache(aircraft_tracks)
+        ingest_stats['gone'] += len(gone)
+        if tisb_correlator is not None:
+            tisb_correlator.expire(time.time())
+
+# Function to gather the status lines shown under the table
+def status_lines():
+    lines = [str(aircrafts_status), notification_status()]
+    if aircraft_sources:
+        lines.append(source_status())
+    if metrics_enabled:
+        lines.append(metrics_summary())
+    if last_notified is not None:
+        lines.append(f"Alert suppression: {len(last_notified)} aircraft, {last_notified.evictions} expired, "
+                     f"{last_notified.hit_rate():.0%} of alerts suppressed")
+    lines.append(f"Aircraft: {len(aircraft_tracks)} ({ingest_stats['new']} new, {ingest_stats['updated']} updated, "
+                 f"{ingest_stats['unchanged']} unchanged, {ingest_stats['gone']} gone)")
+    if tisb_correlator is not None and tisb_correlator.tracks:
+        lines.append(f"TIS-B tracks: {len(tisb_correlator.tracks)} ({tisb_correlator.correlated} hex changes followed)")
+    if aircraft_stream is not None:
+        lines.append(f"{aircraft_stream.status}, {aircraft_stream.messages} messages")
+    else:
+        lines.append("Fetching latest data...")
+    return lines
+
+# Live table drawn with curses. The screen is remembered cell by cell and only cells whose text changed
+# are written, so the table doesn't flicker and an unchanged frame sends nothing to the terminal.
+class CursesDisplay:
+    max_column_width = 34
+
+    def __init__(self):
+        import curses  # Only needed for this view, and not available on every platform
+        self.curses = curses
+        self.screen = curses.initscr()
+        curses.noecho()
+        curses.cbreak()
+        self.screen.keypad(True)
+        self.screen.nodelay(True)
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        self.sort = display_sort
+        self.offset = 0
+        self.page = 1
+        self.drawn = {}  # Screen line -> (attribute, [(x, text), ...]) as last drawn
+        self.messages = deque(maxlen=3)
+        self.stdout = sys.stdout
+        sys.stdout = self  # Anything printed while the view is up is shown under the table instead
+        atexit.register(self.close)
+
+    def write(self, text):
+        for line in text.splitlines():
+            if line.strip():
+                self.messages.append(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.screen is None:
+            return
+        sys.stdout = self.stdout
+        self.curses.endwin()
+        self.screen = None
+
+    def sorted_rows(self):
+        if self.sort == 'alert_time':
+            hex_codes = sorted(terminal_rows, key=lambda hex_code: terminal_alert_times.get(hex_code, 0), reverse=True)
+        else:
+            hex_codes = sorted(terminal_rows, key=lambda hex_code: float(terminal_rows[hex_code][3]))
+        return [terminal_rows[hex_code] for hex_code in hex_codes]
+
+    def handle_keys(self):
+        """Process waiting key presses. Returns True if the view needs redrawing."""
+        curses = self.curses
+        redraw = False
+        while True:
+            key = self.screen.getch()
+            if key == -1:
+                return redraw
+            if key in (ord('q'), ord('Q')):
+                raise SystemExit
+            if key in (ord('s'), ord('S')):
+                self.sort = 'alert_time' if self.sort == 'distance' else 'distance'
+                self.offset = 0
+            elif key in (curses.KEY_DOWN, ord('j')):
+                self.offset += 1
+            elif key in (curses.KEY_UP, ord('k')):
+                self.offset -= 1
+            elif key in (curses.KEY_NPAGE, ord(' ')):
+                self.offset += self.page
+            elif key == curses.KEY_PPAGE:
+                self.offset -= self.page
+            elif key == curses.KEY_HOME:
+                self.offset = 0
+            elif key == curses.KEY_END:
+                self.offset = len(terminal_rows)
+            elif key == curses.KEY_RESIZE:
+                curses.update_lines_cols()
+                self.screen.clear()
+                self.drawn = {}
+            else:
+                continue
+            redraw = True
+
+    def draw_line(self, y, cells, width, attribute=0):
+        cells = [(x, text[:width - 1 - x]) for x, text in cells if x < width - 1]
+        previous_attribute, previous = self.drawn.get(y, (0, []))
+        if previous_attribute == attribute and previous == cells:
+            return
+        try:
+            if previous_attribute != attribute or [x for x, _ in previous] != [x for x, _ in cells]:
+                self.screen.move(y, 0)
+                self.screen.clrtoeol()
+                changed = cells
+            else:
+                changed = [cell for cell, old in zip(cells, previous) if cell != old]
+            for x, text in changed:
+                self.screen.addstr(y, x, text, attribute)
+        except self.curses.error:
+            pass  # Writing into the bottom-right corner or a terminal that just shrank
+        self.drawn[y] = (attribute, cells)
+
+    def render(self, headers, rows, footer):
+        curses = self.curses
+        height, width = self.screen.getmaxyx()
+        rows = [[str(value) for value in row] for row in rows]
+        widths = [min(max([len(header)] + [len(row[i]) for row in rows]), self.max_column_width) for i, header in enumerate(headers)]
+        positions = [sum(widths[:i]) + 2 * i for i in range(len(widths))]
+
+        def cells(values):
+            return [(x, value[:column_width].ljust(column_width)) for x, column_width, value in zip(positions, widths, values)]
+
+        footer = footer + list(self.messages)
+        self.page = max(height - 3 - len(footer), 1)
+        self.offset = max(0, min(self.offset, len(rows) - self.page))
+        shown = rows[self.offset:self.offset + self.page]
+        title = (f"BirdAlert  {len(rows)} aircraft alerting, sorted by {self.sort.replace('_', ' ')}"
+                 + (f", rows {self.offset + 1}-{self.offset + len(shown)}" if len(shown) < len(rows) else "")
+                 + "    s: sort  arrows/PgUp/PgDn: scroll  q: quit")
+        self.draw_line(0, [(0, title)], width, curses.A_BOLD)
+        self.draw_line(1, cells(headers), width, curses.A_REVERSE)
+        for y in range(2, 2 + self.page):
+            index = y - 2
+            self.draw_line(y, cells(shown[index]) if index < len(shown) else [], width)
+        self.draw_line(2 + self.page, [], width)
+        for y, line in enumerate(footer, start=height - len(footer)):
+            if y > 2 + self.page:
+                self.draw_line(y, [(0, line)], width)
+        self.screen.noutrefresh()
+        curses.doupdate()
+
+terminal_view = None
+
+# Function to pick the display for display_mode 'auto'
+def current_display_mode():
+    global display_mode
+    if display_mode == 'auto':
+        if not sys.stdout.isatty():
+            display_mode = 'headless'
+        else:
+            try:
+                import curses
+                display_mode = 'curses'
+            except ImportError:
+                display_mode = 'table'
+    return display_mode
+
+@timed('display_alerts')
 def display_alerts():
-    global terminal_table
+    global terminal_view
+    mode = current_display_mode()
+    if mode == 'headless':
+        return
     headers = ["Hex Code", "Callsign", "Aircraft Type", "Distance (mi)", "Direction", "Speed (kt)", "Transponder Type", "Military", "Emergency", "Alert Sent", "Comment"]
-    print(tabulate(terminal_table, headers=headers, tablefmt="grid"))
-    print(f"\n{aircrafts_status}")
-    print(f"Fetching latest data...")
-    terminal_table = []
+    if alert_zones:
+        headers.append("Zone")
+    if mode == 'curses':
+        if terminal_view is None:
+            terminal_view = CursesDisplay()
+        for hex_code in [hex_code for hex_code in terminal_alert_times if hex_code not in terminal_rows]:
+            del terminal_alert_times[hex_code]
+        terminal_view.render(headers, terminal_view.sorted_rows(), status_lines())
+        return
+    from tabulate import tabulate
+    print("\033[H\033[2J", end="")  # Clear the screen without starting a shell to run 'clear'
+    print(tabulate(list(terminal_rows.values()), headers=headers, tablefmt="grid"))
+    print()
+    for line in status_lines():
+        print(line)
+
+# Function to wait for the next update, handling key presses in the curses view while waiting
+def wait_for_next_update(deadline, aircraft_json_watcher):
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return
+        step = min(remaining, 0.2) if terminal_view is not None else remaining
+        if aircraft_stream is not None:
+            aircraft_stream.run_until(time.time() + step)
+        elif aircraft_json_watcher is not None:
+            if aircraft_json_watcher.wait(step):
+                return
+        else:
+            time.sleep(step)
+        if terminal_view is not None and (terminal_view.handle_keys() or aircraft_stream is not None):
+            display_alerts()  # Stream mode shows new alerts right away rather than at the next update
+
+
+# Reader for the SBS/JSON stream when ingest_mode isn't 'json'
+aircraft_stream = None
+
+# Function to run the alert rules over a recording instead of live data. Alerts go to a stub channel
+# and are printed rather than sent, and the saved alert times aren't read or changed. speed is a multiple
+# of real time (0 runs as fast as possible).
+def replay_recording(path, speed=0):
+    global replay_clock, notification_channels, notification_queue_size, notification_digest_max, alert_state_path_expanded, record_path
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.rec'))
+    else:
+        paths = [path]
+    if not paths:
+        print(f"No recordings found in {path}")
+        return
+    load_aircrafts_index()
+    load_mictronics_tables()
+    load_military_ranges()
+    compile_alert_rules()
+    if alert_zones:
+        load_alert_zones()
+    alert_state_path_expanded = ''
+    record_path = ''
+    notification_queue_size = 0  # Unbounded, so no alert is dropped however fast the replay runs
+    notification_digest_max = 1  # Each alert is listed on its own
+    load_alert_state()
+
+    alerts = []
+
+    def stub_send(message_body):
+        fields = dict(line.split(': ', 1) for line in message_body.splitlines() if ': ' in line)
+        row = terminal_rows.get(fields.get('Aircraft hex', '').lower())
+        alerts.append([f"{datetime.fromtimestamp(replay_clock):%Y-%m-%d %H:%M:%S}", fields.get('Aircraft hex'), fields.get('Callsign'),
+                       fields.get('Type'), fields.get('Distance', fields.get('Last Distance')), row[10] if row else f"Departed: {fields['Departed']}" if 'Departed' in fields else '',
+                       fields.get('Zone', '')])
+        return True
+
+    notification_channels = [('replay', lambda: True, stub_send)]
+    started = time.perf_counter()
+    first_now = None
+    snapshots = 0
+    for now, aircraft_list in read_recording(paths):
+        if first_now is None:
+            first_now = now
+        if speed > 0:
+            delay = (now - first_now) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        replay_clock = now
+        queued = notification_stats['alerts']
+        process_snapshot(aircraft_list, now)
+        if notification_stats['alerts'] != queued:
+            wait_for_notifications()  # Record the alerts while replay_clock still holds this snapshot's time
+        snapshots += 1
+    replay_clock = None
 
+    from tabulate import tabulate
+    print(tabulate(alerts, headers=["Time", "Hex Code", "Callsign", "Aircraft Type", "Distance", "Rule", "Zone"], tablefmt="simple"))
+    elapsed = time.perf_counter() - started
+    span = now - first_now if snapshots else 0
+    print(f"\nReplayed {snapshots} snapshots covering {timedelta(seconds=round(span))} in {elapsed:.1f} s "
+          f"({span / max(elapsed, 1e-9):.0f}x real time): {len(alerts)} alerts")
 
 # Function to run the script based on user defined update rate
 def run_script():
-    active_start_time = datetime.now().replace(hour=active_start_hour, minute=active_start_minute).time()
-    active_end_time = datetime.now().replace(hour=active_end_hour, minute=active_end_minute).time()
+    global aircraft_stream
+    start_aircrafts_db_updater().start_loading()  # The first polls run while the database is opened
+    load_military_ranges()
+    compile_alert_rules()
+    if alert_zones:
+        load_alert_zones()
+    load_alert_state()
+    atexit.register(save_alert_state, True)
+    open_sightings_history()
+    start_metrics_server()
+    install_profiler_signal()
+    if ingest_mode != 'json':
+        aircraft_stream = AircraftStreamReader(stream_host, stream_port, ingest_mode)
+    aircraft_json_watcher = AircraftJsonWatcher(aircraft_json_path) if watch_aircraft_json and aircraft_stream is None else None
+    schedule = build_tracking_schedule()
     while True:
-        if run_schedule(active_start_time, active_end_time, selected_days):
+        if run_schedule(schedule):
             global update_rate
             start_time = time.time()
             aircrafts_age_check()
-            fetch_aircraft_data()
-            os.system('clear' if os.name != 'nt' else 'cls')
+            if aircraft_stream is not None:
+                aircraft_stream.expire()
+                if record_path:
+                    record_snapshot(time.time(), [dict(aircraft) for aircraft in aircraft_stream.aircraft.values()])  # SBS updates these in place
+            else:
+                fetch_aircraft_data()
+            save_alert_state()
+            save_sightings()
+            write_metrics_textfile()
             display_alerts()
-            elapsed_time = time.time() - start_time
-            time.sleep(max(update_rate - elapsed_time, 0))
+            if aircraft_stream is not None:
+                # Messages are checked as they arrive; the table and state are refreshed every update_rate seconds
+                ingest_stats.update(new=0, updated=0, unchanged=0, gone=0)
+            wait_for_next_update(start_time + update_rate, aircraft_json_watcher)
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sends alerts when aircraft of interest come within range of your ADS-B receiver.")
+    parser.add_argument('--replay', metavar='PATH', help="Run the alert rules over a recording (a .rec file or a record_path folder) instead of live data")
+    parser.add_argument('--speed', type=float, default=0, help="Replay speed as a multiple of real time (default: as fast as possible)")
+    history = parser.add_argument_group("sightings history", "Questions answered from history_path, ex. --history a35e89 --since month, or --top type --military --since week")
+    history.add_argument('--history', metavar='HEX_OR_CALLSIGN', help="Every sighting of one aircraft")
+    history.add_argument('--top', choices=('type', 'callsign', 'hex'), help="Most often seen aircraft types, callsigns or aircraft")
+    history.add_argument('--recent', action='store_true', help="Latest sightings")
+    history.add_argument('--since', type=parse_since, default='30d', help="today, week, month, year, a duration such as 12h or 7d, or a date (default: 30d)")
+    history.add_argument('--military', action='store_true', help="Only military aircraft")
+    history.add_argument('--alerted', action='store_true', help="Only sightings that sent an alert")
+    history.add_argument('--limit', type=int, default=20, help="Rows to show (default: 20)")
+    args = parser.parse_args()
+
+    if args.history or args.top or args.recent:
+        import sqlite3
+        from tabulate import tabulate
+        if not history_path or not os.path.exists(os.path.expanduser(history_path)):
+            print("No sightings history found. Set history_path and run BirdAlert to start one.")
+            sys.exit(1)
+        with sqlite3.connect(os.path.expanduser(history_path)) as db:
+            title, headers, rows = query_sightings(db, args.since, args.history, args.top, args.recent, args.military, args.alerted, args.limit)
+        print(title)
+        print(tabulate(rows, headers=headers, tablefmt="simple"))
+        sys.exit()
+
+    if your_lat is None or your_lon is None:
+        print("Set your_lat and your_lon in BirdAlert.py before running the script.")
+        sys.exit()
+
+    if args.replay:
+        replay_recording(os.path.expanduser(args.replay), args.speed)
+        sys.exit()
+
+    if not acquire_instance_lock():
+        print("Another instance of the script is already running.")
+        sys.exit()
+
     run_script()
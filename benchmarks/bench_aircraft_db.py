@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Compare the Mictronics aircraft database loaded as a dict against the aircrafts.idx binary index.
+
+Each variant runs in its own process. Memory is the growth of the process's resident set (VmRSS in
+/proc/self/status, so Linux only) from just before the load to after every lookup has run, so the
+index is charged for the pages of it the lookups touched. Exits with status 1 if the index doesn't
+use less memory than the dict.
+
+    python3 benchmarks/bench_aircraft_db.py                 # synthetic 500k-entry database
+    python3 benchmarks/bench_aircraft_db.py --db ~/aircrafts.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from synthetic import write_mictronics_db
+
+
+def current_rss_mb():
+    """Resident set size now (not the peak), in MB."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmRSS not found in /proc/self/status")
+
+
+def write_probes(db_path, probes_path, lookups):
+    # Half the probes hit the database and half are random addresses that mostly miss
+    with open(db_path) as f:
+        keys = list(json.load(f).keys())
+    rng = random.Random(2)
+    probes = [rng.choice(keys).lower() for _ in range(lookups // 2)] + \
+             [f"{rng.randint(0, 0xFFFFFF):06x}" for _ in range(lookups // 2)]
+    with open(probes_path, 'w') as f:
+        json.dump(probes, f)
+
+
+def run_variant(variant, db_path, probes_path):
+    import BirdAlert
+
+    with open(probes_path) as f:
+        probes = json.load(f)
+    baseline_rss = current_rss_mb()
+
+    start = time.perf_counter()
+    if variant == 'dict':
+        with open(db_path) as f:
+            data = json.load(f)
+        load_time = time.perf_counter() - start
+
+        def lookup(hex_code):
+            entry = data.get(hex_code.upper())
+            return (entry.get('d') or entry.get('t') or 'Unknown') if entry else 'Unknown'
+    else:
+        BirdAlert.aircrafts_json_path_expanded = db_path
+        BirdAlert.aircrafts_index_path = db_path + '.idx'
+        BirdAlert.load_aircrafts_index()
+        load_time = time.perf_counter() - start
+        lookup = BirdAlert.get_aircraft_type_info
+
+    start = time.perf_counter()
+    for hex_code in probes:
+        lookup(hex_code)
+    lookup_time = time.perf_counter() - start
+
+    print(json.dumps({'variant': variant, 'load_s': load_time, 'lookups_per_s': len(probes) / lookup_time,
+                      'rss_mb': current_rss_mb() - baseline_rss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help="Mictronics aircrafts.json to benchmark (default: generate a synthetic one)")
+    parser.add_argument('--count', type=int, default=500000, help="Entries in the synthetic database")
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--variant', choices=['dict', 'index'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        run_variant(args.variant, args.db, args.db + '.probes')
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'aircrafts.json')
+        if args.db:
+            with open(os.path.expanduser(args.db), 'rb') as src, open(db_path, 'wb') as dst:
+                dst.write(src.read())
+        else:
+            write_mictronics_db(db_path, count=args.count)
+        write_probes(db_path, db_path + '.probes', args.lookups)
+
+        # Build the index once up front so "index" measures the steady-state open
+        start = time.perf_counter()
+        subprocess.run([sys.executable, __file__, '--db', db_path, '--variant', 'index'],
+                       check=True, capture_output=True)
+        print(f"index build: {time.perf_counter() - start:.2f}s "
+              f"({os.path.getsize(db_path) / 1e6:.1f} MB json -> {os.path.getsize(db_path + '.idx') / 1e6:.1f} MB idx)")
+
+        print(f"{'variant':<8} {'load (s)':>10} {'lookups/s':>12} {'RSS (MB)':>10}")
+        rss = {}
+        for variant in ('dict', 'index'):
+            result = subprocess.run([sys.executable, __file__, '--db', db_path, '--variant', variant],
+                                    check=True, capture_output=True, text=True)
+            row = json.loads(result.stdout.strip().splitlines()[-1])
+            rss[variant] = row['rss_mb']
+            print(f"{row['variant']:<8} {row['load_s']:>10.3f} {row['lookups_per_s']:>12,.0f} {row['rss_mb']:>10.1f}")
+
+    if rss['index'] >= rss['dict']:
+        print(f"FAIL: the index grew RSS by {rss['index']:.1f} MB, the dict by {rss['dict']:.1f} MB")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == '__main__':
+    main()
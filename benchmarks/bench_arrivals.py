@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Arrival prediction: closest point of approach throughput, accuracy and how much earlier fast aircraft alert.
+
+Predicts the closest approach of every aircraft in a synthetic snapshot (--aircraft around the
+receiver, spread wide and then close in) with BirdAlert's predict_arrivals(), vectorized with numpy and in plain Python, and
+against stepping each aircraft forward a second at a time with haversine() as the reference.
+Checks both agree with the reference on which aircraft arrive, when, and how close they come,
+apart from aircraft that only graze the edge of range_miles or arrive right at arrival_horizon.
+It then flies fast jets across the zone on chords at random offsets, sampled every --update-rate
+seconds, and compares when each is first alerted: once a poll finds it inside range_miles, or
+once it is predicted to arrive. Exits with status 1 if a check fails.
+
+    python3 benchmarks/bench_arrivals.py --aircraft 10000 --spread-miles 150 50
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from synthetic import SyntheticFeed
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def destination(lat, lon, track, miles):
+    """Great-circle position after flying miles along track from (lat, lon)."""
+    lat1 = math.radians(lat)
+    angle = miles / 3956
+    bearing = math.radians(track)
+    lat2 = math.asin(math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(bearing))
+    lon2 = math.radians(lon) + math.atan2(math.sin(bearing) * math.sin(angle) * math.cos(lat1),
+                                          math.cos(angle) - math.sin(lat1) * math.sin(lat2))
+    return math.degrees(lat2), math.degrees(lon2)
+
+
+def reference_approach(aircraft, horizon, step=1.0):
+    """Step the aircraft forward from its last position and return (arrival, closest distance), arrival None if it
+    doesn't arrive within horizon. Stepping goes on past the horizon until the aircraft starts moving away."""
+    age = aircraft.get('seen_pos') or 0.0
+    speed = aircraft['gs'] * 1.15078 / 3600
+    arrival = None
+    closest = float('inf')
+    t = 0.0
+    while t <= horizon or (arrival is not None and dist <= closest):
+        lat, lon = destination(aircraft['lat'], aircraft['lon'], aircraft['track'], speed * (age + t))
+        dist = BirdAlert.haversine(RECEIVER_LAT, RECEIVER_LON, lat, lon)
+        if dist <= BirdAlert.range_miles and arrival is None and t <= horizon:
+            if t == 0:
+                return None, dist  # Already in range
+            arrival = t
+        if dist > closest and t > horizon:
+            break
+        closest = min(closest, dist)
+        t += step
+    return arrival, closest
+
+
+def time_predict(aircraft_list, repeat, vectorized, numpy_module):
+    BirdAlert.numpy = numpy_module if vectorized else None
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = BirdAlert.predict_arrivals(aircraft_list)
+        best = min(best, time.perf_counter() - start)
+    BirdAlert.numpy = numpy_module
+    return best, {id(aircraft): arrival for aircraft, _, _, arrival in results}  # Synthetic hexes can repeat
+
+
+def compare(predicted, aircraft_list, horizon):
+    """Mismatches between the predictions and the stepped reference, and the reference's time."""
+    errors = []
+    start = time.perf_counter()
+    reference = [(aircraft, reference_approach(aircraft, horizon)) for aircraft in aircraft_list]
+    elapsed = time.perf_counter() - start
+    for aircraft, (arrival, closest) in reference:
+        hex_code = aircraft['hex']
+        borderline = abs(closest - BirdAlert.range_miles) < 0.01 * BirdAlert.range_miles or \
+            (arrival is not None and arrival > horizon - 2)
+        prediction = predicted.get(id(aircraft))
+        if (prediction is None) != (arrival is None):
+            if not borderline:
+                errors.append(f"{hex_code}: predicted {prediction}, stepped arrival {arrival} closest {closest:.3f}mi")
+            continue
+        if prediction is None:
+            continue
+        if abs(prediction[0] - arrival) > 1.5:
+            errors.append(f"{hex_code}: arrives in {prediction[0]:.1f}s, stepped {arrival:.0f}s")
+        if abs(prediction[1] - closest) > 0.05 + 0.005 * closest:
+            errors.append(f"{hex_code}: closest {prediction[1]:.3f}mi, stepped {closest:.3f}mi")
+    return errors, elapsed
+
+
+def fast_jets(count, update_rate, horizon, seed=2):
+    """Jets crossing the zone on random chords. Returns first-alert times relative to entering range, old and predicted."""
+    rng = random.Random(seed)
+    radius = BirdAlert.range_miles
+    old_times = []
+    new_times = []
+    for number in range(count):
+        gs = rng.uniform(420, 600)
+        track = rng.uniform(0, 360)
+        offset = rng.uniform(-radius, radius) * 0.999  # Miles the chord passes from the receiver
+        speed = gs * 1.15078 / 3600
+        half_chord = math.sqrt(radius * radius - offset * offset)
+        start_miles = half_chord + speed * (horizon + rng.uniform(0, update_rate))  # Before the chord, polled at a random phase
+        # Start point: back along the track from the chord's midpoint, offset to the side
+        mid_lat, mid_lon = destination(RECEIVER_LAT, RECEIVER_LON, track + 90, offset)
+        lat, lon = destination(mid_lat, mid_lon, track + 180, start_miles)
+        entry = (start_miles - half_chord) / speed
+        old = new = None
+        t = 0.0
+        while t < 2 * start_miles / speed and (old is None or new is None):
+            now_lat, now_lon = destination(lat, lon, track, speed * t)
+            aircraft = {'hex': f"{number:06x}", 'lat': now_lat, 'lon': now_lon, 'gs': gs, 'track': track, 'seen_pos': 0.0}
+            if old is None and BirdAlert.compute_snapshot_geometry([aircraft]):
+                old = t - entry
+            if new is None and (BirdAlert.compute_snapshot_geometry([aircraft]) or BirdAlert.predict_arrivals([aircraft])):
+                new = t - entry
+            t += update_rate
+        old_times.append(old)
+        new_times.append(new)
+    return old_times, new_times
+
+
+def summarize(times):
+    alerted = sorted(value for value in times if value is not None)
+    median = alerted[len(alerted) // 2] if alerted else float('nan')
+    return len(times) - len(alerted), median, (alerted[-1] if alerted else float('nan'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, default=10000)
+    parser.add_argument('--spread-miles', type=float, nargs='+', default=[150, 50],
+                        help="Half-width of the area the aircraft are spread over; at 50 miles nearly all are close enough to predict")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--jets', type=int, default=1000, help="Fast jets flown across the zone")
+    parser.add_argument('--update-rate', type=float, default=BirdAlert.update_rate)
+    args = parser.parse_args()
+
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    BirdAlert.metrics_enabled = False
+    horizon = BirdAlert.arrival_horizon
+    numpy_module = BirdAlert.numpy
+
+    failures = []
+    for spread_miles in args.spread_miles:
+        aircraft_list = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=spread_miles).snapshot()
+        in_range = len(BirdAlert.compute_snapshot_geometry(aircraft_list))
+        print(f"{len(aircraft_list)} aircraft within {spread_miles:.0f} miles, range_miles {BirdAlert.range_miles}, "
+              f"arrival_horizon {horizon} s: {in_range} in range")
+        runs = [("numpy", True)] if numpy_module is not None else []
+        runs.append(("plain Python", False))
+        predictions = {}
+        print(f"{'predict_arrivals':<18} {'time (ms)':>10} {'aircraft/s':>12} {'arriving':>9}")
+        for label, vectorized in runs:
+            elapsed, predicted = time_predict(aircraft_list, args.repeat, vectorized, numpy_module)
+            predictions[label] = predicted
+            print(f"{label:<18} {elapsed * 1000:>10.2f} {len(aircraft_list) / elapsed:>12,.0f} {len(predicted):>9}")
+
+        errors, reference_time = compare(predictions['plain Python'], aircraft_list, horizon)
+        print(f"{'stepped, 1 s':<18} {reference_time * 1000:>10.0f} {len(aircraft_list) / reference_time:>12,.0f}")
+        if errors:
+            failures.append(f"plain Python against the stepped reference: {len(errors)} mismatches, first: {errors[0]}")
+        if 'numpy' in predictions:
+            numpy_errors = [key for key in set(predictions['numpy']) | set(predictions['plain Python'])
+                            if key not in predictions['numpy'] or key not in predictions['plain Python'] or
+                            max(abs(a - b) for a, b in zip(predictions['numpy'][key][:3], predictions['plain Python'][key][:3])) > 1e-6]
+            if numpy_errors:
+                failures.append(f"numpy and plain Python disagree on {len(numpy_errors)} aircraft")
+        arriving = len(predictions['plain Python'])
+        print(f"Rule work: {in_range + arriving} of {len(aircraft_list)} aircraft ({in_range} in range, {arriving} arriving); "
+              f"the other {len(aircraft_list) - in_range - arriving} skip the rules\n")
+
+    old_times, new_times = fast_jets(args.jets, args.update_rate, horizon)
+    print(f"{args.jets} jets at 420-600 kt crossing the zone, polled every {args.update_rate} s "
+          f"(alert time relative to entering range_miles)")
+    print(f"{'first alert':<22} {'missed':>7} {'median (s)':>11} {'latest (s)':>11}")
+    for label, times in (("in range at a poll", old_times), ("predicted arrival", new_times)):
+        missed, median, latest = summarize(times)
+        print(f"{label:<22} {missed:>7} {median:>11.1f} {latest:>11.1f}")
+    if summarize(new_times)[0]:
+        failures.append(f"{summarize(new_times)[0]} jets never alerted with arrival prediction")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("PASS" if not failures else "FAIL")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
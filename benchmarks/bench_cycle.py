@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""End-to-end poll-cycle benchmark on synthetic readsb data.
+
+Generates a moving population of aircraft and a matching Mictronics database, then runs
+BirdAlert's poll cycle against them with the notification channels stubbed out. Reports
+per-cycle latency percentiles for each stage and peak RSS, and saves the results as JSON
+so runs can be compared across changes.
+
+    python3 benchmarks/bench_cycle.py --aircraft 5000 --cycles 50 --output before.json
+    python3 benchmarks/bench_cycle.py --aircraft 5000 --cycles 50 --output after.json --compare before.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from synthetic import SyntheticFeed, write_mictronics_db
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(fraction):
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {'p50_ms': pick(0.50), 'p90_ms': pick(0.90), 'p99_ms': pick(0.99), 'max_ms': ordered[-1] * 1000,
+            'mean_ms': sum(ordered) / len(ordered) * 1000, 'samples': len(ordered)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# Wrap a BirdAlert function so every call adds its duration to the current cycle's total for that stage
+def instrument(name, cycle_times):
+    original = getattr(BirdAlert, name)
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            cycle_times[name] = cycle_times.get(name, 0.0) + time.perf_counter() - start
+
+    setattr(BirdAlert, name, timed)
+
+
+def run(args, temp_dir):
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    BirdAlert.range_miles = args.range_miles
+    BirdAlert.aircraft_json_path = os.path.join(temp_dir, 'aircraft.json')
+    BirdAlert.aircrafts_json_path_expanded = os.path.join(temp_dir, 'aircrafts.json')
+    BirdAlert.aircrafts_index_path = BirdAlert.aircrafts_json_path_expanded + '.idx'
+    BirdAlert.alert_state_path_expanded = ''
+    BirdAlert.display_mode = 'table'  # stdout is redirected, which 'auto' would treat as headless
+    delivered = []
+    BirdAlert.notification_channels = [('stub', lambda: True, lambda message_body: delivered.append(message_body) or True)]
+
+    feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=args.spread_miles,
+                         watch_hexes=BirdAlert.hex_watch_list, watch_share=args.watch_share,
+                         military_share=args.military_share, tisb_share=args.tisb_share,
+                         emergency_rate=args.emergency_rate, position_rate=args.position_rate)
+    # Written from a child process so generating the database doesn't count towards peak RSS
+    writer = multiprocessing.Process(target=write_mictronics_db, args=(BirdAlert.aircrafts_json_path_expanded, feed.hexes(), args.db_size))
+    writer.start()
+    writer.join()
+
+    db = {}
+    start = time.perf_counter()
+    BirdAlert.load_aircrafts_index()
+    db['build_s'] = time.perf_counter() - start
+    BirdAlert.aircrafts_index.close()
+    BirdAlert.aircrafts_index = None
+    start = time.perf_counter()
+    BirdAlert.load_aircrafts_index()
+    db['open_s'] = time.perf_counter() - start
+    BirdAlert.load_military_ranges()
+    BirdAlert.compile_alert_rules()
+    BirdAlert.load_alert_state()
+
+    cycle_times = {}
+    for name in ('fetch_aircraft_data', 'check_aircraft', 'display_alerts'):
+        instrument(name, cycle_times)
+
+    samples = {'cycle': [], 'fetch_aircraft_data': [], 'check_aircraft': [], 'display_alerts': []}
+    for cycle in range(args.warmup + args.cycles):
+        feed.advance(args.interval)
+        feed.write(BirdAlert.aircraft_json_path)
+        cycle_times.clear()
+        start = time.perf_counter()
+        BirdAlert.fetch_aircraft_data()
+        with contextlib.redirect_stdout(io.StringIO()):
+            BirdAlert.display_alerts()
+        elapsed = time.perf_counter() - start
+        if cycle >= args.warmup:
+            samples['cycle'].append(elapsed)
+            for name in ('fetch_aircraft_data', 'check_aircraft', 'display_alerts'):
+                samples[name].append(cycle_times.get(name, 0.0))
+
+    BirdAlert.wait_for_notifications()
+
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'json_backend': BirdAlert.json_backend_name,
+        'numpy': BirdAlert.numpy is not None,
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'db_load': db,
+        'stages': {name: percentiles(values) for name, values in samples.items()},
+        'alerts_delivered': BirdAlert.notification_stats['alerts'],
+        'messages_sent': len(delivered),
+        'alerting_aircraft': len(BirdAlert.terminal_rows),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def print_results(results, baseline=None):
+    db = results['db_load']
+    print(f"{results['params']['aircraft']} aircraft, {results['params']['cycles']} cycles, "
+          f"backend {results['json_backend']}, numpy {'yes' if results['numpy'] else 'no'}")
+    print(f"DB index build {db['build_s'] * 1000:.0f} ms, open {db['open_s'] * 1000:.2f} ms; "
+          f"{results['alerting_aircraft']} aircraft alerting, {results['alerts_delivered']} alerts delivered in {results.get('messages_sent', results['alerts_delivered'])} messages; "
+          f"peak RSS {results['peak_rss_mb']:.1f} MB")
+    header = f"{'stage':<22} {'p50 (ms)':>9} {'p90 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}"
+    if baseline:
+        header += f" {'p50 vs baseline':>16}"
+    print(header)
+    for name, stats in results['stages'].items():
+        line = f"{name:<22} {stats['p50_ms']:>9.2f} {stats['p90_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}"
+        previous = (baseline or {}).get('stages', {}).get(name)
+        if previous and stats['p50_ms']:
+            line += f" {previous['p50_ms'] / stats['p50_ms']:>15.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, default=2000)
+    parser.add_argument('--cycles', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--interval', type=float, default=1.0, help="Simulated seconds between snapshots")
+    parser.add_argument('--range-miles', type=float, default=20)
+    parser.add_argument('--spread-miles', type=float, default=150, help="Half-width of the area aircraft start in")
+    parser.add_argument('--watch-share', type=float, default=0.01)
+    parser.add_argument('--military-share', type=float, default=0.05)
+    parser.add_argument('--tisb-share', type=float, default=0.02)
+    parser.add_argument('--emergency-rate', type=float, default=0.001)
+    parser.add_argument('--position-rate', type=float, default=0.8, help="Share of aircraft with a new position each snapshot")
+    parser.add_argument('--db-size', type=int, default=100000, help="Entries in the synthetic Mictronics database")
+    parser.add_argument('--output', help="Save results to this JSON file")
+    parser.add_argument('--compare', help="Results JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = run(args, temp_dir)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Mictronics database refresh against a local HTTP stand-in, while the poll loop keeps running.
+
+Serves a synthetic aircrafts.json and walks the updater through a first download, an unchanged
+check (answered 304 from the ETag), a new version and a truncated download, running the snapshot
+pipeline the whole time. Reports how long each refresh took, the poll cycle latency while it ran
+against the latency with no refresh, and checks that the new version is used once swapped in
+and that the truncated one is rejected. Exits with status 1 if a check fails.
+
+    python3 benchmarks/bench_db_refresh.py --db-size 400000 --aircraft 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from stub_servers import StubHttpServer
+from synthetic import SyntheticFeed, write_mictronics_db
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def cycle_latencies(feed, interval, until):
+    """Run poll cycles until until() is true, returning the time each one took."""
+    latencies = []
+    while True:
+        start = time.perf_counter()
+        BirdAlert.aircrafts_age_check()
+        BirdAlert.process_snapshot(feed.advance(interval), feed.now)
+        latencies.append(time.perf_counter() - start)
+        if until():
+            return latencies
+        time.sleep(interval)
+
+
+def refresh(feed, interval):
+    """Start a check now and run cycles until the updater thread has finished and its index is swapped in."""
+    updater = BirdAlert.aircrafts_db_updater
+    updater.next_check = 0
+    start = time.perf_counter()
+    latencies = cycle_latencies(feed, interval, lambda: not updater.thread.is_alive() and updater.new_index is None)
+    return time.perf_counter() - start, latencies
+
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return f"p50 {ordered[len(ordered) // 2] * 1000:.2f} ms, max {ordered[-1] * 1000:.2f} ms over {len(ordered)} cycles"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-size', type=int, default=400000, help="Entries in the synthetic database")
+    parser.add_argument('--aircraft', type=int, default=2000)
+    parser.add_argument('--interval', type=float, default=0.05, help="Seconds between poll cycles")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=150)
+        data = write_mictronics_db(os.path.join(temp_dir, 'served.json'), feed.hexes(), args.db_size)
+        versions = {'v1': json.dumps(data, separators=(',', ':')).encode()}
+        marked_hex = next(hex_code for hex_code in feed.hexes() if not hex_code.startswith('~'))
+        data[marked_hex.upper()]['d'] = 'REFRESHED TYPE'
+        versions['v2'] = json.dumps(data, separators=(',', ':')).encode()
+        server = StubHttpServer(body=lambda: versions[server.etag.strip('"')], etag='"v1"')
+        companions = StubHttpServer(body=b'{"C130":["LOCKHEED C-130 Hercules","L4T","M"],"RCH":["Air Mobility Command","United States","REACH"]}',
+                                    etag='"c1"')  # Stands in for both types.json and operators.json
+
+        BirdAlert.your_lat = RECEIVER_LAT
+        BirdAlert.your_lon = RECEIVER_LON
+        BirdAlert.alert_state_path_expanded = ''
+        BirdAlert.notification_channels = [('stub', lambda: True, lambda message_body: True)]
+        BirdAlert.aircrafts_db_url = server.url + '/aircrafts.json'
+        BirdAlert.types_db_url = companions.url + '/types.json'
+        BirdAlert.operators_db_url = companions.url + '/operators.json'
+        BirdAlert.types_json_path = os.path.join(temp_dir, 'types.json')
+        BirdAlert.operators_json_path = os.path.join(temp_dir, 'operators.json')
+        BirdAlert.aircrafts_json_path_expanded = os.path.join(temp_dir, 'aircrafts.json')
+        BirdAlert.aircrafts_index_path = BirdAlert.aircrafts_json_path_expanded + '.idx'
+        BirdAlert.load_military_ranges()
+        BirdAlert.compile_alert_rules()
+        BirdAlert.load_alert_state()
+
+        print(f"{args.db_size} database entries ({len(versions['v1']) / 1e6:.1f} MB), {args.aircraft} aircraft, "
+              f"a cycle every {args.interval * 1000:.0f} ms")
+        BirdAlert.aircrafts_db_updater = BirdAlert.AircraftsDatabaseUpdater(
+            BirdAlert.aircrafts_db_url, BirdAlert.aircrafts_json_path_expanded, BirdAlert.aircrafts_index_path, 86400)
+        elapsed, latencies = refresh(feed, args.interval)
+        print(f"First download: {elapsed:.2f} s; {BirdAlert.aircrafts_db_updater.status}")
+        if BirdAlert.aircrafts_index is None or len(BirdAlert.aircrafts_index) != len(data):
+            failures.append("first download wasn't loaded")
+        if BirdAlert.mictronics_tables is None or 'C130' not in BirdAlert.mictronics_tables.types:
+            failures.append("types.json and operators.json weren't downloaded")
+
+        cycles_left = iter(range(40))
+        baseline = cycle_latencies(feed, args.interval, lambda: next(cycles_left, None) is None)
+        print(f"Cycles with no refresh:       {summary(baseline)}")
+
+        requests_before = server.requests
+        elapsed, _ = refresh(feed, args.interval)
+        print(f"Unchanged check: {elapsed * 1000:.0f} ms, {server.not_modified} answered 304; {BirdAlert.aircrafts_db_updater.status}")
+        if server.not_modified != 1 or server.requests != requests_before + 1:
+            failures.append("unchanged database wasn't answered from its ETag")
+
+        server.etag = '"v2"'
+        elapsed, latencies = refresh(feed, args.interval)
+        print(f"Cycles while downloading v2:  {summary(latencies)}")
+        print(f"New version: {elapsed:.2f} s; {BirdAlert.aircrafts_db_updater.status}")
+        if BirdAlert.get_aircraft_type_info(marked_hex) != 'REFRESHED TYPE':
+            failures.append("lookups don't use the new version")
+
+        server.etag = '"v1"'
+        server.truncate_to = len(versions['v1']) // 2
+        size_before = os.path.getsize(BirdAlert.aircrafts_json_path_expanded)
+        elapsed, _ = refresh(feed, args.interval)
+        print(f"Truncated download: {elapsed:.2f} s; {BirdAlert.aircrafts_db_updater.status}")
+        if (BirdAlert.get_aircraft_type_info(marked_hex) != 'REFRESHED TYPE'
+                or os.path.getsize(BirdAlert.aircrafts_json_path_expanded) != size_before
+                or [name for name in os.listdir(temp_dir) if '.download' in name]):
+            failures.append("truncated download wasn't rejected cleanly")
+
+        server.close()
+        companions.close()
+        BirdAlert.wait_for_notifications()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("PASS" if not failures else "FAIL")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
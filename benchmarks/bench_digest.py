@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Alert bursts: one message per alert against per-cycle digests and per-channel rate limits.
+
+Runs an airshow through BirdAlert's snapshot pipeline: --burst military aircraft come into range
+in the first cycle, --per-cycle more in every cycle after it, and one aircraft squawks an
+emergency part way through. Alerts go to a stand-in Telegram channel that takes --api-ms per
+call and, like the Telegram API, refuses (429) anything past --api-limit messages a minute.
+Each mode reports the API calls made, the calls refused, alerts that never arrived, the delay
+from alert to delivery and the emergency alert's delay. Time runs --scale times faster than
+real time so a minute of traffic takes a few seconds; times are reported unscaled.
+
+    python3 benchmarks/bench_digest.py --burst 30 --per-cycle 3 --cycles 60
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+HEX_PATTERN = re.compile(r'\b[0-9A-F]{6}\b')
+
+
+class ThrottledChannel:
+    """Stand-in for the Telegram API: slow calls and at most limit messages per window seconds."""
+
+    def __init__(self, limit, window, delay):
+        self.limit = limit
+        self.window = window
+        self.delay = delay
+        self.accepted = deque()
+        self.calls = 0
+        self.refused = 0
+        self.delivered = {}  # hex -> time the message naming it was accepted
+        self.lock = threading.Lock()
+
+    def send(self, message_body):
+        time.sleep(self.delay)
+        now = time.perf_counter()
+        with self.lock:
+            self.calls += 1
+            while self.accepted and now - self.accepted[0] > self.window:
+                self.accepted.popleft()
+            if len(self.accepted) >= self.limit:
+                self.refused += 1
+                return False
+            self.accepted.append(now)
+            for hex_code in HEX_PATTERN.findall(message_body):
+                self.delivered.setdefault(hex_code.lower(), now)
+        return True
+
+
+def airshow(args, offset):
+    """Aircraft in range for each cycle, and the hex of the one that declares an emergency."""
+    cycles = []
+    aircraft = []
+    number = offset
+    for cycle in range(args.cycles):
+        for _ in range(args.burst if cycle == 0 else args.per_cycle):
+            number += 1
+            aircraft.append({'hex': f"ae{number:04x}", 'type': 'adsb_icao', 'flight': f"RCH{number % 1000}", 'alt_baro': 3000,
+                             'gs': 180.0, 'track': 90.0, 'emergency': 'none', 'military': True,
+                             'lat': RECEIVER_LAT + 0.01 * (number % 50) / 50, 'lon': RECEIVER_LON + 0.01})
+        cycles.append(list(aircraft))
+    emergency = {'hex': f"a{offset + 0x10000:05x}", 'type': 'adsb_icao', 'flight': 'N77EM', 'alt_baro': 2500, 'gs': 110.0,
+                 'track': 270.0, 'emergency': 'general', 'lat': RECEIVER_LAT - 0.01, 'lon': RECEIVER_LON}
+    for aircraft_list in cycles[args.cycles // 6:]:
+        aircraft_list.append(emergency)
+    return cycles, emergency['hex']
+
+
+def run_mode(args, digest_max, rate_limits, offset):
+    channel = ThrottledChannel(args.api_limit, 60 / args.scale, args.api_ms / 1000)
+    BirdAlert.notification_channels = [('telegram', lambda: True, channel.send)]
+    BirdAlert.notification_digest_max = digest_max
+    BirdAlert.notification_rate_limits = {name: (per_minute * args.scale, burst) for name, (per_minute, burst) in rate_limits.items()}
+    BirdAlert.notification_buckets.clear()
+    BirdAlert.aircraft_tracks = BirdAlert.TrackTable()
+    BirdAlert.terminal_rows.clear()
+    BirdAlert.load_alert_state()
+
+    raised = {}
+    original_send_notification = BirdAlert.send_notification
+
+    def send_notification(track, *rest, **kwargs):
+        raised.setdefault(track.hex, time.perf_counter())
+        return original_send_notification(track, *rest, **kwargs)
+
+    BirdAlert.send_notification = send_notification
+    cycles, emergency_hex = airshow(args, offset)
+    interval = 1 / args.scale
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # "All notification methods failed" for every refused call
+        for number, aircraft_list in enumerate(cycles):
+            BirdAlert.process_snapshot(aircraft_list, time.time())
+            time.sleep(max(0.0, start + (number + 1) * interval - time.perf_counter()))
+        BirdAlert.wait_for_notifications()
+    BirdAlert.send_notification = original_send_notification
+
+    delays = sorted((channel.delivered[hex_code] - raised_at) * args.scale for hex_code, raised_at in raised.items()
+                    if hex_code in channel.delivered)
+    emergency_delay = (channel.delivered[emergency_hex] - raised[emergency_hex]) * args.scale if emergency_hex in channel.delivered else None
+    return {'alerts': len(raised), 'calls': channel.calls, 'refused': channel.refused, 'lost': len(raised) - len(delays),
+            'p50': delays[len(delays) // 2] if delays else None, 'max': delays[-1] if delays else None, 'emergency': emergency_delay}
+
+
+def seconds(value):
+    return f"{value:.1f}" if value is not None else "lost"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--burst', type=int, default=30, help="Aircraft coming into range in the first cycle")
+    parser.add_argument('--per-cycle', type=int, default=3, help="Aircraft coming into range in each later cycle")
+    parser.add_argument('--cycles', type=int, default=60, help="Poll cycles, one a second")
+    parser.add_argument('--api-limit', type=int, default=20, help="Messages a minute the stand-in API accepts")
+    parser.add_argument('--api-ms', type=float, default=30, help="Time each API call takes")
+    parser.add_argument('--scale', type=float, default=10, help="Times faster than real time")
+    args = parser.parse_args()
+
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    BirdAlert.alert_state_path_expanded = ''
+    BirdAlert.display_mode = 'headless'
+    BirdAlert.notification_queue_size = 0  # Unbounded, so the per-alert mode loses alerts to the API rather than the queue
+    BirdAlert.load_military_ranges()
+    BirdAlert.compile_alert_rules()
+
+    modes = [
+        ("one message per alert", 1, {}),
+        ("digest per cycle", BirdAlert.notification_digest_max, {}),
+        ("digest + rate limit", BirdAlert.notification_digest_max, {'telegram': BirdAlert.notification_rate_limits['telegram']}),
+    ]
+    print(f"{args.burst} aircraft in the first cycle, then {args.per_cycle} a cycle for {args.cycles} cycles; "
+          f"the API accepts {args.api_limit} messages a minute")
+    print(f"{'mode':<22} {'alerts':>7} {'API calls':>10} {'refused':>8} {'lost':>5} {'delay p50 (s)':>14} {'delay max (s)':>14} {'emergency (s)':>14}")
+    for number, (label, digest_max, rate_limits) in enumerate(modes):
+        result = run_mode(args, digest_max, rate_limits, number * 0x1000)
+        print(f"{label:<22} {result['alerts']:>7} {result['calls']:>10} {result['refused']:>8} {result['lost']:>5} "
+              f"{seconds(result['p50']):>14} {seconds(result['max']):>14} {seconds(result['emergency']):>14}")
+
+
+if __name__ == '__main__':
+    main()
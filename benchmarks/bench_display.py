@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Terminal display cost: the reprinted table against the incremental curses view.
+
+Runs BirdAlert's snapshot pipeline on synthetic traffic inside a pseudo-terminal, once per
+display_mode, and reports the CPU time of display_alerts() and the bytes written to the
+terminal per update. The table is cleared and reprinted in full every update; the curses view
+only sends the cells that changed, so an SSH session or a slow serial console stays responsive.
+
+    python3 benchmarks/bench_display.py --aircraft 2000 --updates 50 --size 50x160
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import pty
+import select
+import struct
+import sys
+import termios
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def run_display(args, mode, result_fd):
+    """Runs in the child, with the pseudo-terminal as stdin and stdout."""
+    import BirdAlert
+    from synthetic import SyntheticFeed
+
+    rows, columns = args.size
+    fcntl.ioctl(sys.stdout.fileno(), termios.TIOCSWINSZ, struct.pack('HHHH', rows, columns, 0, 0))
+    os.environ['LINES'] = str(rows)
+    os.environ['COLUMNS'] = str(columns)
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    BirdAlert.alert_state_path_expanded = ''
+    BirdAlert.notification_channels = [('stub', lambda: True, lambda message_body: True)]
+    BirdAlert.display_mode = mode
+    BirdAlert.load_military_ranges()
+    BirdAlert.compile_alert_rules()
+    BirdAlert.load_alert_state()
+
+    feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=args.spread_miles, seed=1)
+    cpu_times = []
+    for _ in range(args.updates):
+        BirdAlert.process_snapshot(feed.advance(1.0), feed.now)
+        start = time.thread_time()
+        BirdAlert.display_alerts()
+        sys.stdout.flush()
+        cpu_times.append(time.thread_time() - start)
+    if BirdAlert.terminal_view is not None:
+        BirdAlert.terminal_view.close()
+    result = {'cpu_times': cpu_times, 'rows': len(BirdAlert.terminal_rows)}
+    os.write(result_fd, json.dumps(result).encode())
+    os.close(result_fd)
+
+
+def measure(args, mode):
+    result_read, result_write = os.pipe()
+    pid, master = pty.fork()
+    if pid == 0:
+        os.close(result_read)
+        try:
+            run_display(args, mode, result_write)
+        finally:
+            os._exit(0)
+    os.close(result_write)
+
+    written = 0
+    while True:
+        ready, _, _ = select.select([master], [], [])
+        try:
+            data = os.read(master, 65536)
+        except OSError:  # The child exited and closed the terminal
+            break
+        if not data:
+            break
+        written += len(data)
+    os.waitpid(pid, 0)
+    with os.fdopen(result_read) as f:
+        result = json.loads(f.read())
+    os.close(master)
+    result['written'] = written
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, default=2000)
+    parser.add_argument('--updates', type=int, default=50)
+    parser.add_argument('--spread-miles', type=float, default=150)
+    parser.add_argument('--size', default='50x160', help="Terminal size as ROWSxCOLUMNS")
+    args = parser.parse_args()
+    args.size = tuple(int(value) for value in args.size.lower().split('x'))
+
+    print(f"{args.aircraft} aircraft, {args.updates} updates, {args.size[0]}x{args.size[1]} terminal")
+    print(f"{'mode':>7} {'alerting rows':>14} {'CPU p50 (ms)':>13} {'CPU max (ms)':>13} {'bytes per update':>17}")
+    for mode in ('table', 'curses'):
+        result = measure(args, mode)
+        ordered = sorted(result['cpu_times'])
+        print(f"{mode:>7} {result['rows']:>14} {ordered[len(ordered) // 2] * 1000:>13.2f} {ordered[-1] * 1000:>13.2f} "
+              f"{result['written'] / args.updates:>17.0f}")
+
+
+if __name__ == '__main__':
+    main()
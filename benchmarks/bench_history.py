@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Sightings history: query speed over millions of rows and the cost of each cycle's write.
+
+Fills a history database with --rows synthetic sightings spread over a year, then times the
+questions the query CLI answers (one aircraft this month, top military types this week, top
+callsigns, latest alerts). It then records cycles of in-range aircraft through BirdAlert's
+SightingsHistory and reports the time and bytes written per cycle, against committing every
+row on its own.
+
+    python3 benchmarks/bench_history.py --rows 2000000 --in-range 40
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from synthetic import CALLSIGN_PREFIXES, MICTRONICS_TYPES, MILITARY_RANGES
+
+TARGET_HEX = 'a35e89'
+
+
+def fill(path, rows, seed=1):
+    rng = random.Random(seed)
+    history = BirdAlert.SightingsHistory(path, 900)  # Creates the schema
+    fleet = []
+    for number in range(max(rows // 40, 100)):
+        military = rng.random() < 0.03
+        start, end = rng.choice(MILITARY_RANGES) if military else (0xA00000, 0xADF7C7)
+        type_code, description = rng.choice(MICTRONICS_TYPES)
+        fleet.append((f"{rng.randint(start, end):06x}", f"{rng.choice(CALLSIGN_PREFIXES)}{rng.randint(1, 9999)}",
+                      type_code, description, int(military)))
+    fleet[25] = (TARGET_HEX, 'N123AB', 'C172', 'Cessna 172 Skyhawk', 0)  # A regular visitor, not the most frequent
+
+    now = time.time()
+
+    def generate():
+        for _ in range(rows):
+            hex_code, callsign, type_code, description, military = fleet[min(int(rng.paretovariate(1.2)) - 1, len(fleet) - 1)
+                                                                         if rng.random() < 0.3 else rng.randrange(len(fleet))]
+            first_seen = now - rng.uniform(0, 365 * 86400)
+            alerted = int(military or rng.random() < 0.02)
+            yield (hex_code, callsign, type_code, description, military, round(rng.uniform(0.5, 20), 2), first_seen,
+                   first_seen + rng.uniform(60, 1200), alerted, 'Military' if military else ('Watch list' if alerted else None))
+
+    db = history.db
+    db.execute("BEGIN")
+    db.executemany("INSERT INTO sightings (hex, callsign, type_code, description, military, closest_miles, first_seen, last_seen, "
+                   "alerted, rule) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", generate())
+    db.execute("COMMIT")
+    db.execute("ANALYZE")
+    return history
+
+
+def time_query(db, repeat, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        title, _, rows = BirdAlert.query_sightings(db, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, title, rows
+
+
+def written_bytes():
+    try:
+        with open('/proc/self/io') as f:
+            return int(next(line for line in f if line.startswith('wchar')).split()[1])
+    except (OSError, StopIteration):
+        return None
+
+
+def record_cycles(history, cycles, in_range, seed=2):
+    rng = random.Random(seed)
+    aircraft = [{'hex': f"{rng.randint(0xA00000, 0xAFFFFF):06x}", 'flight': f"N{number}"} for number in range(in_range * 3)]
+    seen = time.time()
+    timings = []
+    before = written_bytes()
+    for _ in range(cycles):
+        seen += 5
+        for item in rng.sample(aircraft, in_range):
+            history.observe(item, item['hex'], rng.uniform(0, 20), seen)
+        start = time.perf_counter()
+        history.flush(seen)
+        timings.append(time.perf_counter() - start)
+    after = written_bytes()
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1], (after - before) / cycles if before is not None else None
+
+
+class UnbatchedHistory(BirdAlert.SightingsHistory):
+    """Writes each changed sighting in its own transaction, as a plain autocommit connection would."""
+
+    def flush(self, current_time):
+        for hex_code, visit in list(self.dirty.items()):
+            self.dirty = {hex_code: visit}
+            super().flush(current_time)
+        self.dirty = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--in-range', type=int, default=40, help="Aircraft in range each cycle")
+    parser.add_argument('--cycles', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'history.db')
+        start = time.perf_counter()
+        history = fill(path, args.rows)
+        print(f"{args.rows} sightings over a year, {os.path.getsize(path) / 1e6:.0f} MB, filled in {time.perf_counter() - start:.1f} s\n")
+
+        queries = [
+            (f"--history {TARGET_HEX} --since month", dict(since=BirdAlert.parse_since('month'), aircraft=TARGET_HEX)),
+            ("--top type --military --since week", dict(since=BirdAlert.parse_since('week'), top='type', military=True)),
+            ("--top callsign --since 30d", dict(since=BirdAlert.parse_since('30d'), top='callsign')),
+            ("--recent --alerted --since year", dict(since=BirdAlert.parse_since('year'), recent=True, alerted=True)),
+        ]
+        print(f"{'query':<40} {'time (ms)':>10}  result")
+        for label, kwargs in queries:
+            elapsed, title, rows = time_query(history.db, args.repeat, **kwargs)
+            print(f"{label:<40} {elapsed * 1000:>10.2f}  {title if kwargs.get('aircraft') else f'{len(rows)} rows'}")
+        history.db.close()
+
+        print(f"\n{args.in_range} aircraft in range per cycle, {args.cycles} cycles")
+        print(f"{'writes':<28} {'p50 (ms)':>9} {'max (ms)':>9} {'bytes per cycle':>16}")
+        for label, history_class, name in (("one transaction per cycle", BirdAlert.SightingsHistory, 'batched.db'),
+                                           ("one transaction per row", UnbatchedHistory, 'unbatched.db')):
+            history = history_class(os.path.join(temp_dir, name), 900)
+            p50, worst, per_cycle = record_cycles(history, args.cycles, args.in_range)
+            history.db.close()
+            print(f"{label:<28} {p50 * 1000:>9.2f} {worst * 1000:>9.2f} {per_cycle if per_cycle is not None else 'n/a':>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Parse time and peak memory of aircraft.json across JSON backends and the streaming parser.
+
+Each measurement runs in its own process with tracemalloc enabled, so peak memory is the
+Python-level allocation high-water mark of the parse alone.
+
+    python3 benchmarks/bench_json.py --aircraft 1000 10000 50000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+BACKENDS = ['json', 'orjson', 'msgspec', 'stream']
+
+
+def measure(backend, path, repeat):
+    import BirdAlert
+
+    if backend == 'stream':
+        def parse():
+            with BirdAlert.AircraftJsonStream(path) as stream:
+                for _ in stream:
+                    pass
+    else:
+        name, loads = BirdAlert.select_json_backend(backend)
+        if name != backend:
+            print(json.dumps(None))
+            return
+
+        def parse():
+            with open(path, 'rb') as f:
+                return len(loads(f.read())['aircraft'])
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(json.dumps({'seconds': best, 'peak_mb': peak / 1e6}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure[0], args.measure[1], args.repeat)
+        return
+
+    from synthetic import write_aircraft_json
+
+    print(f"{'aircraft':>9} {'file (MB)':>10} {'backend':<8} {'parse (ms)':>11} {'peak (MB)':>10}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in args.aircraft:
+            path = os.path.join(temp_dir, f"aircraft_{count}.json")
+            write_aircraft_json(path, count)
+            size = os.path.getsize(path) / 1e6
+            for backend in BACKENDS:
+                result = subprocess.run([sys.executable, __file__, '--measure', backend, path, '--repeat', str(args.repeat)],
+                                        check=True, capture_output=True, text=True)
+                row = json.loads(result.stdout.strip().splitlines()[-1])
+                if row is None:
+                    print(f"{count:>9} {size:>10.1f} {backend:<8} {'not installed':>11}")
+                else:
+                    print(f"{count:>9} {size:>10.1f} {backend:<8} {row['seconds'] * 1000:>11.1f} {row['peak_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Per-aircraft cost of military hex detection on a synthetic snapshot.
+
+Compares the original is_military_aircraft (ranges rebuilt and parsed on every call)
+with the compiled interval table, the batch classifier and the memoized lookups.
+
+    python3 benchmarks/bench_military.py --aircraft 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+
+
+# is_military_aircraft as it was before the interval table, kept for comparison
+def legacy_is_military_aircraft(hex_code):
+    hex_int = int(hex_code.lstrip('~'), 16)
+    military_ranges = [(start, end) for start, end in BirdAlert.default_military_ranges]
+    for start, end in military_ranges:
+        if int(start, 16) <= hex_int <= int(end, 16):
+            return True
+    return False
+
+
+def make_snapshot(count, seed=1):
+    rng = random.Random(seed)
+    hexes = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            start, end = rng.choice(BirdAlert.default_military_ranges)
+            hex_int = rng.randint(int(start, 16), int(end, 16))
+        else:
+            hex_int = rng.randint(0, 0xFFFFFF)
+        hexes.append(('~' if rng.random() < 0.02 else '') + f"{hex_int:06x}")
+    return hexes
+
+
+def per_aircraft_us(func, hexes, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(hexes)
+        best = min(best, time.perf_counter() - start)
+    return best / len(hexes) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    hexes = make_snapshot(args.aircraft)
+    expected = [legacy_is_military_aircraft(hex_code) for hex_code in hexes]
+
+    def cold_batch(hexes, use_numpy):
+        saved = BirdAlert.numpy
+        if not use_numpy:
+            BirdAlert.numpy = None
+        BirdAlert.military_cache = {}
+        try:
+            return BirdAlert.classify_military(hexes)
+        finally:
+            BirdAlert.numpy = saved
+
+    assert cold_batch(hexes, False) == expected
+    if BirdAlert.numpy is not None:
+        assert cold_batch(hexes, True) == expected
+
+    def scalar(hexes):
+        BirdAlert.military_cache = {}
+        return [BirdAlert.is_military_aircraft(hex_code) for hex_code in hexes]
+
+    results = [
+        ('legacy per-aircraft', lambda h: [legacy_is_military_aircraft(x) for x in h]),
+        ('interval table per-aircraft', scalar),
+        ('batch (pure Python)', lambda h: cold_batch(h, False)),
+    ]
+    if BirdAlert.numpy is not None:
+        results.append(('batch (NumPy searchsorted)', lambda h: cold_batch(h, True)))
+    BirdAlert.classify_military(hexes)
+    results.append(('memoized repeat lookups', lambda h: [BirdAlert.is_military_aircraft(x) for x in h]))
+
+    print(f"{args.aircraft} aircraft, {sum(expected)} military")
+    baseline = None
+    for name, func in results:
+        cost = per_aircraft_us(func, hexes, args.repeat)
+        baseline = baseline or cost
+        print(f"{name:<30} {cost:8.3f} us/aircraft  {baseline / cost:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
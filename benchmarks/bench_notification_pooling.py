@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Per-alert latency of a 50-alert burst with fresh connections versus BirdAlert's pooled channels.
+
+Runs against local stub HTTP and SMTP servers. Use --connect-delay to simulate the
+handshake cost of a real TLS connection to Telegram or your mail provider.
+
+    python3 benchmarks/bench_notification_pooling.py --alerts 50 --connect-delay 0.05
+"""
+
+import argparse
+import os
+import smtplib
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from stub_servers import StubHttpServer, StubSmtpServer
+
+MESSAGE = "Bird Alert!\nAircraft hex: A35E89\nCallsign: N540W\nDistance: 4.20mi\n"
+
+
+# How the channels sent alerts before connection pooling: one connection and login per alert
+def legacy_http(url):
+    response = requests.post(url, json={"chat_id": "1", "text": MESSAGE})
+    response.raise_for_status()
+
+
+def legacy_smtp(port):
+    with smtplib.SMTP('127.0.0.1', port) as server:
+        server.login('me@example.com', 'password')
+        server.sendmail('me@example.com', 'me@example.com', MESSAGE)
+
+
+def pooled_http(url):
+    response = BirdAlert.http_post(url, 10, json={"chat_id": "1", "text": MESSAGE})
+    response.raise_for_status()
+
+
+def pooled_smtp(port):
+    BirdAlert.smtp_connection.sendmail('me@example.com', 'me@example.com', MESSAGE, 10)
+
+
+def burst(send, target, alerts):
+    latencies = []
+    for _ in range(alerts):
+        start = time.perf_counter()
+        send(target)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--alerts', type=int, default=50)
+    parser.add_argument('--connect-delay', type=float, default=0.0, help="Seconds added to every new connection")
+    args = parser.parse_args()
+
+    BirdAlert.your_smtp_server = '127.0.0.1'
+    BirdAlert.your_smtp_starttls = False
+    BirdAlert.your_email = 'me@example.com'
+    BirdAlert.your_email_app_password = 'password'
+
+    print(f"{args.alerts} alerts, {args.connect_delay * 1000:.0f} ms per new connection")
+    print(f"{'channel':<14} {'p50 (ms)':>9} {'p95 (ms)':>9} {'max (ms)':>9} {'total (s)':>10} {'connections':>12}")
+    for name, send, make_server in (
+            ('http legacy', legacy_http, lambda: StubHttpServer(args.connect_delay)),
+            ('http pooled', pooled_http, lambda: StubHttpServer(args.connect_delay)),
+            ('smtp legacy', legacy_smtp, lambda: StubSmtpServer(args.connect_delay)),
+            ('smtp pooled', pooled_smtp, lambda: StubSmtpServer(args.connect_delay))):
+        server = make_server()
+        if isinstance(server, StubSmtpServer):
+            BirdAlert.your_smtp_port = server.port
+            target = server.port
+        else:
+            target = server.url + '/botTOKEN/sendMessage'
+        latencies = burst(send, target, args.alerts)
+        print(f"{name:<14} {statistics.median(latencies):>9.2f} {latencies[int(len(latencies) * 0.95) - 1]:>9.2f} "
+              f"{latencies[-1]:>9.2f} {sum(latencies) / 1000:>10.3f} {server.connections:>12}")
+        BirdAlert.smtp_connection.close()
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Snapshot recorder size and cost, replay speed, and round-trip fidelity.
+
+Records --hours of synthetic aircraft.json snapshots (one every --interval seconds, parsed from
+JSON text as BirdAlert would read them) with BirdAlert's SnapshotRecorder and reports the disk
+used per day against raw aircraft.json and against compressing each snapshot on its own, and the
+recording cost per snapshot. It then reads the recording back, checks every snapshot matches
+what was recorded, times replay_recording() through the alert rules, and checks that a small
+record_max_mb keeps the folder within its limit. Exits with status 1 if a check fails.
+
+    python3 benchmarks/bench_recorder.py --aircraft 300 --hours 2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from synthetic import SyntheticFeed, aircraft_json_text
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def folder_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, default=300)
+    parser.add_argument('--hours', type=float, default=2)
+    parser.add_argument('--interval', type=float, default=5, help="Seconds between snapshots (update_rate)")
+    parser.add_argument('--limit-mb', type=float, default=2, help="record_max_mb for the rotation check")
+    args = parser.parse_args()
+
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=150)
+    count = int(args.hours * 3600 / args.interval)
+    failures = []
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        recording = os.path.join(temp_dir, 'recording')
+        recorder = BirdAlert.SnapshotRecorder(recording, 1 << 40, 3600)
+        expected = []
+        raw_bytes = separate_bytes = 0
+        record_time = 0.0
+        for _ in range(count):
+            feed.advance(args.interval)
+            text = aircraft_json_text(feed.now, feed.snapshot())
+            raw_bytes += len(text)
+            separate_bytes += len(zlib.compress(text.encode(), 6))
+            aircraft_list = json.loads(text)['aircraft']
+            expected.append((feed.now, json.loads(text)['aircraft']))
+            start = time.perf_counter()
+            recorder.record(feed.now, aircraft_list)
+            record_time += time.perf_counter() - start
+        recorder.close()
+        recorded_bytes = folder_size(recording)
+
+        per_day = 86400 / (args.hours * 3600) / 1e6
+        print(f"{args.aircraft} aircraft, {count} snapshots ({args.hours:g} h at {args.interval:g} s)")
+        print(f"Raw aircraft.json:           {raw_bytes * per_day:8.1f} MB/day")
+        print(f"Each snapshot compressed:    {separate_bytes * per_day:8.1f} MB/day")
+        print(f"Recording (delta + chunks):  {recorded_bytes * per_day:8.1f} MB/day "
+              f"({raw_bytes / recorded_bytes:.0f}x smaller than raw)")
+        print(f"Encoding and writing: {record_time / count * 1000:.2f} ms per snapshot (in the recorder thread, between polls)")
+
+        paths = sorted(os.path.join(recording, name) for name in os.listdir(recording))
+        start = time.perf_counter()
+        replayed = list(BirdAlert.read_recording(paths))
+        read_time = time.perf_counter() - start
+        print(f"Read back {len(replayed)} snapshots in {read_time:.2f} s")
+        if replayed != expected:
+            failures.append("replayed snapshots differ from the recorded ones")
+
+        BirdAlert.notification_workers = 1
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            BirdAlert.replay_recording(recording)
+        print(f"replay_recording(): {time.perf_counter() - start:.2f} s; {output.getvalue().strip().splitlines()[-1]}")
+
+        # A truncated last chunk, as after a power cut, loses only that chunk
+        with open(paths[-1], 'r+b') as f:
+            f.truncate(os.path.getsize(paths[-1]) - 100)
+        with contextlib.redirect_stdout(io.StringIO()):
+            truncated = list(BirdAlert.read_recording(paths))
+        if not 0 < len(expected) - len(truncated) <= BirdAlert.SnapshotRecorder.snapshots_per_chunk:
+            failures.append(f"a truncated file lost {len(expected) - len(truncated)} snapshots")
+
+        limited = os.path.join(temp_dir, 'limited')
+        limit = int(args.limit_mb * 1024 * 1024)
+        recorder = BirdAlert.SnapshotRecorder(limited, limit, 600)
+        for now, aircraft_list in expected:
+            recorder.record(now, aircraft_list)
+        recorder.close()
+        print(f"With record_max_mb = {args.limit_mb:g}: {folder_size(limited) / 1024 / 1024:.2f} MB in {len(os.listdir(limited))} files")
+        if folder_size(limited) > limit:
+            failures.append("the recording folder grew past record_max_mb")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("PASS" if not failures else "FAIL")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Rule-evaluation throughput of the compiled alert rules versus the original check_aircraft cascade.
+
+Every aircraft in the synthetic snapshots is treated as in range, notifications are stubbed
+and the results of both implementations are compared before timing.
+
+    python3 benchmarks/bench_rules.py --aircraft 10000 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+
+
+# The check_aircraft cascade before the rule engine, with notifications stubbed out
+def legacy_check_aircraft(aircraft, dist, direction, last_notified, terminal_table, commercial):
+    B = BirdAlert
+    hex_code = aircraft.get('hex')
+    transponder_type = aircraft.get('type', 'N/A')
+    emergency_flag = aircraft.get('emergency', 'none')
+    flight = aircraft.get('flight', 'N/A')
+    current_time = time.time()
+    type_info = 'Unknown'
+
+    def row(comment):
+        return (hex_code, aircraft.get('flight', 'N/A'), type_info, f"{dist:.2f}", direction, aircraft.get('gs', 'N/A'),
+                aircraft.get('type', 'N/A'), 'Yes' if aircraft.get('military', False) or B.is_military_aircraft(hex_code) else 'Unknown',
+                aircraft.get('emergency', 'none'), "Yes", comment)
+
+    def alert(comment):
+        if hex_code not in last_notified or (current_time - last_notified[hex_code]) > B.min_alert_period:
+            last_notified[hex_code] = current_time
+        terminal_table.append(row(comment))
+
+    if hex_code in B.hex_watch_list:
+        alert("Hex code in watch list")
+        return
+    for callsign in B.callsign_watch_list:
+        if flight.startswith(callsign):
+            alert("Callsign in watch list")
+            return
+    if B.include_emergency_check and emergency_flag != 'none':
+        alert("Emergency flag set")
+        return
+    if B.skip_commercial and flight.startswith(commercial):
+        return
+    if B.include_military_check and (aircraft.get('military', False) or B.is_military_aircraft(hex_code)):
+        alert("Military aircraft")
+        return
+    if transponder_type in B.transponder_types:
+        alert("Matches desired transponder type")
+
+
+def compiled_check_aircraft(aircraft, dist, direction, last_notified, terminal_table):
+    B = BirdAlert
+    hex_code = aircraft['hex']
+    rule = B.match_alert_rule(aircraft, hex_code, dist)
+    if rule is None or rule.action == 'ignore':
+        return
+    current_time = time.time()
+    if hex_code not in last_notified or (current_time - last_notified[hex_code]) > B.min_alert_period:
+        last_notified[hex_code] = current_time
+    track = B.AircraftTrack(hex_code)
+    track.update(aircraft)
+    track.type_info = 'Unknown'
+    track.type_source = B.aircrafts_index
+    track.dist = dist
+    track.direction = direction
+    terminal_table.append(B.build_terminal_row(track, rule.name))
+
+
+def make_snapshot(count, seed=1):
+    rng = random.Random(seed)
+    watch = list(BirdAlert.hex_watch_list)
+    airlines = BirdAlert.commercial_callsign_prefixes
+    transponders = ['adsb_icao', 'adsb_icao', 'adsb_icao', 'mlat', 'mode_s', 'tisb_other', 'adsb_icao_nt']
+    snapshot = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.01:
+            hex_code = rng.choice(watch)
+        elif roll < 0.06:
+            start, end = rng.choice(BirdAlert.default_military_ranges)
+            hex_code = f"{rng.randint(int(start, 16), int(end, 16)):06x}"
+        else:
+            hex_code = f"{rng.randint(0, 0xFFFFFF):06x}"
+        if rng.random() < 0.6:
+            flight = f"{rng.choice(airlines)}{rng.randint(1, 9999):<5}"
+        elif rng.random() < 0.05:
+            flight = f"CAP{rng.randint(1, 999):<5}"
+        else:
+            flight = f"N{rng.randint(1, 99999):<7}"
+        aircraft = {'hex': hex_code, 'flight': flight, 'type': rng.choice(transponders), 'gs': rng.randint(80, 500)}
+        if rng.random() < 0.002:
+            aircraft['emergency'] = 'general'
+        snapshot.append((aircraft, rng.uniform(0, BirdAlert.range_miles), 'North'))
+    return snapshot
+
+
+def run(check, snapshot, *extra):
+    last_notified = {}
+    table = []
+    start = time.perf_counter()
+    for aircraft, dist, direction in snapshot:
+        check(aircraft, dist, direction, last_notified, table, *extra)
+    return time.perf_counter() - start, table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    BirdAlert.compile_alert_rules()
+    commercial = tuple(BirdAlert.commercial_callsign_prefixes)
+    for count in args.aircraft:
+        snapshot = make_snapshot(count)
+        BirdAlert.classify_military([aircraft['hex'] for aircraft, _, _ in snapshot])
+        legacy = min(run(legacy_check_aircraft, snapshot, commercial) for _ in range(args.repeat))
+        compiled = min(run(compiled_check_aircraft, snapshot) for _ in range(args.repeat))
+        assert legacy[1] == compiled[1], "rule engine disagrees with the original cascade"
+        print(f"{count:>7} aircraft, {len(compiled[1])} alerting: legacy {count / legacy[0]:>10,.0f}/s  "
+              f"compiled {count / compiled[0]:>10,.0f}/s  ({legacy[0] / compiled[0]:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Multi-source fetch benchmark: several receivers, one slow feeder and one dead one.
+
+Serves overlapping synthetic aircraft.json snapshots from local HTTP feeders (each receiver
+hears a different subset of the aircraft with different position ages) alongside a local
+file, then runs BirdAlert's merged fetch. Reports cycle time, which stays near the slowest
+healthy source instead of the sum of all of them, per-source latency and the merged count.
+
+    python3 benchmarks/bench_sources.py --feeders 3 --aircraft 3000 --slow-delay 5
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from stub_servers import StubHttpServer
+from synthetic import SyntheticFeed, aircraft_json_text
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def receiver_view(feed, seed, share):
+    """The part of the feed one receiver hears, with its own position ages."""
+    rng = random.Random(seed)
+    heard = []
+    for aircraft in feed.aircraft:
+        if rng.random() < share:
+            heard.append(dict(aircraft, seen_pos=round(rng.uniform(0, 5), 1)))
+    return heard
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--feeders', type=int, default=3, help="Healthy HTTP receivers")
+    parser.add_argument('--aircraft', type=int, default=3000)
+    parser.add_argument('--share', type=float, default=0.6, help="Share of the aircraft each receiver hears")
+    parser.add_argument('--feeder-delay', type=float, default=0.05, help="Response time of the healthy feeders")
+    parser.add_argument('--slow-delay', type=float, default=5.0, help="Response time of the slow feeder")
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=1.0, help="source_timeout")
+    args = parser.parse_args()
+
+    feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=150)
+    views = {}
+
+    def serve_view(number):
+        return lambda: aircraft_json_text(feed.now, views[number]).encode()
+
+    feeders = [StubHttpServer(response_delay=args.feeder_delay, body=serve_view(number)) for number in range(args.feeders)]
+    slow = StubHttpServer(response_delay=args.slow_delay, body=serve_view(0))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        BirdAlert.your_lat = RECEIVER_LAT
+        BirdAlert.your_lon = RECEIVER_LON
+        BirdAlert.alert_state_path_expanded = ''
+        BirdAlert.notification_channels = [('stub', lambda: True, lambda message_body: True)]
+        BirdAlert.aircraft_json_path = os.path.join(temp_dir, 'aircraft.json')
+        BirdAlert.aircraft_sources = [feeder.url + '/data/aircraft.json' for feeder in feeders] + \
+            [slow.url + '/data/aircraft.json', f"http://127.0.0.1:{closed_port()}/data/aircraft.json"]
+        BirdAlert.source_timeout = args.timeout
+        BirdAlert.load_military_ranges()
+        BirdAlert.compile_alert_rules()
+        BirdAlert.load_alert_state()
+
+        cycle_times = []
+        for cycle in range(args.cycles):
+            feed.advance(1.0)
+            for number in range(args.feeders):
+                views[number] = receiver_view(feed, cycle * 100 + number, args.share)
+            local_view = receiver_view(feed, cycle * 100 + 99, args.share)
+            with open(BirdAlert.aircraft_json_path, 'w') as f:
+                f.write(aircraft_json_text(feed.now, local_view))
+            start = time.perf_counter()
+            BirdAlert.fetch_aircraft_data()
+            cycle_times.append(time.perf_counter() - start)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            BirdAlert.display_alerts()
+        print(f"{len(BirdAlert.aircraft_source_list)} sources, {args.aircraft} aircraft, each receiver hears {args.share:.0%}")
+        print(BirdAlert.source_status())
+        print(f"Merged aircraft: {len(BirdAlert.aircraft_tracks)}")
+        ordered = sorted(cycle_times)
+        print(f"Cycle time: p50 {ordered[len(ordered) // 2] * 1000:.0f} ms, max {ordered[-1] * 1000:.0f} ms "
+              f"(source_timeout {args.timeout:g} s; fetching one after another would take over {args.slow_delay:g} s)")
+
+        BirdAlert.aircraft_source_executor.shutdown(wait=False, cancel_futures=True)
+        for server in feeders + [slow]:
+            server.close()
+
+
+if __name__ == '__main__':
+    main()
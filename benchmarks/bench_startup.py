@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Cold start: import time and time from launch to the first completed poll cycle.
+
+Reports the slowest modules BirdAlert imports (from python -X importtime), then starts
+BirdAlert's run_script() in fresh interpreters against a synthetic Mictronics database and
+aircraft.json and times how long after launch the first cycle finishes. This is done with an
+up-to-date index and with a database that changed since the index was built, both with the
+database opened in the background (the default) and synchronously before the first poll as
+BirdAlert used to, and counts the alerting aircraft whose type was still pending.
+
+    python3 benchmarks/bench_startup.py --db-size 400000 --runs 3
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO)
+
+from synthetic import SyntheticFeed, write_mictronics_db, write_mictronics_operators, write_mictronics_types
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+# Runs in the child interpreter; the launch time is passed in so interpreter startup and imports count
+CHILD = '''
+import json, os, sys, time
+import BirdAlert
+settings = json.loads(os.environ['BENCH_SETTINGS'])
+BirdAlert.your_lat = settings['lat']
+BirdAlert.your_lon = settings['lon']
+BirdAlert.aircraft_json_path = settings['aircraft_json']
+BirdAlert.aircrafts_json_path_expanded = settings['aircrafts_json']
+BirdAlert.aircrafts_index_path = settings['aircrafts_json'] + '.idx'
+BirdAlert.types_json_path = settings['types_json']
+BirdAlert.operators_json_path = settings['operators_json']
+BirdAlert.aircrafts_db_refresh_interval = float('inf')
+BirdAlert.alert_state_path_expanded = ''
+BirdAlert.history_path = ''
+BirdAlert.notification_channels = [('stub', lambda: True, lambda message_body: True)]
+BirdAlert.display_mode = 'headless'
+if settings['synchronous']:
+    BirdAlert.load_aircrafts_index()
+    BirdAlert.AircraftsDatabaseUpdater.start_loading = lambda self: None
+
+def display_alerts():
+    elapsed = time.time() - settings['launched']
+    pending = sum(1 for row in BirdAlert.terminal_rows.values() if row[2] == 'Pending')
+    print('FIRST_CYCLE', json.dumps({'seconds': elapsed, 'alerting': len(BirdAlert.terminal_rows), 'pending': pending}))
+    sys.stdout.flush()
+    os._exit(0)
+
+BirdAlert.display_alerts = display_alerts
+BirdAlert.run_script()
+'''
+
+
+def import_report(runs):
+    totals = []
+    modules = {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import BirdAlert'], cwd=REPO,
+                                capture_output=True, text=True)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if name.strip() == 'BirdAlert':
+                totals.append(int(cumulative) / 1000)
+            elif name.startswith('   ') and not name.startswith('    '):  # Imported directly by BirdAlert
+                modules[name.strip()] = min(modules.get(name.strip(), float('inf')), int(cumulative) / 1000)
+    return min(totals), sorted(modules.items(), key=lambda item: item[1], reverse=True)
+
+
+def first_cycle(settings):
+    settings = dict(settings, launched=time.time())
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=REPO, capture_output=True, text=True,
+                            env=dict(os.environ, BENCH_SETTINGS=json.dumps(settings)))
+    for line in result.stdout.splitlines():
+        if line.startswith('FIRST_CYCLE '):
+            return json.loads(line[len('FIRST_CYCLE '):])
+    sys.exit(f"The child didn't finish a cycle:\n{result.stdout}\n{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-size', type=int, default=400000, help="Entries in the synthetic database")
+    parser.add_argument('--aircraft', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=3, help="Launches per case; the fastest is reported")
+    args = parser.parse_args()
+
+    total, modules = import_report(args.runs)
+    print(f"import BirdAlert: {total:.1f} ms. Slowest direct imports:")
+    for name, milliseconds in modules[:6]:
+        print(f"  {name:<20} {milliseconds:6.1f} ms")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=150)
+        settings = {'lat': RECEIVER_LAT, 'lon': RECEIVER_LON, 'aircraft_json': os.path.join(temp_dir, 'aircraft.json'),
+                    'aircrafts_json': os.path.join(temp_dir, 'aircrafts.json'), 'types_json': os.path.join(temp_dir, 'types.json'),
+                    'operators_json': os.path.join(temp_dir, 'operators.json')}
+        write_mictronics_types(settings['types_json'])
+        write_mictronics_operators(settings['operators_json'])
+        feed.advance(1.0)
+        feed.write(settings['aircraft_json'])
+
+        print(f"\nTime to first cycle, {args.db_size} database entries, {args.aircraft} aircraft")
+        print(f"{'index':>9} {'database opened':>16} {'first cycle (ms)':>17} {'types pending':>14}")
+        seeds = itertools.count(2)  # Every database written differs, so a stale index really needs rebuilding
+        for state in ('current', 'stale'):
+            for synchronous in (True, False):
+                best = None
+                for _ in range(args.runs):
+                    if state == 'stale' or not os.path.exists(settings['aircrafts_json'] + '.idx'):
+                        # A new database with the index left over from the old one, as after an update
+                        write_mictronics_db(settings['aircrafts_json'], feed.hexes(), args.db_size, seed=next(seeds))
+                        if state == 'current':
+                            first_cycle(dict(settings, synchronous=True))  # Leaves an up-to-date index behind
+                    result = first_cycle(dict(settings, synchronous=synchronous))
+                    if best is None or result['seconds'] < best['seconds']:
+                        best = result
+                print(f"{state:>9} {'before polling' if synchronous else 'in background':>16} {best['seconds'] * 1000:>17.0f} "
+                      f"{best['pending']:>6} of {best['alerting']:<6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Alert latency and CPU cost of the SBS/JSON stream ingest modes.
+
+Replays synthetic traffic from a local server and, every --target-every messages, sends a
+position for a new aircraft right next to the receiver. Reports the time from that message
+leaving the server to BirdAlert calling send_notification() for it, and the reader's CPU time
+per message. With ingest_mode = 'json' the same alert waits for readsb to write aircraft.json
+and for the next poll, on average update_rate / 2 + 0.5 seconds.
+
+    python3 benchmarks/bench_stream.py --aircraft 2000 --rate 5000 --seconds 10
+    python3 benchmarks/bench_stream.py --protocol json_stream --drop-after 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from replay_server import ReplayServer
+from synthetic import SyntheticFeed, sbs_message
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--protocol', choices=('sbs', 'json_stream'), default='sbs')
+    parser.add_argument('--aircraft', type=int, default=2000, help="Aircraft in the background traffic")
+    parser.add_argument('--rate', type=float, default=5000, help="Messages per second")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--target-every', type=int, default=500, help="Messages between aircraft entering range")
+    parser.add_argument('--drop-after', type=int, default=0, help="Server closes the connection after this many messages")
+    parser.add_argument('--update-rate', type=float, default=5, help="update_rate used for the polling comparison")
+    args = parser.parse_args()
+
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    BirdAlert.alert_state_path_expanded = ''
+    BirdAlert.stream_reconnect_delay = 0.05
+    BirdAlert.notification_channels = [('stub', lambda: True, lambda message_body: True)]
+    BirdAlert.load_military_ranges()
+    BirdAlert.compile_alert_rules()
+    BirdAlert.load_alert_state()
+
+    targets = set()
+    sent_at = {}
+    alerted_at = {}
+    original_send_notification = BirdAlert.send_notification
+
+    def send_notification(track, *args):
+        alerted_at.setdefault(track.hex, time.perf_counter())
+        return original_send_notification(track, *args)
+
+    BirdAlert.send_notification = send_notification
+
+    def format_message(aircraft, now):
+        if args.protocol == 'sbs':
+            return sbs_message(aircraft, now)
+        return json.dumps(dict(aircraft, now=now), separators=(',', ':')).encode() + b'\n'
+
+    def messages(client_number):
+        # Background traffic stays outside range_miles so only the targets alert
+        feed = SyntheticFeed(args.aircraft, RECEIVER_LAT + 2.0, RECEIVER_LON, spread_miles=60, seed=client_number, now=time.time())
+        target_number = 0
+        while True:
+            feed.advance(1.0)
+            for count, aircraft in enumerate(feed.aircraft, 1):
+                yield format_message(aircraft, feed.now)
+                if count % args.target_every == 0:
+                    target_number += 1
+                    target = {'hex': f"f{client_number:01x}{target_number:04x}", 'type': 'adsb_icao', 'flight': 'N123AB',
+                              'alt_baro': 4500, 'gs': 120.0, 'track': 90.0, 'squawk': '1200', 'emergency': 'none',
+                              'lat': RECEIVER_LAT + 0.01, 'lon': RECEIVER_LON + 0.01}
+                    targets.add(target['hex'])
+                    yield format_message(target, feed.now)
+
+    def on_send(line):
+        if line.startswith(b'MSG,3,1,1,F') or line.startswith(b'{"hex":"f'):
+            hex_code = line.split(b',')[4].decode().lower() if args.protocol == 'sbs' else json.loads(line)['hex']
+            if hex_code in targets:
+                sent_at[hex_code] = time.perf_counter()
+
+    server = ReplayServer(messages, rate=args.rate, drop_after=args.drop_after, on_send=on_send)
+    reader = BirdAlert.AircraftStreamReader('127.0.0.1', server.port, args.protocol)
+    cpu_start = time.thread_time()
+    reader.run_until(time.time() + args.seconds)
+    cpu = time.thread_time() - cpu_start
+    reader.close()
+    server.close()
+
+    latencies = sorted(alerted_at[hex_code] - sent for hex_code, sent in sent_at.items() if hex_code in alerted_at)
+    print(f"{args.protocol}: {reader.messages} messages in {args.seconds:.0f} s ({reader.messages / args.seconds:.0f}/s), "
+          f"{server.connections} connections, {len(BirdAlert.aircraft_tracks)} aircraft tracked")
+    print(f"Reader CPU {cpu:.2f} s, {cpu / max(reader.messages, 1) * 1e6:.1f} us per message")
+    if latencies:
+        print(f"Alert latency for {len(latencies)} of {len(sent_at)} aircraft entering range: "
+              f"p50 {percentile(latencies, 0.5):.2f} ms, p90 {percentile(latencies, 0.9):.2f} ms, "
+              f"p99 {percentile(latencies, 0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    print(f"Polling aircraft.json every {args.update_rate:g} s: {(args.update_rate / 2 + 0.5) * 1000:.0f} ms on average, "
+          f"up to {(args.update_rate + 1) * 1000:.0f} ms")
+    BirdAlert.wait_for_notifications()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""TIS-B track correlation cost: grid lookup against comparing every track.
+
+Fills the correlator with N TIS-B tracks spread around the receiver, then times one snapshot in
+which every aircraft reports a new position and --hop-share of them under a new "~" hex. The
+grid keeps the cost per snapshot roughly linear in N; the brute-force matcher, which checks
+every track for every new hex, grows with N squared.
+
+    python3 benchmarks/bench_tisb.py --tracks 500 2000 8000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+class BruteForceCorrelator(BirdAlert.TisbTrackCorrelator):
+    """Same gates as the grid version, but compares the new hex with every track."""
+
+    def nearby_tracks(self, lat, lon, position_time):
+        return self.tracks.values()
+
+
+def make_targets(rng, count, spread_miles):
+    spread_deg = spread_miles / 69.0
+    return [{'hex': f"~{rng.randint(0, 0xFFFFFF):06x}", 'lat': RECEIVER_LAT + rng.uniform(-spread_deg, spread_deg),
+             'lon': RECEIVER_LON + rng.uniform(-spread_deg, spread_deg), 'alt_baro': rng.randint(500, 18000),
+             'gs': rng.uniform(60, 250), 'track': rng.uniform(0, 360), 'baro_rate': 0} for _ in range(count)]
+
+
+def time_snapshot(correlator_class, targets, hop_share, seed):
+    rng = random.Random(seed)
+    correlator = correlator_class(BirdAlert.tisb_correlation_radius, BirdAlert.tisb_correlation_altitude, 600)
+    now = 1700000000.0
+    for aircraft in targets:
+        correlator.observe(aircraft, aircraft['lat'], aircraft['lon'], now)
+
+    now += 5.0
+    moved = []
+    for aircraft in targets:
+        miles = aircraft['gs'] * 1.15078 * 5.0 / 3600
+        heading = BirdAlert.radians(aircraft['track'])
+        lat = aircraft['lat'] + miles * BirdAlert.cos(heading) / 69.0
+        lon = aircraft['lon'] + miles * BirdAlert.sin(heading) / (69.0 * BirdAlert.cos(BirdAlert.radians(lat)))
+        hex_code = f"~{rng.randint(0, 0xFFFFFF):06x}" if rng.random() < hop_share else aircraft['hex']
+        moved.append((dict(aircraft, hex=hex_code, lat=lat, lon=lon), lat, lon))
+
+    start = time.perf_counter()
+    for aircraft, lat, lon in moved:
+        correlator.observe(aircraft, lat, lon, now)
+    return time.perf_counter() - start, correlator.correlated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, nargs='+', default=[500, 2000, 8000])
+    parser.add_argument('--hop-share', type=float, default=0.2, help="Share of aircraft reporting under a new hex")
+    parser.add_argument('--spread-miles', type=float, default=150)
+    args = parser.parse_args()
+
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    print(f"{'tracks':>7} {'grid (ms)':>10} {'brute force (ms)':>17} {'speedup':>8} {'hex changes followed':>21}")
+    for count in args.tracks:
+        targets = make_targets(random.Random(count), count, args.spread_miles)
+        grid_time, followed = time_snapshot(BirdAlert.TisbTrackCorrelator, targets, args.hop_share, count)
+        brute_time, _ = time_snapshot(BruteForceCorrelator, targets, args.hop_share, count)
+        print(f"{count:>7} {grid_time * 1000:>10.2f} {brute_time * 1000:>17.2f} {brute_time / grid_time:>7.1f}x {followed:>21}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Type, class and operator rules: memory, set-up time, per-aircraft cost and correctness.
+
+Writes a synthetic Mictronics aircrafts.json (--db-size entries over --types type designators, a
+few types much more common than the rest, as in the real database) with matching types.json and
+operators.json, builds aircrafts.idx and loads the tables through BirdAlert. Reports the size of
+the type postings added to the index, the memory and time to resolve each rule, and the rule
+evaluation cost per aircraft against looking the type up for every aircraft and against scanning
+the database. Checks every rule matches exactly what a plain scan of the database finds, and that
+rules compiled before the databases load (with an alert zone that has its own rules) match once
+they do, in the main plan and the zone's. Exits with status 1 if a check fails.
+
+    python3 benchmarks/bench_type_rules.py --db-size 500000 --types 2600
+"""
+
+import argparse
+import fnmatch
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from synthetic import write_mictronics_db, write_mictronics_operators, write_mictronics_types
+
+RULES = [
+    ("type C130 or V22", {'type_codes': ['C130', 'V22']}),
+    ("helicopters (H*)", {'aircraft_classes': ['H*']}),
+    ("operators", {'operators': ['RCH', 'Civil Air Patrol']}),
+]
+
+
+def expected_hexes(rule, data, types):
+    """The plain way: every database entry checked against the rule."""
+    if 'type_codes' in rule:
+        wanted = set(rule['type_codes'])
+        return {hex_code.lower() for hex_code, entry in data.items() if entry.get('t') in wanted}
+    patterns = rule['aircraft_classes']
+    return {hex_code.lower() for hex_code, entry in data.items()
+            if entry.get('t') in types and any(fnmatch.fnmatchcase(types[entry['t']][1], pattern) for pattern in patterns)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-size', type=int, default=500000)
+    parser.add_argument('--types', type=int, default=2600, help="Type designators in types.json")
+    parser.add_argument('--operators', type=int, default=6000)
+    parser.add_argument('--aircraft', type=int, default=200000, help="Rule evaluations timed")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        types = write_mictronics_types(os.path.join(temp_dir, 'types.json'), args.types)
+        operators = write_mictronics_operators(os.path.join(temp_dir, 'operators.json'), args.operators)
+        type_list = [(type_code, entry[0]) for type_code, entry in types.items()]
+        weights = [1 / (rank + 1) for rank in range(len(type_list))]  # A few types are much more common than the rest
+        data = write_mictronics_db(os.path.join(temp_dir, 'aircrafts.json'), count=args.db_size, types=type_list, weights=weights)
+
+        BirdAlert.aircrafts_json_path_expanded = os.path.join(temp_dir, 'aircrafts.json')
+        BirdAlert.aircrafts_index_path = BirdAlert.aircrafts_json_path_expanded + '.idx'
+        BirdAlert.types_json_path = os.path.join(temp_dir, 'types.json')
+        BirdAlert.operators_json_path = os.path.join(temp_dir, 'operators.json')
+
+        # Compiled at start-up, before the databases load, with a zone compiling its own plan afterwards
+        BirdAlert.alert_rules = [dict(rule, name=label) for label, rule in RULES]
+        BirdAlert.alert_zones = [{'name': "Field", 'circle': (39.86, -104.67, 5), 'rules': [RULES[1][0]]}]
+        BirdAlert.compile_alert_rules()
+        BirdAlert.load_alert_zones()
+        start = time.perf_counter()
+        BirdAlert.load_aircrafts_index()
+        index = BirdAlert.aircrafts_index
+        postings_bytes = (index.string_count + 1 + len(index)) * 4
+        print(f"{len(index)} aircraft, {len(types)} types, {len(operators)} operators")
+        print(f"aircrafts.idx built in {time.perf_counter() - start:.2f} s: {os.path.getsize(BirdAlert.aircrafts_index_path) / 1e6:.1f} MB, "
+              f"of which the type postings are {postings_bytes / 1e6:.1f} MB (memory-mapped, read only for the types a rule names)")
+
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        BirdAlert.load_mictronics_tables()
+        elapsed = time.perf_counter() - start
+        print(f"types.json and operators.json joined into tables in {elapsed * 1000:.0f} ms, "
+              f"{tracemalloc.get_traced_memory()[0] / 1e6:.2f} MB")
+        tracemalloc.stop()
+
+        plans = (("alert_rules", BirdAlert.compiled_alert_rules, RULES[0]), ("zone Field", BirdAlert.zone_index.zones[0].evaluate, RULES[1]))
+        for plan_name, evaluate, (label, rule) in plans:
+            hex_code = min(expected_hexes(rule, data, types))
+            matched = evaluate({'hex': hex_code, 'flight': 'N1'}, hex_code, 5.0)
+            if matched is None or matched.name != label:
+                failures.append(f"{plan_name}: {hex_code} matched {matched.name if matched else None} once the databases loaded, expected {label}")
+        BirdAlert.alert_zones = []
+        BirdAlert.zone_index = None
+
+        print(f"\n{'rule':<20} {'matches':>9} {'resolve (ms)':>13} {'memory (MB)':>12}")
+        for label, rule in RULES:
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            BirdAlert.compile_alert_rules([dict(rule, name=label)])
+            elapsed = time.perf_counter() - start
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            matcher = BirdAlert.database_rule_matchers[0]
+            print(f"{label:<20} {len(matcher.matches):>9} {elapsed * 1000:>13.1f} {memory / 1e6:>12.2f}")
+            if 'operators' in rule:
+                if matcher.matches != {'RCH', 'CAP'}:
+                    failures.append(f"{label} resolved to {sorted(matcher.matches)}")
+            elif matcher.matches != expected_hexes(rule, data, types):
+                failures.append(f"{label} doesn't match the database scan")
+
+        # Evaluation cost: aircraft drawn from the database, so lookups hit as often as they would live
+        hexes = [hex_code.lower() for hex_code in list(data)[:5000]]
+        aircraft_list = [{'hex': hex_code, 'flight': f"RCH{number % 900 + 100}" if number % 7 == 0 else f"N{number}"}
+                         for number, hex_code in enumerate(hexes)]
+        BirdAlert.compile_alert_rules([dict(rule, name=label) for label, rule in RULES])
+        evaluate = BirdAlert.compiled_alert_rules
+        start = time.perf_counter()
+        for number in range(args.aircraft):
+            aircraft = aircraft_list[number % len(aircraft_list)]
+            evaluate(aircraft, aircraft['hex'], 5.0)
+        compiled = (time.perf_counter() - start) / args.aircraft
+
+        tables = BirdAlert.mictronics_tables
+        wanted_types = {'C130', 'V22'}
+        start = time.perf_counter()
+        for number in range(args.aircraft):
+            aircraft = aircraft_list[number % len(aircraft_list)]
+            entry = index.get(aircraft['hex'])
+            type_code = entry[0] if entry else ''
+            if type_code in wanted_types:
+                continue
+            if type_code in tables.types and fnmatch.fnmatchcase(tables.types[type_code][1], 'H*'):
+                continue
+            flight = aircraft['flight']
+            if flight[:3] in ('RCH', 'CAP') and flight[3:4].isdigit():
+                continue
+        lookup = (time.perf_counter() - start) / args.aircraft
+
+        sample = aircraft_list[:20]
+        start = time.perf_counter()
+        for aircraft in sample:
+            any(hex_code.lower() == aircraft['hex'] and entry.get('t') in wanted_types for hex_code, entry in data.items())
+        scan = (time.perf_counter() - start) / len(sample)
+
+        print("\nPer aircraft, all three rules:")
+        print(f"  compiled rules (set lookups)         {compiled * 1e6:10.2f} us")
+        print(f"  type looked up per aircraft          {lookup * 1e6:10.2f} us")
+        print(f"  database scanned per aircraft        {scan * 1e6:10.0f} us (one rule)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("PASS" if not failures else "FAIL")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Alert zone lookup: grid index with batched containment against testing every zone.
+
+Places a mix of circle and polygon zones (airports, facilities, TFRs) around the receiver and
+times finding the zones of every aircraft in a synthetic snapshot, first with BirdAlert's
+locate_in_zones() and then by testing each aircraft against each zone one at a time. Both
+must agree on every membership.
+
+    python3 benchmarks/bench_zones.py --aircraft 2000 --zones 10 50 200
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from synthetic import SyntheticFeed
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def make_zones(rng, count, spread_miles):
+    spread_deg = spread_miles / 69.0
+    zones = []
+    for number in range(count):
+        lat = RECEIVER_LAT + rng.uniform(-spread_deg, spread_deg)
+        lon = RECEIVER_LON + rng.uniform(-spread_deg, spread_deg)
+        zone = {'name': f"Zone {number}"}
+        if number % 2:
+            zone['circle'] = (lat, lon, rng.uniform(1, 10))
+        else:
+            radius_deg = rng.uniform(2, 12) / 69.0
+            sides = rng.randint(5, 12)
+            zone['polygon'] = [(lat + radius_deg * rng.uniform(0.5, 1) * math.cos(2 * math.pi * side / sides),
+                                lon + radius_deg * rng.uniform(0.5, 1) * math.sin(2 * math.pi * side / sides) / math.cos(math.radians(lat)))
+                               for side in range(sides)]
+        if rng.random() < 0.3:
+            zone['max_altitude'] = rng.choice([3000, 8000, 18000])
+        zones.append(zone)
+    return zones
+
+
+def naive_memberships(aircraft_list):
+    memberships = {}
+    for aircraft in aircraft_list:
+        lat = aircraft.get('lat')
+        lon = aircraft.get('lon')
+        if lat is None or lon is None:
+            continue
+        for zone in BirdAlert.zone_index.zones:
+            if zone.in_altitude_band(aircraft) and zone.contains([lat], [lon])[0]:
+                memberships.setdefault(aircraft['hex'], []).append(zone.name)
+    return memberships
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, default=2000)
+    parser.add_argument('--zones', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--spread-miles', type=float, default=150)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    BirdAlert.load_military_ranges()
+    BirdAlert.compile_alert_rules()
+    feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=args.spread_miles)
+    aircraft_list = feed.advance(1.0)
+
+    print(f"{args.aircraft} aircraft, numpy {'yes' if BirdAlert.numpy is not None else 'no'}")
+    print(f"{'zones':>6} {'indexed (ms)':>13} {'every zone (ms)':>16} {'speedup':>8} {'aircraft in a zone':>19}")
+    for count in args.zones:
+        BirdAlert.alert_zones = make_zones(random.Random(count), count, args.spread_miles)
+        BirdAlert.load_alert_zones()
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results = BirdAlert.locate_in_zones(aircraft_list)
+        indexed = (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = naive_memberships(aircraft_list)
+        naive = (time.perf_counter() - start) / args.repeat
+
+        found = {aircraft['hex']: [zone.name for zone in zones] for aircraft, _, _, zones in results}
+        if found != expected:
+            sys.exit(f"Memberships differ with {count} zones")
+        print(f"{count:>6} {indexed * 1000:>13.2f} {naive * 1000:>16.2f} {naive / indexed:>7.1f}x {len(found):>19}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Local stand-in for readsb's SBS (port 30003) and JSON position (port 30047) outputs.
+
+Replays a capture (one message per line, ex. recorded with `nc 127.0.0.1 30003 > capture.sbs`)
+or, without a capture, synthetic traffic around a location. Each client gets its own copy of the
+stream. --drop-after closes every connection after that many messages to exercise reconnects.
+
+    python3 benchmarks/replay_server.py capture.sbs --port 30003 --rate 2000
+    python3 benchmarks/replay_server.py --aircraft 500 --lat 39.86 --lon -104.67 --port 30003
+
+Then set ingest_mode = 'sbs' and stream_port = 30003 in BirdAlert.py.
+"""
+
+import argparse
+import itertools
+import json
+import socket
+import threading
+import time
+
+from synthetic import SyntheticFeed, sbs_message
+
+
+class ReplayServer:
+    """TCP server sending lines from messages(client_number) to each client at `rate` lines per second (0 for no limit).
+
+    on_send, if given, is called with each line just before it is written to the socket.
+    """
+
+    def __init__(self, messages, rate=0.0, drop_after=0, port=0, on_send=None):
+        self.messages = messages
+        self.on_send = on_send
+        self.rate = rate
+        self.drop_after = drop_after
+        self.connections = 0
+        self.sent = 0
+        self.listener = socket.create_server(('127.0.0.1', port))
+        self.port = self.listener.getsockname()[1]
+        self.closed = False
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+
+    def accept_loop(self):
+        while not self.closed:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections += 1
+            threading.Thread(target=self.serve, args=(client, self.connections), daemon=True).start()
+
+    def serve(self, client, client_number):
+        start = time.perf_counter()
+        try:
+            for count, line in enumerate(self.messages(client_number), 1):
+                if self.closed:
+                    break
+                if self.rate:
+                    delay = start + count / self.rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if self.on_send is not None:
+                    self.on_send(line)
+                client.sendall(line)
+                self.sent += 1
+                if self.drop_after and count >= self.drop_after:
+                    break
+        except OSError:
+            pass  # Client went away
+        finally:
+            client.close()
+
+    def close(self):
+        self.closed = True
+        self.listener.close()
+
+
+def capture_messages(path, loop):
+    def messages(client_number):
+        for _ in itertools.count() if loop else range(1):
+            with open(path, 'rb') as f:
+                for line in f:
+                    yield line
+    return messages
+
+
+def synthetic_messages(args):
+    def messages(client_number):
+        feed = SyntheticFeed(args.aircraft, args.lat, args.lon, spread_miles=args.spread_miles, seed=client_number,
+                             now=time.time())
+        while True:
+            feed.advance(1.0)
+            for aircraft in feed.aircraft:
+                if args.protocol == 'sbs':
+                    yield sbs_message(aircraft, feed.now)
+                else:
+                    yield json.dumps(dict(aircraft, now=feed.now), separators=(',', ':')).encode() + b'\n'
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture', nargs='?', help="File of recorded messages to replay (default: synthetic traffic)")
+    parser.add_argument('--loop', action='store_true', help="Replay the capture forever")
+    parser.add_argument('--protocol', choices=('sbs', 'json_stream'), default='sbs', help="Format of the synthetic traffic")
+    parser.add_argument('--port', type=int, default=30003)
+    parser.add_argument('--rate', type=float, default=1000, help="Messages per second per client (0 for no limit)")
+    parser.add_argument('--drop-after', type=int, default=0, help="Close each connection after this many messages")
+    parser.add_argument('--aircraft', type=int, default=500)
+    parser.add_argument('--lat', type=float, default=39.8617)
+    parser.add_argument('--lon', type=float, default=-104.6731)
+    parser.add_argument('--spread-miles', type=float, default=100)
+    args = parser.parse_args()
+
+    messages = capture_messages(args.capture, args.loop) if args.capture else synthetic_messages(args)
+    server = ReplayServer(messages, rate=args.rate, drop_after=args.drop_after, port=args.port)
+    print(f"Serving on 127.0.0.1:{server.port}, Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"{server.connections} connections, {server.sent} messages sent")
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
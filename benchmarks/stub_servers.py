@@ -0,0 +1,127 @@
+"""Local stand-ins for the services BirdAlert talks to, used by the benchmarks.
+
+Each server runs on 127.0.0.1 in a background thread and counts the connections it accepts
+so benchmarks can show how many handshakes were needed.
+"""
+
+import http.server
+import socketserver
+import threading
+import time
+
+
+class StubHttpServer:
+    """HTTP/1.1 server with keep-alive that answers every POST/GET with a small JSON body.
+
+    body may be bytes or a function returning the bytes to send, ex. the current aircraft.json.
+    With an etag, a GET whose If-None-Match matches gets 304 Not Modified; set stub.etag to
+    publish a new version. truncate_to cuts the body short while still announcing its full length.
+    """
+
+    def __init__(self, connect_delay=0.0, response_delay=0.0, body=b'{"ok": true}', etag=None):
+        stub = self
+        self.connections = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.etag = etag
+        self.truncate_to = None
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub.connections += 1
+                time.sleep(connect_delay)  # Stands in for the TCP/TLS handshake round trips
+
+            def respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                stub.requests += 1
+                time.sleep(response_delay)
+                if stub.etag is not None and self.headers.get('If-None-Match') == stub.etag:
+                    stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', stub.etag)
+                    self.end_headers()
+                    return
+                content = body() if callable(body) else body
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                if stub.etag is not None:
+                    self.send_header('ETag', stub.etag)
+                self.end_headers()
+                if stub.truncate_to is not None:
+                    self.wfile.write(content[:stub.truncate_to])
+                    self.close_connection = True
+                    return
+                self.wfile.write(content)
+
+            do_POST = respond
+            do_GET = respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.server.handle_error = lambda request, client_address: None  # Clients that gave up waiting
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubSmtpServer:
+    """Minimal ESMTP server that accepts any AUTH PLAIN login and any message."""
+
+    def __init__(self, connect_delay=0.0):
+        stub = self
+        self.connections = 0
+        self.messages = 0
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def reply(self, text):
+                self.wfile.write(text.encode() + b'\r\n')
+
+            def handle(self):
+                stub.connections += 1
+                time.sleep(connect_delay)
+                self.reply('220 stub ESMTP')
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors='replace').strip().upper()
+                    if command.startswith('EHLO'):
+                        self.reply('250-stub\r\n250-AUTH PLAIN LOGIN\r\n250 OK')
+                    elif command.startswith('AUTH'):
+                        time.sleep(connect_delay)
+                        self.reply('235 Authentication successful')
+                    elif command == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        while self.rfile.readline() not in (b'.\r\n', b''):
+                            pass
+                        stub.messages += 1
+                        self.reply('250 OK')
+                    elif command == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:  # HELO, MAIL, RCPT, NOOP, RSET
+                        self.reply('250 OK')
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,223 @@
+"""Synthetic readsb data for the benchmarks.
+
+SyntheticFeed produces a sequence of aircraft.json snapshots in which aircraft fly along their
+tracks, with configurable shares of watch-list, military and TIS-B hexes and emergencies.
+write_mictronics_db() writes a matching Mictronics aircrafts.json (write_mictronics_types() and
+write_mictronics_operators() the types.json and operators.json to go with it) and sbs_message()
+formats an aircraft as a BaseStation line for the stream ingest benchmarks.
+"""
+
+import datetime
+import json
+import math
+import os
+import random
+
+TRANSPONDER_TYPES = ['adsb_icao', 'adsb_icao', 'adsb_icao', 'adsb_icao', 'mlat', 'mode_s', 'adsr_icao', 'tisb_icao', 'adsb_icao_nt']
+CALLSIGN_PREFIXES = ['UAL', 'DAL', 'SWA', 'AAL', 'SKW', 'FDX', 'N', 'N', 'N', 'CAP', 'RCH', 'EJA']
+EMERGENCIES = ['general', 'lifeguard', 'minfuel', 'nordo', 'unlawful', 'downed']
+MICTRONICS_TYPES = [('C172', 'Cessna 172 Skyhawk'), ('B738', 'Boeing 737-800'), ('A320', 'Airbus A320'),
+                    ('GLF6', 'Gulfstream G650'), ('C130', 'Lockheed C-130 Hercules'), ('R44', 'Robinson R44'),
+                    ('PC12', 'Pilatus PC-12'), ('BE20', 'Beechcraft King Air 200'), ('E190', 'Embraer E-190'),
+                    ('H60', 'Sikorsky UH-60 Black Hawk'), ('V22', 'Bell-Boeing V-22 Osprey'), ('B06', 'Bell 206')]
+# ICAO classes of the types above, as in the Mictronics types.json
+MICTRONICS_TYPE_CLASSES = {'C172': 'L1P', 'B738': 'L2J', 'A320': 'L2J', 'GLF6': 'L2J', 'C130': 'L4T', 'R44': 'H1P', 'PC12': 'L1T',
+                           'BE20': 'L2T', 'E190': 'L2J', 'H60': 'H2T', 'V22': 'T2T', 'B06': 'H1T'}
+MILITARY_RANGES = [(0xADF7C8, 0xAFFFFF), (0x43C000, 0x43CFFF), (0x3AA000, 0x3AFFFF), (0xC20000, 0xC3FFFF)]
+
+
+def make_aircraft(rng, center_lat, center_lon, spread_deg):
+    hex_int = rng.randint(0, 0xFFFFFF)
+    aircraft = {
+        'hex': f"{hex_int:06x}",
+        'type': rng.choice(TRANSPONDER_TYPES),
+        'flight': f"{rng.choice(CALLSIGN_PREFIXES)}{rng.randint(1, 9999)}".ljust(8),
+        'alt_baro': rng.randint(500, 41000),
+        'gs': round(rng.uniform(60, 520), 1),
+        'track': round(rng.uniform(0, 360), 1),
+        'baro_rate': rng.choice([0, 64, -64, 1216, -832]),
+        'squawk': f"{rng.randint(0, 7777):04d}",
+        'emergency': 'none',
+        'category': rng.choice(['A1', 'A3', 'A5', 'A7']),
+        'lat': round(center_lat + rng.uniform(-spread_deg, spread_deg), 6),
+        'lon': round(center_lon + rng.uniform(-spread_deg, spread_deg), 6),
+        'nic': 8, 'rc': 186, 'seen_pos': round(rng.uniform(0, 10), 1),
+        'version': 2, 'nac_p': 9, 'nac_v': 1, 'sil': 3, 'sil_type': 'perhour',
+        'mlat': [], 'tisb': [], 'messages': rng.randint(10, 5000),
+        'seen': round(rng.uniform(0, 5), 1), 'rssi': round(rng.uniform(-30, -3), 1),
+    }
+    return aircraft
+
+
+def aircraft_json_text(now, aircraft_list):
+    """Format a snapshot the way readsb writes aircraft.json: one aircraft object per line."""
+    lines = [json.dumps(aircraft, separators=(',', ':')) for aircraft in aircraft_list]
+    return (f'{{ "now" : {now:.1f},\n  "messages" : {sum(a.get("messages", 0) for a in aircraft_list)},\n'
+            f'  "aircraft" : [\n' + ',\n'.join(lines) + '\n  ]\n}\n')
+
+
+def sbs_message(aircraft, timestamp):
+    """Format an aircraft as one BaseStation (SBS) line the way readsb sends it on port 30003."""
+    when = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    date = when.strftime('%Y/%m/%d')
+    clock = when.strftime('%H:%M:%S.') + f"{when.microsecond // 1000:03d}"
+    emergency = '-1' if aircraft.get('emergency', 'none') != 'none' else '0'
+    fields = ['MLAT' if aircraft.get('type') == 'mlat' else 'MSG', '3', '1', '1', aircraft['hex'].upper(), '1',
+              date, clock, date, clock, aircraft.get('flight', '').strip(), str(aircraft.get('alt_baro', '')),
+              str(aircraft.get('gs', '')), str(aircraft.get('track', '')), str(aircraft.get('lat', '')),
+              str(aircraft.get('lon', '')), str(aircraft.get('baro_rate', '')), aircraft.get('squawk', ''),
+              '0', emergency, '0', '0']
+    return (','.join(fields) + '\r\n').encode('ascii')
+
+
+def write_aircraft_json(path, count, seed=1, center_lat=39.8617, center_lon=-104.6731, spread_deg=3.0, now=1700000000.0):
+    rng = random.Random(seed)
+    aircraft_list = [make_aircraft(rng, center_lat, center_lon, spread_deg) for _ in range(count)]
+    with open(path, 'w') as f:
+        f.write(aircraft_json_text(now, aircraft_list))
+    return aircraft_list
+
+
+class SyntheticFeed:
+    """A moving population of aircraft around a receiver.
+
+    spread_miles    half-width of the square the aircraft start in
+    watch_share     fraction of aircraft using a hex from watch_hexes
+    military_share  fraction of aircraft with a hex inside a military range
+    tisb_share      fraction of TIS-B targets with "~" addresses
+    emergency_rate  chance per aircraft per snapshot of squawking an emergency
+    position_rate   chance per aircraft per snapshot of a new position (the rest keep their old one)
+    hex_hop_rate    chance per TIS-B target per snapshot of switching to a new "~" address; like readsb,
+                    the snapshot keeps listing the old address with an ageing position for ghost_seconds
+
+    identities maps every hex the feed has used to the aircraft (its first hex) that used it.
+    """
+
+    def __init__(self, count, center_lat, center_lon, spread_miles=150, watch_hexes=(), watch_share=0.01,
+                 military_share=0.05, tisb_share=0.02, emergency_rate=0.001, position_rate=0.8, seed=1,
+                 now=1700000000.0, hex_hop_rate=0.0, ghost_seconds=30):
+        self.rng = random.Random(seed)
+        self.center_lat = center_lat
+        self.center_lon = center_lon
+        self.emergency_rate = emergency_rate
+        self.position_rate = position_rate
+        self.hex_hop_rate = hex_hop_rate
+        self.ghost_seconds = ghost_seconds
+        self.ghosts = []  # (old aircraft entry, time it disappears)
+        self.now = now
+        spread_deg = spread_miles / 69.0
+        watch_hexes = list(watch_hexes)
+        self.aircraft = []
+        for _ in range(count):
+            aircraft = make_aircraft(self.rng, center_lat, center_lon, spread_deg)
+            roll = self.rng.random()
+            if watch_hexes and roll < watch_share:
+                aircraft['hex'] = self.rng.choice(watch_hexes)
+            elif roll < watch_share + military_share:
+                start, end = self.rng.choice(MILITARY_RANGES)
+                aircraft['hex'] = f"{self.rng.randint(start, end):06x}"
+                aircraft['flight'] = f"RCH{self.rng.randint(1, 999)}".ljust(8)
+            elif roll < watch_share + military_share + tisb_share:
+                aircraft['hex'] = f"~{self.rng.randint(0, 0xFFFFFF):06x}"
+                aircraft['type'] = 'tisb_other'
+            self.aircraft.append(aircraft)
+        self.identities = {aircraft['hex']: aircraft['hex'] for aircraft in self.aircraft}
+
+    def hexes(self):
+        return [aircraft['hex'] for aircraft in self.aircraft]
+
+    def advance(self, seconds=1.0):
+        """Move every aircraft along its track and return the next snapshot's aircraft list."""
+        self.now += seconds
+        rng = self.rng
+        if self.hex_hop_rate:
+            self.hop_hexes(seconds)
+        for aircraft in self.aircraft:
+            aircraft['seen'] = round(rng.uniform(0, 2), 1)
+            if rng.random() < self.position_rate:
+                miles = aircraft['gs'] * 1.15078 * seconds / 3600
+                track = math.radians(aircraft['track'])
+                aircraft['lat'] = round(aircraft['lat'] + miles * math.cos(track) / 69.0, 6)
+                aircraft['lon'] = round(aircraft['lon'] + miles * math.sin(track) / (69.0 * math.cos(math.radians(aircraft['lat']))), 6)
+                aircraft['seen_pos'] = round(rng.uniform(0, 0.9), 1)
+            else:
+                aircraft['seen_pos'] = round(aircraft['seen_pos'] + seconds, 1)
+            if aircraft['emergency'] != 'none' or rng.random() < self.emergency_rate:
+                aircraft['emergency'] = rng.choice(EMERGENCIES) if aircraft['emergency'] == 'none' else 'none'
+        return self.snapshot()
+
+    # The old address keeps the position it had before this snapshot, so its last report is older than the new one's
+    def hop_hexes(self, seconds):
+        rng = self.rng
+        for aircraft in self.aircraft:
+            if aircraft['hex'][0] == '~' and rng.random() < self.hex_hop_rate:
+                self.ghosts.append((dict(aircraft), self.now + self.ghost_seconds))
+                new_hex = f"~{rng.randint(0, 0xFFFFFF):06x}"
+                self.identities[new_hex] = self.identities[aircraft['hex']]
+                aircraft['hex'] = new_hex
+        for ghost, _ in self.ghosts:
+            ghost['seen'] = round(ghost['seen'] + seconds, 1)
+            ghost['seen_pos'] = round(ghost['seen_pos'] + seconds, 1)
+        self.ghosts = [(ghost, expires) for ghost, expires in self.ghosts if expires > self.now]
+
+    def snapshot(self):
+        return self.aircraft + [ghost for ghost, _ in self.ghosts] if self.ghosts else self.aircraft
+
+    def write(self, path):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(aircraft_json_text(self.now, self.snapshot()))
+        os.replace(temp_path, path)  # readsb replaces aircraft.json the same way
+
+
+def write_mictronics_db(path, hexes=(), count=100000, military_share=0.02, seed=1, types=None, weights=None):
+    """Write a Mictronics-format aircrafts.json covering the given hexes plus random filler entries.
+
+    types is a list of (type code, description) to draw from (MICTRONICS_TYPES by default), weighted by weights.
+    """
+    rng = random.Random(seed)
+    types = types or MICTRONICS_TYPES
+    data = {}
+    for hex_code in hexes:
+        if not hex_code.startswith('~'):
+            type_code, description = rng.choices(types, weights)[0]
+            data[hex_code.upper()] = {'r': f"N{rng.randint(1, 99999)}", 't': type_code, 'f': '00', 'd': description}
+    while len(data) < count:
+        type_code, description = rng.choices(types, weights)[0]
+        data[f"{rng.randint(0, 0xFFFFFF):06X}"] = {'r': f"N{rng.randint(1, 99999)}", 't': type_code,
+                                                   'f': '10' if rng.random() < military_share else '00', 'd': description}
+    with open(path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    return data
+
+
+def write_mictronics_types(path, count=2600, seed=1):
+    """Write a Mictronics-format types.json: MICTRONICS_TYPES plus made-up designators with realistic classes."""
+    rng = random.Random(seed)
+    classes = ['L1P'] * 30 + ['L2J'] * 25 + ['L2P'] * 10 + ['L1T'] * 8 + ['L2T'] * 8 + ['H1P'] * 5 + ['H1T'] * 5 + ['H2T'] * 4 + \
+              ['L4J', 'L4T', 'L3J', 'A1P', 'S1P', 'G1P', 'T2T', 'L1J']
+    data = {type_code: [description, MICTRONICS_TYPE_CLASSES[type_code], 'M'] for type_code, description in MICTRONICS_TYPES}
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    while len(data) < count:
+        type_code = rng.choice(letters) + ''.join(rng.choice(letters + '0123456789') for _ in range(rng.randint(2, 3)))
+        data.setdefault(type_code, [f"Maker {type_code} model", rng.choice(classes), rng.choice('LMH')])
+    with open(path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    return data
+
+
+def write_mictronics_operators(path, count=6000, seed=1):
+    """Write a Mictronics-format operators.json: the callsign prefixes used above plus made-up operators."""
+    rng = random.Random(seed)
+    data = {'UAL': ["United Airlines", "United States", "UNITED"], 'DAL': ["Delta Air Lines", "United States", "DELTA"],
+            'SWA': ["Southwest Airlines", "United States", "SOUTHWEST"], 'AAL': ["American Airlines", "United States", "AMERICAN"],
+            'SKW': ["SkyWest Airlines", "United States", "SKYWEST"], 'FDX': ["FedEx", "United States", "FEDEX"],
+            'CAP': ["Civil Air Patrol", "United States", "CAP"], 'RCH': ["Air Mobility Command", "United States", "REACH"],
+            'EJA': ["NetJets", "United States", "EXECJET"]}
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    while len(data) < count:
+        code = ''.join(rng.choice(letters) for _ in range(3))
+        data.setdefault(code, [f"Operator {code} Airways", rng.choice(["United States", "Canada", "Mexico", "Germany"]), f"CALL{code}"])
+    with open(path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    return data
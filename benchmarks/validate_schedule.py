@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Checks BirdAlert's Schedule against a plain per-minute datetime check, and times it.
+
+For several sets of active windows (daytime, overnight, Saturday night into Sunday, several
+windows a day, always, never) every few minutes of a year in a time zone with daylight saving
+is checked two ways: Schedule.update() against comparing datetime.now()-style fields with the
+windows, with Sunday as day 0. At each step the reported next change is checked too: the state
+must hold until then and flip right after. It then counts how often the scheduler wakes while
+waiting through a day outside its hours, against the old check every 5 seconds, and compares
+the per-aircraft cost of a rule schedule with a datetime call per aircraft. Rule schedules are
+also checked through a day with alert zones that compile their own rules loaded after
+alert_rules, in the main plan and the zones' plans. Exits with status 1 if a check fails.
+
+    python3 benchmarks/validate_schedule.py --tz America/Denver --step-minutes 7
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+
+EVERY_DAY = [0, 1, 2, 3, 4, 5, 6]
+CASES = {
+    'daytime': [(EVERY_DAY, '07:00', '21:00')],
+    'overnight': [([1, 2, 3, 4, 5], '22:30', '05:15')],
+    'saturday night': [([6], '20:00', '03:00')],
+    'several a day': [([1, 2, 3, 4, 5], '06:00', '08:59'), ([1, 2, 3, 4, 5], '16:00', '18:30'), ([0, 6], '10:00', '14:00')],
+    'always': [(EVERY_DAY, '00:00', '23:59')],
+    'never': [],
+}
+
+
+def reference_active(windows, timestamp):
+    """The straightforward check: the local date and time compared with each window."""
+    now = datetime.fromtimestamp(timestamp)
+    day = (now.weekday() + 1) % 7  # Sunday is 0
+    minute = now.hour * 60 + now.minute
+    for days, start, end in windows:
+        start = int(start[:2]) * 60 + int(start[3:])
+        end = int(end[:2]) * 60 + int(end[3:])
+        if start <= end:
+            if day in days and start <= minute <= end:
+                return True
+        elif (day in days and minute >= start) or ((day - 1) % 7 in days and minute <= end):
+            return True
+    return False
+
+
+def check_case(windows, start, step, steps, rng):
+    schedule = BirdAlert.Schedule(windows)
+    errors = []
+    timestamp = start
+    for _ in range(steps):
+        timestamp += step + rng.uniform(-30, 30)
+        active = schedule.update(timestamp)
+        if active != reference_active(windows, timestamp):
+            errors.append(f"{datetime.fromtimestamp(timestamp):%a %Y-%m-%d %H:%M:%S}: active {active}")
+        change = schedule.changes_at
+        if change != float('inf'):
+            if reference_active(windows, change - 1) != active or reference_active(windows, change + 1) == active:
+                errors.append(f"{datetime.fromtimestamp(timestamp):%a %Y-%m-%d %H:%M}: next change "
+                              f"{datetime.fromtimestamp(change):%a %Y-%m-%d %H:%M:%S} is wrong")
+    return errors
+
+
+class FakeClock:
+    """Stands in for the time module inside run_schedule so a day of waiting takes no time."""
+
+    localtime = staticmethod(time.localtime)
+
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = 0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        self.now += seconds
+
+
+def count_wakeups(windows, start):
+    """Wakeups of run_schedule() over the first day from start, and of the old 5 second poll."""
+    clock = FakeClock(start)
+    schedule = BirdAlert.Schedule(windows)
+    real_time = BirdAlert.time
+    BirdAlert.time = clock
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            while clock.now < start + 86400:
+                if BirdAlert.run_schedule(schedule):
+                    clock.now += BirdAlert.update_rate  # One poll cycle
+    finally:
+        BirdAlert.time = real_time
+    inactive = sum(1 for minute in range(1440) if not reference_active(windows, start + minute * 60))
+    return clock.sleeps, inactive * 60 // 5
+
+
+def check_zone_plans(start, step):
+    """Rule schedules with zones that have their own rules: the main plan's and each zone's must all follow the clock."""
+    night, day = CASES['overnight'], CASES['daytime']
+    BirdAlert.alert_rules = [{'name': "Night watch", 'hex': ['a35e89'], 'schedule': night},
+                             {'name': "Day watch", 'hex': ['a35e89'], 'schedule': day},
+                             {'name': "Military", 'military': True}]
+    BirdAlert.alert_zones = [{'name': "Base", 'circle': (39.86, -104.67, 5), 'rules': ["Military", "Day watch"]},
+                             {'name': "Field", 'circle': (39.70, -104.75, 3), 'rules': ["Night watch"]}]
+    BirdAlert.compile_alert_rules()
+    BirdAlert.load_alert_zones()
+    base, field = BirdAlert.zone_index.zones
+    aircraft = {'hex': 'a35e89', 'flight': 'N540W', 'type': 'adsb_icao'}
+    errors = []
+    if len(BirdAlert.rule_schedules) != 4:
+        errors.append(f"{len(BirdAlert.rule_schedules)} rule schedules registered, expected 4")
+    timestamp = start
+    while timestamp < start + 86400:
+        BirdAlert.update_rule_schedules(timestamp)
+        expected = "Night watch" if reference_active(night, timestamp) else "Day watch" if reference_active(day, timestamp) else None
+        for label, evaluate, wanted in (("alert_rules", BirdAlert.compiled_alert_rules, expected),
+                                        ("zone Base", base.evaluate, "Day watch" if reference_active(day, timestamp) else None),
+                                        ("zone Field", field.evaluate, "Night watch" if reference_active(night, timestamp) else None)):
+            rule = evaluate(aircraft, 'a35e89', 1.0)
+            if (rule.name if rule else None) != wanted:
+                errors.append(f"{label} at {datetime.fromtimestamp(timestamp):%a %H:%M}: matched {rule.name if rule else None}, expected {wanted}")
+        timestamp += step
+    BirdAlert.alert_zones = []
+    BirdAlert.zone_index = None
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tz', default='America/Denver', help="Time zone to check in (one with daylight saving)")
+    parser.add_argument('--step-minutes', type=float, default=7)
+    parser.add_argument('--aircraft', type=int, default=100000, help="Rule evaluations timed")
+    args = parser.parse_args()
+
+    os.environ['TZ'] = args.tz
+    time.tzset()
+    rng = random.Random(1)
+    start = datetime(2026, 1, 1).timestamp()
+    steps = int(366 * 1440 / args.step_minutes)
+    failures = []
+    print(f"Checking {steps} times over a year in {args.tz}")
+    for name, windows in CASES.items():
+        errors = check_case(windows, start, args.step_minutes * 60, steps, rng)
+        print(f"  {name:<16} {'ok' if not errors else f'{len(errors)} mismatches, first: {errors[0]}'}")
+        if errors:
+            failures.append(f"{name}: {len(errors)} mismatches")
+
+    errors = check_zone_plans(datetime(2026, 3, 4).timestamp(), args.step_minutes * 60)
+    print(f"  {'zone rules':<16} {'ok' if not errors else f'{len(errors)} mismatches, first: {errors[0]}'}")
+    if errors:
+        failures.append(f"zone rules: {len(errors)} mismatches")
+
+    print(f"\nWakeups waiting through a day (update_rate {BirdAlert.update_rate} s)")
+    for name in ('daytime', 'overnight', 'several a day'):
+        wakeups, old_wakeups = count_wakeups(CASES[name], datetime(2026, 3, 4).timestamp())
+        print(f"  {name:<16} {wakeups:>5} wakeups while inactive, {old_wakeups:>6} with the 5 second check")
+
+    BirdAlert.compile_alert_rules([{'name': "Daytime watch list", 'hex': ['a35e89'], 'schedule': CASES['daytime']},
+                                   {'name': "Military", 'military': True}])
+    aircraft = {'hex': 'a35e89', 'flight': 'N540W', 'type': 'adsb_icao'}
+    evaluate = BirdAlert.match_alert_rule
+    begin = time.perf_counter()
+    for _ in range(args.aircraft):
+        BirdAlert.update_rule_schedules(time.time())  # Once per batch in BirdAlert; here once per aircraft
+        evaluate(aircraft, 'a35e89', 5.0)
+    scheduled = time.perf_counter() - begin
+    windows = CASES['daytime']
+    begin = time.perf_counter()
+    for _ in range(args.aircraft):
+        if reference_active(windows, time.time()):
+            evaluate(aircraft, 'a35e89', 5.0)
+    per_aircraft = time.perf_counter() - begin
+    print(f"\nRule with a schedule: {scheduled / args.aircraft * 1e6:.2f} us per aircraft, "
+          f"against {per_aircraft / args.aircraft * 1e6:.2f} us with a datetime check per aircraft")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("PASS" if not failures else "FAIL")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Replay check for TIS-B track correlation on synthetic hex-hopping targets.
+
+Replays a feed in which TIS-B aircraft keep switching to new "~" addresses (the old address
+lingers in the snapshot, as it does in readsb) through BirdAlert's snapshot pipeline, once with
+correlate_tisb_tracks off and once on. Counts the alerts each TIS-B aircraft caused and the
+tracks that wrongly joined two different aircraft. Exits with status 1 if, with correlation on,
+more than --max-repeated of the aircraft alerted more than once or more than --max-false-merges
+of the tracks are mixed.
+
+    python3 benchmarks/validate_tisb.py --aircraft 3000 --snapshots 300 --hop-rate 0.05
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from synthetic import SyntheticFeed
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def replay(args, correlate):
+    BirdAlert.correlate_tisb_tracks = correlate
+    BirdAlert.tisb_correlator = None
+    BirdAlert.aircraft_tracks = BirdAlert.TrackTable()
+    BirdAlert.terminal_rows.clear()
+    BirdAlert.load_alert_state()
+
+    feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=args.spread_miles, watch_share=0,
+                         military_share=0, tisb_share=args.tisb_share, emergency_rate=0, hex_hop_rate=args.hop_rate,
+                         seed=args.seed)
+    alerts = Counter()
+
+    def send_notification(track, *args):
+        alerts[feed.identities[track.hex]] += 1
+
+    BirdAlert.send_notification = send_notification
+
+    hex_tracks = {}
+    for _ in range(args.snapshots):
+        BirdAlert.process_snapshot(feed.advance(1.0), feed.now)
+        if BirdAlert.tisb_correlator is not None:
+            hex_tracks.update(BirdAlert.tisb_correlator.hex_tracks)
+
+    track_identities = {}
+    for hex_code, track_id in hex_tracks.items():
+        track_identities.setdefault(track_id, set()).add(feed.identities[hex_code])
+    tisb_alerts = {identity: count for identity, count in alerts.items() if identity.startswith('~')}
+    return {
+        'aircraft': len(tisb_alerts),
+        'alerts': sum(tisb_alerts.values()),
+        'repeated': sum(1 for count in tisb_alerts.values() if count > 1),
+        'hops': sum(1 for hex_code, identity in feed.identities.items() if hex_code != identity),
+        'tracks': len(track_identities),
+        'false_merges': sum(1 for identities in track_identities.values() if len(identities) > 1),
+        'followed': BirdAlert.tisb_correlator.correlated if BirdAlert.tisb_correlator is not None else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, default=3000)
+    parser.add_argument('--tisb-share', type=float, default=0.3)
+    parser.add_argument('--hop-rate', type=float, default=0.05, help="Chance per TIS-B aircraft per snapshot of a new hex")
+    parser.add_argument('--snapshots', type=int, default=300)
+    parser.add_argument('--spread-miles', type=float, default=40)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-repeated', type=float, default=0.02, help="Allowed share of aircraft alerting more than once")
+    parser.add_argument('--max-false-merges', type=float, default=0.01, help="Allowed share of tracks joining two aircraft")
+    args = parser.parse_args()
+
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    BirdAlert.alert_state_path_expanded = ''
+    BirdAlert.load_military_ranges()
+    BirdAlert.compile_alert_rules()
+
+    print(f"{args.aircraft} aircraft ({args.tisb_share:.0%} TIS-B), {args.snapshots} snapshots, hop rate {args.hop_rate:g}")
+    for correlate in (False, True):
+        result = replay(args, correlate)
+        print(f"correlation {'on ' if correlate else 'off'}: {result['aircraft']} TIS-B aircraft alerted, "
+              f"{result['alerts']} alerts, {result['repeated']} aircraft alerted more than once, "
+              f"{result['followed']} track matches for {result['hops']} hex changes, "
+              f"{result['false_merges']} of {result['tracks']} tracks mixed two aircraft")
+
+    failed = (result['repeated'] > args.max_repeated * max(result['aircraft'], 1) or
+              result['false_merges'] > args.max_false_merges * max(result['tracks'], 1))
+    print("FAIL" if failed else "PASS")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Track table: enter, update and exit events checked against the snapshots, and the cost of keeping tracks.
+
+Flies --aircraft synthetic aircraft around the receiver (spread so many cross the edge of
+range_miles) through BirdAlert's snapshot pipeline with departure_alerts on and the
+notification channel stubbed. Some aircraft drop out of the feed, and some stay listed but
+go quiet until their 'seen' passes track_timeout. Every enter and exit event is checked
+against what the snapshots themselves show: an aircraft enters when it is first reported
+inside range_miles, and exits when it is reported outside, disappears or goes stale. It also
+checks that each departure notification follows an alert for the same aircraft. Reports
+the time per cycle and the memory per track. Exits with status 1 if a check fails.
+
+    python3 benchmarks/validate_tracks.py --aircraft 5000 --cycles 120
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import BirdAlert
+from synthetic import SyntheticFeed
+
+RECEIVER_LAT = 39.8617
+RECEIVER_LON = -104.6731
+
+
+def expected_events(previous, snapshot, now):
+    """Enter and exit events the snapshot should cause, from the reported positions alone."""
+    inside = {}
+    for aircraft in snapshot:
+        stale = (aircraft.get('seen') or 0) > BirdAlert.track_timeout
+        lat = aircraft.get('lat')
+        if lat is not None and not stale and \
+                BirdAlert.haversine(RECEIVER_LAT, RECEIVER_LON, lat, aircraft['lon']) <= BirdAlert.range_miles:
+            inside[aircraft['hex']] = True
+    enters = Counter(hex_code for hex_code in inside if hex_code not in previous)
+    exits = Counter(hex_code for hex_code in previous if hex_code not in inside)
+    return inside, enters, exits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--aircraft', type=int, default=5000)
+    parser.add_argument('--cycles', type=int, default=120)
+    parser.add_argument('--spread-miles', type=float, default=60)
+    parser.add_argument('--drop-rate', type=float, default=0.002, help="Chance per aircraft per cycle of dropping out of the feed")
+    parser.add_argument('--quiet-rate', type=float, default=0.002, help="Chance per aircraft per cycle of going quiet while still listed")
+    args = parser.parse_args()
+
+    BirdAlert.your_lat = RECEIVER_LAT
+    BirdAlert.your_lon = RECEIVER_LON
+    BirdAlert.alert_state_path_expanded = ''
+    BirdAlert.display_mode = 'headless'
+    BirdAlert.correlate_tisb_tracks = False
+    BirdAlert.departure_alerts = True
+    BirdAlert.notification_queue_size = 0
+    BirdAlert.notification_digest_max = 1
+    messages = []
+    BirdAlert.notification_channels = [('stub', lambda: True, lambda message_body: messages.append(message_body) or True)]
+    BirdAlert.load_military_ranges()
+    BirdAlert.compile_alert_rules([{'name': "Everything", 'transponder_types': ['adsb_icao', 'adsb_icao_nt', 'mlat', 'mode_s',
+                                                                            'adsr_icao', 'tisb_icao', 'tisb_other']}])
+    BirdAlert.load_alert_state()
+
+    # Unique hexes, so the expected events can be keyed by hex
+    feed = SyntheticFeed(args.aircraft, RECEIVER_LAT, RECEIVER_LON, spread_miles=args.spread_miles, tisb_share=0, seed=4)
+    for number, aircraft in enumerate(feed.aircraft):
+        aircraft['hex'] = f"{0xA00000 + number:06x}"
+    rng = random.Random(5)
+    dropped = set()
+    quiet = set()
+
+    events = Counter()
+    original_handle = BirdAlert.handle_track_event
+
+    def handle_track_event(event, track, aircraft=None, reason=None):
+        if event is not None:
+            events[(event, track.hex)] += 1
+        return original_handle(event, track, aircraft, reason)
+
+    BirdAlert.handle_track_event = handle_track_event
+    failures = []
+    previous = {}
+    timings = []
+    for cycle in range(args.cycles):
+        snapshot = []
+        for aircraft in feed.advance(1.0):
+            if aircraft['hex'] in dropped or rng.random() < args.drop_rate:
+                dropped.add(aircraft['hex'])
+                continue
+            if aircraft['hex'] in quiet or rng.random() < args.quiet_rate:
+                quiet.add(aircraft['hex'])
+                aircraft = dict(aircraft, seen=BirdAlert.track_timeout + 5, seen_pos=aircraft['seen_pos'] + 5)
+            snapshot.append(aircraft)
+        events.clear()
+        start = time.perf_counter()
+        BirdAlert.process_snapshot(snapshot, feed.now)
+        timings.append(time.perf_counter() - start)
+        previous, enters, exits = expected_events(previous, snapshot, feed.now)
+        got_enters = Counter(hex_code for (event, hex_code), count in events.items() if event == 'enter' for _ in range(count))
+        got_exits = Counter(hex_code for (event, hex_code), count in events.items() if event == 'exit' for _ in range(count))
+        if got_enters != enters:
+            failures.append(f"cycle {cycle}: enter events {sorted((got_enters - enters).elements())[:3]} unexpected, "
+                            f"{sorted((enters - got_enters).elements())[:3]} missing")
+        if got_exits != exits:
+            failures.append(f"cycle {cycle}: exit events {sorted((got_exits - exits).elements())[:3]} unexpected, "
+                            f"{sorted((exits - got_exits).elements())[:3]} missing")
+    BirdAlert.wait_for_notifications()
+    BirdAlert.handle_track_event = original_handle
+
+    alerted = set()
+    departures = Counter()
+    for message_body in messages:
+        fields = dict(line.split(': ', 1) for line in message_body.splitlines() if ': ' in line)
+        hex_code = fields['Aircraft hex'].lower()
+        if 'Departed' in fields:
+            departures[fields['Departed'].split(' after')[0]] += 1
+            if hex_code not in alerted:
+                failures.append(f"{hex_code} departed without alerting first")
+        else:
+            alerted.add(hex_code)
+
+    timings.sort()
+    tracks = BirdAlert.aircraft_tracks
+    sample = next(iter(tracks.tracks.values()))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    extra = [BirdAlert.AircraftTrack(f"{number:06x}") for number in range(10000)]
+    for track in extra:
+        track.update(feed.aircraft[0])
+    per_track = (tracemalloc.get_traced_memory()[0] - before) / len(extra)
+    tracemalloc.stop()
+    fields = {name: getattr(sample, name, None) for name in BirdAlert.AircraftTrack.__slots__}
+    print(f"{args.aircraft} aircraft within {args.spread_miles:.0f} miles, {args.cycles} cycles, range_miles {BirdAlert.range_miles}")
+    print(f"Cycle: p50 {timings[len(timings) // 2] * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms; {len(tracks)} tracks at the end")
+    print(f"Track: {per_track:.0f} bytes each with its strings (the same fields in a dict: {sys.getsizeof(fields)} bytes before any values)")
+    print(f"Notifications: {len(alerted)} aircraft alerted, departures {dict(departures)}")
+
+    for failure in failures[:10]:
+        print(f"FAIL: {failure}")
+    print("PASS" if not failures else f"FAIL ({len(failures)} checks)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()